@@ -1,4 +1,25 @@
-from .channel import Polarity
-from .module import NHR
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .channel import Polarity
+    from .module import NHR
 
 __all__ = ["NHR", "Polarity"]
+
+# submodule of each public name, imported on first access so that `import iseg_nhr`
+# loads neither pyserial nor the driver until it is used
+_LAZY = {"NHR": "module", "Polarity": "channel"}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        from importlib import import_module
+
+        value = getattr(import_module(f".{_LAZY[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
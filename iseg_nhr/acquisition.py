@@ -0,0 +1,242 @@
+"""
+Timestamped channel readings and synchronized acquisition across modules.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .codec import AMPERES, INTEGER, VOLTS
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+# channel list query and decoder of each quantity
+QUANTITIES: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "voltage": (":MEAS:VOLT?", VOLTS),
+    "current": (":MEAS:CURR?", AMPERES),
+    "setpoint": (":READ:VOLT?", VOLTS),
+    "status": (":READ:CHAN:STAT?", INTEGER),
+}
+
+
+class TimedValue(NamedTuple):
+    """
+    Value with the monotonic times of the query that returned it
+
+    Attributes:
+        value (Any): decoded value
+        requested (float): time the query was sent [s]
+        received (float): time the response was read [s]
+    """
+
+    value: Any
+    requested: float
+    received: float
+
+    @property
+    def midpoint(self) -> float:
+        """
+        Best estimate of the sampling time [s]
+        """
+        return (self.requested + self.received) / 2
+
+
+@dataclass
+class ModuleSample:
+    """
+    Timestamped readings of the channels of one module
+
+    Attributes:
+        module (int): module index
+        channels (Tuple[int, ...]): channel indices
+        values (Dict[str, List[TimedValue]]): values of each quantity, one per
+            channel
+    """
+
+    module: int
+    channels: Tuple[int, ...]
+    values: Dict[str, List[TimedValue]] = field(default_factory=dict)
+
+    def __getitem__(self, quantity: str) -> List[TimedValue]:
+        return self.values[quantity]
+
+    @property
+    def requested(self) -> float:
+        """
+        Time the first query was sent [s]
+        """
+        return min(values[0].requested for values in self.values.values())
+
+    @property
+    def received(self) -> float:
+        """
+        Time the last response was read [s]
+        """
+        return max(values[0].received for values in self.values.values())
+
+
+def _check_quantities(quantities: Sequence[str]):
+    if not quantities:
+        raise ValueError("no quantities to read")
+    for quantity in quantities:
+        if quantity not in QUANTITIES:
+            raise ValueError(f"unknown quantity {quantity}")
+
+
+def read_timed(
+    nhr: NHR,
+    quantities: Sequence[str] = ("voltage", "current"),
+    channels: Optional[Sequence[int]] = None,
+    module: int = 0,
+    clock: Callable[[], float] = time.monotonic,
+) -> ModuleSample:
+    """
+    Read quantities of several channels, one channel list query per quantity,
+    recording when each query was sent and answered
+
+    Args:
+        nhr (NHR): module
+        quantities (Sequence[str]): keys of `QUANTITIES`
+        channels (Sequence[int], optional): channel indices, all if None
+        module (int): index stored in the sample
+
+    Returns:
+        ModuleSample: values with their query times
+    """
+    _check_quantities(quantities)
+    channels = tuple(range(nhr._channels) if channels is None else channels)
+    sample = ModuleSample(module, channels)
+    for quantity in quantities:
+        cmd, decode = QUANTITIES[quantity]
+        requested = clock()
+        responses = nhr._query_channels(cmd, channels)
+        received = clock()
+        sample.values[quantity] = [
+            TimedValue(decode(response), requested, received) for response in responses
+        ]
+    return sample
+
+
+@dataclass
+class Acquisition:
+    """
+    Samples of all modules taken at one tick
+
+    Attributes:
+        tick (float): monotonic time all readouts were scheduled to start [s]
+        samples (List[ModuleSample]): sample of each module, in module order
+    """
+
+    tick: float
+    samples: List[ModuleSample]
+
+    @property
+    def start_skew(self) -> float:
+        """
+        Spread of the readout start times over the modules [s]
+        """
+        starts = [sample.requested for sample in self.samples]
+        return max(starts) - min(starts)
+
+    def skew(self, quantity: str) -> float:
+        """
+        Spread of the sampling times of a quantity over all modules [s]
+        """
+        midpoints = [sample[quantity][0].midpoint for sample in self.samples]
+        return max(midpoints) - min(midpoints)
+
+
+class SynchronizedAcquisition:
+    """
+    Read several modules in parallel, each readout starting at the same tick
+
+    Every `acquire` runs one thread per module. The threads meet at a barrier,
+    whose last arrival sets the tick `lead` seconds ahead, and each thread sleeps
+    until the tick before sending its first query, so the readouts of modules on
+    different ports start within the scheduling jitter instead of one after the
+    other.
+    """
+
+    def __init__(
+        self,
+        modules: Sequence[NHR],
+        quantities: Sequence[str] = ("voltage", "current"),
+        lead: float = 0.002,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if not modules:
+            raise ValueError("no modules to acquire")
+        _check_quantities(quantities)
+        self.modules = tuple(modules)
+        self.quantities = tuple(quantities)
+        self.lead = lead
+        self._clock = clock
+        self._sleep = sleep
+
+    def _read(
+        self,
+        index: int,
+        barrier: threading.Barrier,
+        tick: List[float],
+        samples: List[Optional[ModuleSample]],
+        errors: List[Exception],
+    ):
+        try:
+            barrier.wait()
+            delay = tick[0] - self._clock()
+            if delay > 0:
+                self._sleep(delay)
+            samples[index] = read_timed(
+                self.modules[index], self.quantities, module=index, clock=self._clock
+            )
+        except Exception as error:
+            errors.append(error)
+
+    def acquire(self) -> Acquisition:
+        """
+        Read all modules starting at a common tick
+
+        Returns:
+            Acquisition: samples of all modules with the tick and skew
+        """
+        samples: List[Optional[ModuleSample]] = [None] * len(self.modules)
+        errors: List[Exception] = []
+        # set by the last thread at the barrier, local so concurrent calls do not
+        # share a tick
+        tick = [0.0]
+
+        def schedule():
+            tick[0] = self._clock() + self.lead
+
+        barrier = threading.Barrier(len(self.modules), action=schedule)
+        threads = [
+            threading.Thread(
+                target=self._read,
+                args=(index, barrier, tick, samples, errors),
+                name=f"nhr-acquisition-{index}",
+                daemon=True,
+            )
+            for index in range(len(self.modules))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return Acquisition(tick[0], samples)  # type: ignore[arg-type]
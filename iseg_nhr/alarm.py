@@ -0,0 +1,333 @@
+"""
+Threshold alarms with hysteresis and debounce evaluated over arrays of readings.
+"""
+
+from __future__ import annotations
+
+import operator
+import time
+from array import array
+from dataclasses import dataclass, field
+from itertools import compress
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .channel import channel_list
+from .codec import COMMANDS
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+# quantities with one value per channel
+CHANNEL_QUANTITIES: Tuple[str, ...] = ("voltage", "current", "setpoint", "deviation")
+# quantities with one value per module
+MODULE_QUANTITIES: Tuple[str, ...] = (
+    "temperature",
+    "p24v",
+    "n24v",
+    "p12v",
+    "n12v",
+    "p5v",
+    "p3v",
+)
+
+# query of every quantity read from the module
+QUERIES: Dict[str, str] = {
+    "voltage": ":MEAS:VOLT?",
+    "current": ":MEAS:CURR?",
+    "setpoint": ":READ:VOLT?",
+    "temperature": ":READ:MOD:TEMP?",
+    **{rail: f":READ:MOD:SUP:{rail.upper()}?" for rail in MODULE_QUANTITIES[1:]},
+}
+
+
+@dataclass(frozen=True)
+class AlarmRule:
+    """
+    Alarm raised while a quantity is outside its limits
+
+    Attributes:
+        name (str): alarm name
+        quantity (str): one of `CHANNEL_QUANTITIES` or `MODULE_QUANTITIES`;
+            `deviation` is the deviation of the measured voltage from the setpoint
+            in percent of the setpoint
+        high (float, optional): raise above this value
+        low (float, optional): raise below this value
+        hysteresis (float): margin inside the limits required to clear
+        debounce (int): consecutive samples outside the limits required to raise
+        release (int): consecutive samples inside the margin required to clear
+    """
+
+    name: str
+    quantity: str
+    high: Optional[float] = None
+    low: Optional[float] = None
+    hysteresis: float = 0.0
+    debounce: int = 1
+    release: int = 1
+
+    def __post_init__(self):
+        if self.quantity not in CHANNEL_QUANTITIES + MODULE_QUANTITIES:
+            raise ValueError(f"unknown quantity {self.quantity}")
+        if self.high is None and self.low is None:
+            raise ValueError(f"alarm {self.name} requires high or low")
+        if self.debounce < 1 or self.release < 1:
+            raise ValueError("debounce and release must be at least 1 sample")
+        if self.hysteresis < 0:
+            raise ValueError(f"hysteresis must be >= 0, not {self.hysteresis}")
+
+    def _select(self, values: Sequence[float], clear: bool) -> Iterable[int]:
+        """
+        Indices of values beyond the limits, or within the hysteresis margin of
+        them if `clear`, compared without a Python-level loop
+        """
+        margin = self.hysteresis if clear else 0.0
+        masks = []
+        if self.high is not None:
+            masks.append(map((self.high - margin).__lt__, values))
+        if self.low is not None:
+            masks.append(map((self.low + margin).__gt__, values))
+        mask = masks[0] if len(masks) == 1 else map(operator.or_, *masks)
+        return compress(range(len(values)), mask)
+
+
+@dataclass
+class Readings:
+    """
+    Readings of one cycle as flat arrays
+
+    Attributes:
+        values (Dict[str, array]): values of each quantity; channel quantities hold
+            one value per channel of all modules, module quantities one per module
+        channels (List[Tuple[int, int]]): module and channel index of each position
+            of the channel quantities
+        timestamp (float): monotonic time of the readout [s]
+    """
+
+    values: Dict[str, array] = field(default_factory=dict)
+    channels: List[Tuple[int, int]] = field(default_factory=list)
+    timestamp: float = 0.0
+
+
+@dataclass(frozen=True)
+class AlarmEvent:
+    """
+    Alarm raised or cleared
+
+    Attributes:
+        rule (AlarmRule): rule of the alarm
+        module (int): module index
+        channel (int, optional): channel index, None for module quantities
+        value (float): value that completed the debounce
+        raised (bool): True if raised, False if cleared
+        timestamp (float): time of the readings [s]
+    """
+
+    rule: AlarmRule
+    module: int
+    channel: Optional[int]
+    value: float
+    raised: bool
+    timestamp: float
+
+
+def _queries(nhr: NHR, quantities: Sequence[str]) -> List[str]:
+    spec = channel_list(range(nhr._channels))
+    return [
+        f"{QUERIES[quantity]} {spec}"
+        if quantity in CHANNEL_QUANTITIES
+        else QUERIES[quantity]
+        for quantity in quantities
+    ]
+
+
+def read(
+    modules: Sequence[NHR],
+    quantities: Iterable[str],
+    clock: Callable[[], float] = time.monotonic,
+) -> Readings:
+    """
+    Read the quantities needed by a set of rules from several modules, with one
+    pipelined burst per module and one channel list query per channel quantity
+
+    Args:
+        modules (Sequence[NHR]): modules, positions follow this order
+        quantities (Iterable[str]): quantities to read
+
+    Returns:
+        Readings: flat arrays of all modules
+    """
+    quantities = set(quantities)
+    if "deviation" in quantities:
+        quantities |= {"voltage", "setpoint"}
+    # in table order, so every module is read with the same burst
+    queried = [quantity for quantity in QUERIES if quantity in quantities]
+    readings = Readings(timestamp=clock())
+    values = {quantity: array("d") for quantity in queried}
+    for index, nhr in enumerate(modules):
+        readings.channels.extend((index, ch) for ch in range(nhr._channels))
+        cmds = _queries(nhr, queried)
+        for quantity, cmd, response in zip(queried, cmds, nhr._pipeline(cmds)):
+            decode = COMMANDS[QUERIES[quantity]]
+            if quantity in CHANNEL_QUANTITIES:
+                channel_values = response.split(",")
+                if len(channel_values) != nhr._channels:
+                    raise ValueError(
+                        f"error in command {cmd}, expected {nhr._channels} values,"
+                        f" NHR returned {len(channel_values)}"
+                    )
+                values[quantity].extend(map(decode, channel_values))
+            else:
+                values[quantity].append(decode(response))
+    readings.values.update(values)
+    if "deviation" in quantities:
+        readings.values["deviation"] = deviation(
+            readings.values["voltage"], readings.values["setpoint"]
+        )
+    return readings
+
+
+def deviation(voltages: Sequence[float], setpoints: Sequence[float]) -> array:
+    """
+    Absolute deviation of voltages from their setpoints in percent of the setpoint;
+    0 for a zero setpoint unless the voltage differs
+    """
+    return array(
+        "d",
+        (
+            abs(v - s) / abs(s) * 100.0 if s else (0.0 if v == 0 else float("inf"))
+            for v, s in zip(voltages, setpoints)
+        ),
+    )
+
+
+class _RuleState:
+    """
+    Alarm state of one rule for all positions
+    """
+
+    def __init__(self, size: int):
+        self.active = array("b", [0]) * size
+        self.count = array("I", [0]) * size
+        # positions with an active alarm or a debounce in progress
+        self.pending: Set[int] = set()
+
+
+class AlarmEngine:
+    """
+    Evaluate alarm rules over the channels and modules of one or more `NHR`
+
+    State is kept per rule in compact arrays, one entry per channel or module.
+    Each rule selects the positions beyond its limits with C-level `map` and
+    `compress` over the readings array; the Python-level state machine only runs
+    for those positions and for positions with an active alarm or a debounce in
+    progress, so a quiet cycle runs no Python code per channel.
+    """
+
+    def __init__(self, rules: Iterable[AlarmRule]):
+        self.rules: List[AlarmRule] = list(rules)
+        self._states: Dict[int, _RuleState] = {}
+
+    @property
+    def quantities(self) -> Set[str]:
+        return {rule.quantity for rule in self.rules}
+
+    def add(self, rule: AlarmRule):
+        self.rules.append(rule)
+
+    def reset(self):
+        self._states.clear()
+
+    def active(self) -> List[Tuple[AlarmRule, int]]:
+        """
+        Rules and positions with an active alarm
+        """
+        return [
+            (self.rules[position], index)
+            for position, state in sorted(self._states.items())
+            for index in sorted(state.pending)
+            if state.active[index]
+        ]
+
+    def evaluate(self, readings: Readings) -> List[AlarmEvent]:
+        """
+        Update the alarm state with one cycle of readings
+
+        Args:
+            readings (Readings): readings, e.g. from `read`
+
+        Returns:
+            List[AlarmEvent]: alarms raised or cleared in this cycle
+        """
+        events = []
+        for position, rule in enumerate(self.rules):
+            values = readings.values[rule.quantity]
+            state = self._states.get(position)
+            if state is None or len(state.active) != len(values):
+                state = self._states[position] = _RuleState(len(values))
+            outside = set(rule._select(values, clear=False))
+            if state.pending:
+                # active alarms stay pending while within the hysteresis margin
+                margin = set(rule._select(values, clear=True))
+            else:
+                margin = outside
+            for index in outside | state.pending:
+                active = state.active[index]
+                if active:
+                    flip, needed = index not in margin, rule.release
+                else:
+                    flip, needed = index in outside, rule.debounce
+                if not flip:
+                    state.count[index] = 0
+                    if not active:
+                        state.pending.discard(index)
+                    continue
+                state.pending.add(index)
+                state.count[index] += 1
+                if state.count[index] < needed:
+                    continue
+                state.count[index] = 0
+                state.active[index] = not active
+                if active:
+                    state.pending.discard(index)
+                events.append(self._event(rule, readings, index, not active))
+        return events
+
+    def _event(
+        self, rule: AlarmRule, readings: Readings, index: int, raised: bool
+    ) -> AlarmEvent:
+        if rule.quantity in CHANNEL_QUANTITIES and readings.channels:
+            module, channel = readings.channels[index]
+        else:
+            module, channel = index, None
+        return AlarmEvent(
+            rule,
+            module,
+            channel,
+            readings.values[rule.quantity][index],
+            raised,
+            readings.timestamp,
+        )
+
+    def poll(
+        self, modules: Sequence[NHR], clock: Callable[[], float] = time.monotonic
+    ) -> List[AlarmEvent]:
+        """
+        Read the quantities used by the rules and evaluate them
+
+        Args:
+            modules (Sequence[NHR]): modules
+
+        Returns:
+            List[AlarmEvent]: alarms raised or cleared in this cycle
+        """
+        return self.evaluate(read(modules, self.quantities, clock))
@@ -0,0 +1,164 @@
+"""
+Batching of property writes and deferred reads into pipelined bursts.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Generic, List, Optional, Tuple, TypeVar
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+_T = TypeVar("_T")
+
+# response handed to getters while their commands are being recorded, one value
+# per channel of a channel list query
+_PLACEHOLDER = "0"
+
+
+def _placeholder(cmd: str) -> str:
+    from .channel import split_channel_list
+
+    _, channels = split_channel_list(cmd)
+    return ",".join([_PLACEHOLDER] * len(channels or [None]))
+
+
+class Deferred(Generic[_T]):
+    """
+    Result of a read queued in a batch, available after the batch is flushed
+    """
+
+    def __init__(self, getter: Callable[[], _T]):
+        self._getter = getter
+        self._resolved = False
+        self._value: Optional[_T] = None
+        self._error: Optional[BaseException] = None
+
+    @property
+    def resolved(self) -> bool:
+        return self._resolved
+
+    @property
+    def value(self) -> _T:
+        if not self._resolved:
+            raise RuntimeError("deferred read is not resolved until the batch exits")
+        if self._error is not None:
+            raise self._error
+        return self._value  # type: ignore[return-value]
+
+
+class Batch:
+    """
+    Queue writes made through `NHR`, `Channel`, `Voltage`, `Current` and `Ramp`
+    and send them as one pipelined burst
+
+    Inside `with nhr.batch() as b:` writes of the current thread are queued, and
+    `b.read(lambda: channel.voltage.measured)` queues the queries of a getter and
+    returns a `Deferred`. On exit all queued commands are sent in one burst and the
+    deferred reads are resolved. A plain read inside the block flushes the queue
+    together with the read, so code that reads before it writes keeps working.
+
+    Getters are replayed against the responses of the burst. Queries a getter did
+    not make while it was recorded, e.g. because a placeholder response did not
+    parse, are sent on their own when the getter is replayed.
+    """
+
+    def __init__(self, nhr: NHR):
+        self._nhr = nhr
+        self._connection = nhr._device
+        self._queue: List[str] = []
+        self._deferred: List[Tuple[Deferred, List[int]]] = []
+        self._recording: Optional[List[int]] = None
+        self._replay: Optional[List[Tuple[str, str]]] = None
+        self._inline: Optional[str] = None
+        self.bursts = 0
+
+    def __enter__(self) -> Batch:
+        if self._connection.batch is not None:
+            raise RuntimeError("batches can not be nested")
+        self._connection.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self._connection.batch = None
+            self._queue.clear()
+            self._deferred.clear()
+
+    def read(self, getter: Callable[[], _T]) -> Deferred[_T]:
+        """
+        Queue the queries made by `getter` and evaluate it after the flush
+
+        Args:
+            getter (Callable[[], _T]): e.g. `lambda: channel.voltage.measured`
+
+        Returns:
+            Deferred[_T]: result, available once the batch has been flushed
+        """
+        deferred = Deferred(getter)
+        self._recording = []
+        try:
+            getter()
+        except Exception:
+            # placeholder responses may not parse; the queries are recorded
+            pass
+        finally:
+            indices, self._recording = self._recording, None
+        self._deferred.append((deferred, indices))
+        return deferred
+
+    def flush(self):
+        """
+        Send the queued commands in one burst and resolve the deferred reads
+        """
+        cmds, self._queue = self._queue, []
+        deferred, self._deferred = self._deferred, []
+        # getters that sent no query are still resolved
+        responses: List[Optional[str]] = []
+        if cmds:
+            responses = self._nhr._pipeline(cmds)
+            self.bursts += 1
+            if cmds[-1] == self._inline:
+                self._inline = responses[-1]
+
+        for item, indices in deferred:
+            self._replay = [(cmds[i], responses[i]) for i in indices]
+            try:
+                item._value = item._getter()
+            except Exception as error:
+                item._error = error
+            finally:
+                self._replay = None
+                item._resolved = True
+
+    # called by Connection for commands of the batching thread
+
+    def query(self, cmd: str) -> str:
+        if self._replay is not None:
+            if not self._replay or self._replay[0][0] != cmd:
+                # not recorded, the getter took another path on real responses
+                echo, *response = self._connection.pipeline([cmd])[0]
+                self._replay.insert(0, (cmd, response[0] if response else ""))
+                return echo
+            return cmd
+        self._queue.append(cmd)
+        if self._recording is not None:
+            if "?" in cmd:
+                self._recording.append(len(self._queue) - 1)
+        elif "?" in cmd:
+            self._inline = cmd
+            self.flush()
+        return cmd
+
+    def read_response(self) -> str:
+        if self._replay is not None:
+            return self._replay.pop(0)[1]
+        if self._recording is not None:
+            return _placeholder(self._queue[self._recording[-1]])
+        response, self._inline = self._inline, None
+        if response is None:
+            raise RuntimeError("no response pending in batch")
+        return response
@@ -0,0 +1,189 @@
+"""
+Write-through cache suppressing writes of unchanged channel settings.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .channel import split_channel_list
+from .codec import COMMANDS
+from .transport import DeviceTransport, pipeline
+
+# setting commands and the query that reads the same setting back, its response
+# is decoded with the decoder from `COMMANDS`
+SETTINGS: Dict[str, str] = {
+    ":VOLT": ":READ:VOLT?",
+    ":VOLT:BOU": ":READ:VOLT:BOU?",
+    ":CURR:BOU": ":READ:CURR:BOU?",
+    ":CONF:RAMP:VOLT:UP": ":CONF:RAMP:VOLT:UP?",
+    ":CONF:RAMP:VOLT:DOWN": ":CONF:RAMP:VOLT:DOWN?",
+    ":CONF:RAMP:CURR:UP": ":CONF:RAMP:CURR:UP?",
+    ":CONF:RAMP:CURR:DOWN": ":CONF:RAMP:CURR:DOWN?",
+}
+
+# commands setting several cached settings at once
+ALIASES: Dict[str, Tuple[str, ...]] = {
+    ":CONF:RAMP:VOLT": (":CONF:RAMP:VOLT:UP", ":CONF:RAMP:VOLT:DOWN"),
+    ":CONF:RAMP:CURR": (":CONF:RAMP:CURR:UP", ":CONF:RAMP:CURR:DOWN"),
+}
+
+QUERIES: Dict[str, str] = {query: setting for setting, query in SETTINGS.items()}
+
+Key = Tuple[str, int]
+
+
+def _parse_write(cmd: str) -> Optional[Tuple[Tuple[str, ...], float, List[int]]]:
+    head, channels = split_channel_list(cmd)
+    if channels is None:
+        return None
+    header, _, value = head.partition(" ")
+    settings = ALIASES.get(header, (header,) if header in SETTINGS else ())
+    if not settings:
+        return None
+    try:
+        return settings, float(value), channels
+    except ValueError:
+        return None
+
+
+class WriteCache:
+    """
+    Transport wrapper remembering the last setting values confirmed by the module
+
+    Writes of voltage setpoints, bounds and ramp speeds whose value equals the
+    confirmed value are answered locally instead of being sent. Values are
+    confirmed by a matching write echo or by reading the setting back. The cache is
+    cleared by `*RST`, emptied for a channel by an emergency off, and bypassed
+    while the module is under local front-panel control (`*GTL`) until `*LLO`.
+    Call `invalidate` after reconnecting.
+    """
+
+    def __init__(self, transport: DeviceTransport):
+        self.transport = transport
+        self.enabled = True
+        self.skipped = 0
+        self._values: Dict[Key, float] = {}
+        self._pending: Optional[Tuple[str, List[int]]] = None
+
+    def invalidate(self, channels: Optional[Sequence[int]] = None):
+        """
+        Forget cached values of `channels`, of all channels if None
+        """
+        if channels is None:
+            self._values.clear()
+            return
+        for key in [key for key in self._values if key[1] in channels]:
+            del self._values[key]
+
+    def is_redundant(self, cmd: str) -> bool:
+        """
+        Check whether `cmd` would not change any confirmed setting
+        """
+        if not self.enabled:
+            return False
+        parsed = _parse_write(cmd)
+        if parsed is None:
+            return False
+        settings, value, channels = parsed
+        return all(
+            self._values.get((setting, ch)) == value
+            for setting in settings
+            for ch in channels
+        )
+
+    def _before(self, cmd: str):
+        header = cmd.partition(" ")[0]
+        if header == "*RST":
+            self.invalidate()
+        elif header == "*GTL":
+            self.invalidate()
+            self.enabled = False
+        elif header == "*LLO":
+            self.enabled = True
+
+    def _after(self, cmd: str, ret: str):
+        head, channels = split_channel_list(cmd)
+        if channels is not None and head == ":VOLT EMCY_OFF":
+            self.invalidate(channels)
+            return
+        parsed = _parse_write(cmd)
+        if parsed is None:
+            return
+        settings, value, channels = parsed
+        for setting in settings:
+            for ch in channels:
+                if ret == cmd and self.enabled:
+                    self._values[(setting, ch)] = value
+                else:
+                    self._values.pop((setting, ch), None)
+
+    def _confirm_read(self, query: str, channels: List[int], response: str):
+        setting, decode = QUERIES[query], COMMANDS[query]
+        values = response.split(",")
+        if len(values) != len(channels):
+            return
+        for ch, value in zip(channels, values):
+            try:
+                self._values[(setting, ch)] = decode(value)
+            except ValueError:
+                self._values.pop((setting, ch), None)
+
+    def _pending_read(self, cmd: str) -> Optional[Tuple[str, List[int]]]:
+        if not self.enabled:
+            return None
+        head, channels = split_channel_list(cmd)
+        if channels is None or head not in QUERIES:
+            return None
+        return head, channels
+
+    def query(self, cmd: str) -> str:
+        self._pending = None
+        if self.is_redundant(cmd):
+            self.skipped += 1
+            return cmd
+        self._before(cmd)
+        ret = self.transport.query(cmd)
+        if "?" in cmd:
+            if ret == cmd:
+                self._pending = self._pending_read(cmd)
+        else:
+            self._after(cmd, ret)
+        return ret
+
+    def read(self) -> str:
+        response = self.transport.read()
+        if self._pending is not None:
+            self._confirm_read(*self._pending, response)
+            self._pending = None
+        return response
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        self._pending = None
+        replies: List[Optional[List[str]]] = []
+        forwarded = []
+        for cmd in cmds:
+            if self.is_redundant(cmd):
+                self.skipped += 1
+                replies.append([cmd])
+            else:
+                self._before(cmd)
+                replies.append(None)
+                forwarded.append(cmd)
+
+        forwarded_replies = iter(pipeline(self.transport, forwarded))
+        for index, cmd in enumerate(cmds):
+            if replies[index] is not None:
+                continue
+            lines = next(forwarded_replies)
+            replies[index] = lines
+            if "?" not in cmd:
+                self._after(cmd, lines[0])
+                continue
+            pending = self._pending_read(cmd) if lines[0] == cmd else None
+            if pending is not None and len(lines) > 1:
+                self._confirm_read(*pending, lines[1])
+        return replies
+
+    def close(self):
+        self.transport.close()
@@ -1,6 +1,9 @@
+from __future__ import annotations
+
 from enum import IntEnum
-from typing import Dict, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from .codec import Endpoint
 from .current import Current
 from .register import (
     ChannelControlRegister,
@@ -11,6 +14,65 @@ from .register import (
 from .transport import DeviceTransport
 from .voltage import Voltage
 
+if TYPE_CHECKING:
+    from .module import NHR
+    from .monitor import Callback, Subscription
+
+
+def channel_list(channels: Sequence[int]) -> str:
+    """
+    Format channel indices as an NHR channel list, e.g. `(@0-3)` or `(@0,2)`
+
+    Args:
+        channels (Sequence[int]): channel indices
+
+    Returns:
+        str: channel list
+    """
+    channels = list(channels)
+    if not channels:
+        raise ValueError("channel list is empty")
+    if len(channels) > 1 and channels == list(range(channels[0], channels[-1] + 1)):
+        return f"(@{channels[0]}-{channels[-1]})"
+    return f"(@{','.join(str(ch) for ch in channels)})"
+
+
+def parse_channel_list(spec: str) -> List[int]:
+    """
+    Parse a channel list such as `0`, `0,2` or `0-3`
+
+    Args:
+        spec (str): channel list without the `(@` `)` delimiters
+
+    Returns:
+        List[int]: channel indices
+    """
+    channels: List[int] = []
+    for part in spec.split(","):
+        if "-" in part:
+            start, stop = part.split("-")
+            channels.extend(range(int(start), int(stop) + 1))
+        else:
+            channels.append(int(part))
+    return channels
+
+
+def split_channel_list(cmd: str) -> Tuple[str, Optional[List[int]]]:
+    """
+    Split a command into the part before the channel list and the channel indices
+
+    Args:
+        cmd (str): command, e.g. `:VOLT 10,(@0-3)` or `:MEAS:VOLT? (@1)`
+
+    Returns:
+        Tuple[str, Optional[List[int]]]: command without channel list, e.g.
+            `:VOLT 10`, and the channels, None for module commands
+    """
+    if cmd.endswith(")") and "(@" in cmd:
+        head, spec = cmd.rsplit("(@", 1)
+        return head.rstrip(", "), parse_channel_list(spec[:-1])
+    return cmd, None
+
 
 class Polarity(IntEnum):
     NEGATIVE = -1
@@ -18,27 +80,48 @@ class Polarity(IntEnum):
 
 
 class Channel:
-    def __init__(self, device: DeviceTransport, channel: int):
-        self._device = device
+    __slots__ = ("_channel", "_module", "_endpoint", "_voltage", "_current")
+
+    def __init__(
+        self, device: DeviceTransport, channel: int, module: Optional[NHR] = None
+    ):
         self._channel = channel
-        self._voltage = Voltage(self._device, self._channel)
-        self._current = Current(self._device, self._channel)
+        self._module = module
+        self._endpoint = Endpoint(device, channel, f"channel {channel}")
+        self._voltage = Voltage(device, channel)
+        self._current = Current(device, channel)
 
     def _query(self, cmd: str) -> str:
-        ret = self._device.query(f"{cmd} (@{self._channel})")
-        if ret != f"{cmd} (@{self._channel})":
-            raise ValueError(
-                f"channel {self._channel} error in command {cmd}, NHR returned {ret}"
-            )
-        return self._device.read()
+        return self._endpoint.query(cmd)
 
     def _write(self, cmd: str):
-        cmd = f"{cmd},(@{self._channel})"
-        ret = self._device.query(cmd)
-        if ret != cmd:
-            raise ValueError(
-                f"channel {self._channel} error in command {cmd}, NHR returned {ret}"
+        self._endpoint.write(cmd)
+
+    def subscribe(
+        self,
+        callback: Callback,
+        events: Optional[Iterable[ChannelEventRegister]] = None,
+    ) -> Subscription:
+        """
+        Call `callback` from a worker thread when channel events are raised or
+        cleared, and start the module background monitor if needed
+
+        Args:
+            callback (Callback): called with an `EventChange`
+            events (Iterable[ChannelEventRegister], optional): events of interest,
+                all if None
+
+        Returns:
+            Subscription: handle to cancel the subscription
+        """
+        if self._module is None:
+            raise RuntimeError(
+                f"channel {self._channel} is not attached to an NHR module"
             )
+        monitor = self._module.monitor
+        subscription = monitor.subscribe(callback, events, channel=self._channel)
+        monitor.start()
+        return subscription
 
     @property
     def voltage(self) -> Voltage:
@@ -50,7 +133,7 @@ class Channel:
 
     @property
     def on_state(self) -> bool:
-        return bool(int(self._query(":READ:VOLT:ON?")))
+        return bool(self._endpoint.get(":READ:VOLT:ON?"))
 
     def on(self):
         self._write(":VOLT ON")
@@ -69,7 +152,7 @@ class Channel:
         Returns:
             bool: channel emergency
         """
-        return bool(int(self._query(":READ:VOLT:EMCY?")))
+        return bool(self._endpoint.get(":READ:VOLT:EMCY?"))
 
     def emergency_clear(self):
         """
@@ -85,19 +168,19 @@ class Channel:
 
     @property
     def control_register(self) -> Tuple[ChannelControlRegister, ...]:
-        control = int(self._query(":READ:CHAN:CONT?"))
+        control = self._endpoint.get(":READ:CHAN:CONT?")
         set_bits = get_set_bits(control, 32)
         return tuple([ChannelControlRegister(bit) for bit in set_bits])
 
     @property
     def status_register(self) -> Tuple[ChannelStatusRegister, ...]:
-        status = int(self._query(":READ:CHAN:STAT?"))
+        status = self._endpoint.get(":READ:CHAN:STAT?")
         set_bits = get_set_bits(status, 32)
         return tuple([ChannelStatusRegister(bit) for bit in set_bits])
 
     @property
     def event_register(self) -> Tuple[ChannelEventRegister, ...]:
-        event = int(self._query(":READ:CHAN:EV:STAT?"))
+        event = self._endpoint.get(":READ:CHAN:EV:STAT?")
         set_bits = get_set_bits(event, 32)
         return tuple([ChannelEventRegister(bit) for bit in set_bits])
 
@@ -130,7 +213,7 @@ class Channel:
 
     @property
     def output_mode(self) -> int:
-        return int(self._query(":CONF:OUTP:MODE?"))
+        return self._endpoint.get(":CONF:OUTP:MODE?")
 
     @property
     def output_mode_list(self) -> str:
@@ -138,7 +221,7 @@ class Channel:
 
     @property
     def inhibit(self) -> str:
-        inhibit = int(self._query(":CONF:INH:ACT?"))
+        inhibit = self._endpoint.get(":CONF:INH:ACT?")
         return self.inhibit_options[inhibit]
 
     @inhibit.setter
@@ -0,0 +1,292 @@
+"""
+Command line interface, `iseg-nhr monitor` streams readings of one or more modules.
+
+Only the modules needed by a command are imported, so the interface starts fast.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+RAILS: Tuple[str, ...] = ("P24V", "N24V", "P12V", "N12V", "P5V", "P3V")
+CSV_COLUMNS: Tuple[str, ...] = (
+    "time",
+    "port",
+    "cycle",
+    "channel",
+    "voltage",
+    "current",
+    "status",
+    "temperature",
+    *(rail.lower() for rail in RAILS),
+)
+
+
+def snapshot_commands(channels: int) -> List[str]:
+    """
+    Queries of one snapshot: channel list queries of the measured voltages,
+    currents and status registers, the temperature and the supply rails
+    """
+    from .channel import channel_list
+
+    channel_spec = channel_list(range(channels))
+    return [
+        f":MEAS:VOLT? {channel_spec}",
+        f":MEAS:CURR? {channel_spec}",
+        f":READ:CHAN:STAT? {channel_spec}",
+        ":READ:MOD:TEMP?",
+        *(f":READ:MOD:SUP:{rail}?" for rail in RAILS),
+    ]
+
+
+def read_snapshot(nhr: NHR) -> Dict[str, Any]:
+    """
+    Read all channels and module quantities of `nhr` in a single burst
+
+    Returns:
+        Dict[str, Any]: `voltage`, `current` and `status` lists per channel,
+        `temperature` and one entry per supply rail, e.g. `p24v`
+    """
+    from .codec import AMPERES, COMMANDS, INTEGER, VOLTS, Values
+
+    voltages, currents, statuses, temperature, *rails = nhr._pipeline(
+        snapshot_commands(nhr._channels)
+    )
+    snapshot: Dict[str, Any] = {
+        "voltage": Values(VOLTS)(voltages),
+        "current": Values(AMPERES)(currents),
+        "status": Values(INTEGER)(statuses),
+        "temperature": COMMANDS[":READ:MOD:TEMP?"](temperature),
+    }
+    for rail, value in zip(RAILS, rails):
+        snapshot[rail.lower()] = VOLTS(value)
+    return snapshot
+
+
+class JsonLinesWriter:
+    """
+    One JSON object per module and cycle
+    """
+
+    def __init__(self, out: TextIO):
+        self._out = out
+
+    def write(self, timestamp: float, port: str, cycle: int, snapshot: Dict):
+        record = {"time": timestamp, "port": port, "cycle": cycle, **snapshot}
+        self._out.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class CsvWriter:
+    """
+    One row per channel and cycle, module quantities repeated on every row
+    """
+
+    def __init__(self, out: TextIO):
+        self._writer = csv.writer(out, lineterminator="\n")
+        self._writer.writerow(CSV_COLUMNS)
+
+    def write(self, timestamp: float, port: str, cycle: int, snapshot: Dict):
+        module = [snapshot["temperature"], *(snapshot[r.lower()] for r in RAILS)]
+        self._writer.writerows(
+            [timestamp, port, cycle, channel, voltage, current, status, *module]
+            for channel, (voltage, current, status) in enumerate(
+                zip(snapshot["voltage"], snapshot["current"], snapshot["status"])
+            )
+        )
+
+
+WRITERS = {"jsonl": JsonLinesWriter, "csv": CsvWriter}
+
+
+@dataclass
+class MonitorReport:
+    """
+    Outcome of a monitor run
+
+    Attributes:
+        cycles (int): completed cycles
+        dropped (int): cycles skipped because a cycle overran its slot
+        errors (int): failed module readouts
+        elapsed (float): duration of the run [s]
+    """
+
+    cycles: int = 0
+    dropped: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """
+        Achieved cycle rate [Hz]
+        """
+        return self.cycles / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.cycles} cycles in {self.elapsed:.1f} s, {self.rate:.2f} Hz,"
+            f" {self.dropped} dropped, {self.errors} errors"
+        )
+
+
+def monitor(
+    modules: Sequence[Tuple[str, NHR]],
+    out: TextIO,
+    format: str = "jsonl",
+    rate: float = 1.0,
+    cycles: Optional[int] = None,
+    duration: Optional[float] = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+    timestamp: Callable[[], float] = time.time,
+) -> MonitorReport:
+    """
+    Stream snapshots of several modules at a fixed rate
+
+    Cycles are scheduled from the start so delays do not accumulate. A cycle that
+    overruns by more than one slot skips the missed slots, which are counted as
+    dropped. Stops after `cycles` cycles, `duration` seconds or on
+    KeyboardInterrupt.
+
+    Args:
+        modules (Sequence[Tuple[str, NHR]]): port name and module
+        out (TextIO): destination, flushed after every cycle
+        format (str): `jsonl` or `csv`
+        rate (float): cycles per second [Hz]
+
+    Returns:
+        MonitorReport: achieved rate, dropped cycles and errors
+    """
+    if rate <= 0:
+        raise ValueError(f"rate must be positive, not {rate}")
+    if format not in WRITERS:
+        raise ValueError(f"unknown format {format}, use one of {sorted(WRITERS)}")
+    writer = WRITERS[format](out)
+    interval = 1.0 / rate
+    report = MonitorReport()
+    start = due = clock()
+    try:
+        while cycles is None or report.cycles < cycles:
+            now = clock()
+            if duration is not None and now - start >= duration:
+                break
+            if now < due:
+                sleep(due - now)
+            wall = timestamp()
+            for port, nhr in modules:
+                try:
+                    snapshot = read_snapshot(nhr)
+                except (OSError, ValueError):
+                    report.errors += 1
+                    continue
+                writer.write(wall, port, report.cycles, snapshot)
+            out.flush()
+            report.cycles += 1
+            due += interval
+            late = clock() - due
+            if late >= interval:
+                missed = math.floor(late / interval)
+                report.dropped += missed
+                due += missed * interval
+    except KeyboardInterrupt:
+        pass
+    report.elapsed = clock() - start
+    return report
+
+
+def _run_monitor(args: argparse.Namespace) -> int:
+    from .module import NHR
+
+    modules = []
+    try:
+        for port in args.ports:
+            modules.append(
+                (
+                    port,
+                    NHR(
+                        port,
+                        baud_rate=args.baud_rate,
+                        timeout=args.timeout,
+                        retries=args.retries,
+                    ),
+                )
+            )
+        out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+        try:
+            report = monitor(
+                modules,
+                out,
+                format=args.format,
+                rate=args.rate,
+                cycles=args.cycles,
+                duration=args.duration,
+            )
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    finally:
+        for _, nhr in modules:
+            nhr.close()
+    print(report.summary(), file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="iseg-nhr", description="Tools for ISEG NHR high-voltage modules"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    monitor_parser = commands.add_parser(
+        "monitor",
+        help="stream channel and module readings",
+        description="Stream voltages, currents, status, temperature and supply"
+        " rails of one or more modules as JSON lines or CSV",
+    )
+    monitor_parser.add_argument("ports", nargs="+", help="serial ports")
+    monitor_parser.add_argument(
+        "-r", "--rate", type=float, default=1.0, help="cycles per second"
+    )
+    monitor_parser.add_argument(
+        "-f", "--format", choices=sorted(WRITERS), default="jsonl"
+    )
+    monitor_parser.add_argument(
+        "-o", "--output", default="-", help="output file, - for stdout"
+    )
+    monitor_parser.add_argument("-n", "--cycles", type=int, help="stop after cycles")
+    monitor_parser.add_argument(
+        "-d", "--duration", type=float, help="stop after seconds"
+    )
+    monitor_parser.add_argument("--baud-rate", type=int, default=9600)
+    monitor_parser.add_argument(
+        "--timeout", type=float, default=1.0, help="read timeout [s]"
+    )
+    monitor_parser.add_argument(
+        "--retries", type=int, help="resynchronize and retry failed reads"
+    )
+    monitor_parser.set_defaults(run=_run_monitor)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.run(args)
@@ -0,0 +1,168 @@
+"""
+Central command table with precompiled channel commands and typed decoders.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+from .transport import DeviceTransport
+
+_T = TypeVar("_T")
+
+
+class Number(Generic[_T]):
+    """
+    Decode a number with an optional unit suffix, e.g. `1.00000E+03V`
+    """
+
+    __slots__ = ("unit", "type", "_length")
+
+    def __init__(self, unit: str = "", type: Callable[[str], _T] = float):
+        self.unit = unit
+        self.type = type
+        self._length = len(unit)
+
+    def __repr__(self) -> str:
+        return f"Number({self.unit!r}, {self.type.__name__})"
+
+    def __call__(self, response: str) -> _T:
+        if self._length and response.endswith(self.unit):
+            response = response[: -self._length]
+        return self.type(response)
+
+
+class Values(Generic[_T]):
+    """
+    Decode a comma separated list, e.g. the response to a channel list query
+    """
+
+    __slots__ = ("decoder",)
+
+    def __init__(self, decoder: Callable[[str], _T]):
+        self.decoder = decoder
+
+    def __repr__(self) -> str:
+        return f"Values({self.decoder!r})"
+
+    def __call__(self, response: str) -> List[_T]:
+        return [self.decoder(value) for value in response.split(",")]
+
+
+def _text(response: str) -> str:
+    return response
+
+
+VOLTS = Number("V")
+AMPERES = Number("A")
+INTEGER = Number("", int)
+
+# response decoder of every query, without channel suffix
+COMMANDS: Dict[str, Callable[[str], Any]] = {
+    ":MEAS:VOLT?": VOLTS,
+    ":READ:VOLT?": VOLTS,
+    ":READ:VOLT:LIM?": VOLTS,
+    ":READ:VOLT:NOM?": VOLTS,
+    ":READ:VOLT:MODE?": VOLTS,
+    ":READ:VOLT:MODE:LIST?": _text,
+    ":READ:VOLT:BOU?": VOLTS,
+    ":READ:VOLT:ON?": INTEGER,
+    ":READ:VOLT:EMCY?": INTEGER,
+    ":MEAS:CURR?": AMPERES,
+    ":READ:CURR:LIM?": AMPERES,
+    ":READ:CURR:NOM?": AMPERES,
+    ":READ:CURR:MODE?": AMPERES,
+    ":READ:CURR:MODE:LIST?": _text,
+    ":READ:CURR:BOU?": AMPERES,
+    ":READ:CHAN:CONT?": INTEGER,
+    ":READ:CHAN:STAT?": INTEGER,
+    ":READ:CHAN:EV:STAT?": INTEGER,
+    ":CONF:OUTP:POL?": _text,
+    ":CONF:OUTP:POL:LIST?": _text,
+    ":CONF:OUTP:MODE?": INTEGER,
+    ":CONF:OUTP:MODE:LIST?": _text,
+    ":CONF:INH:ACT?": INTEGER,
+    **{
+        f":{prefix}:{quantity}{suffix}?": Number(f"{unit}/s")
+        for quantity, unit in (("VOLT", "V"), ("CURR", "A"))
+        for prefix, suffix in (
+            ("READ:RAMP", ""),
+            ("READ:RAMP", ":MIN"),
+            ("READ:RAMP", ":MAX"),
+            ("CONF:RAMP", ":UP"),
+            ("CONF:RAMP", ":DOWN"),
+        )
+    },
+    "*OPC?": INTEGER,
+    ":SYS:USER:CONF?": INTEGER,
+    ":READ:MOD:CHAN?": INTEGER,
+    ":READ:MOD:CONT?": INTEGER,
+    ":READ:MOD:STAT?": INTEGER,
+    ":READ:MOD:EV:STAT?": INTEGER,
+    ":READ:MOD:TEMP?": Number("C"),
+    **{
+        f":READ:MOD:SUP:{rail}?": VOLTS
+        for rail in ("P24V", "N24V", "P12V", "N12V", "P5V", "P3V")
+    },
+}
+
+
+class Endpoint:
+    """
+    Commands of one channel, or of the module if `channel` is None
+
+    The query string and expected echo of every command are built once per
+    endpoint and reused, responses are decoded with the decoder from `COMMANDS`.
+
+    Args:
+        device (DeviceTransport): transport
+        channel (int, optional): channel index
+        label (str): prefix of error messages, e.g. `channel 0 voltage`
+    """
+
+    __slots__ = ("device", "channel", "_error", "_queries", "_suffix")
+
+    def __init__(
+        self, device: DeviceTransport, channel: Optional[int] = None, label: str = ""
+    ):
+        self.device = device
+        self.channel = channel
+        self._error = f"{label} error in command" if label else "error in command"
+        self._queries: Dict[str, str] = {}
+        self._suffix = "" if channel is None else f",(@{channel})"
+
+    def _compile(self, cmd: str) -> str:
+        query = cmd if self.channel is None else f"{cmd} (@{self.channel})"
+        self._queries[cmd] = query
+        return query
+
+    def query(self, cmd: str) -> str:
+        """
+        Send a query and return the raw response
+
+        Args:
+            cmd (str): query without channel suffix, e.g. `:MEAS:VOLT?`
+        """
+        query = self._queries.get(cmd) or self._compile(cmd)
+        ret = self.device.query(query)
+        if ret != query:
+            raise ValueError(f"{self._error} {cmd}, NHR returned {ret}")
+        return self.device.read()
+
+    def get(self, cmd: str) -> Any:
+        """
+        Send a query from `COMMANDS` and return the decoded response
+        """
+        return COMMANDS[cmd](self.query(cmd))
+
+    def write(self, cmd: str):
+        """
+        Send a write, adding the channel suffix
+
+        Args:
+            cmd (str): command with value, e.g. `:VOLT 10`
+        """
+        cmd = f"{cmd}{self._suffix}"
+        ret = self.device.query(cmd)
+        if ret != cmd:
+            raise ValueError(f"{self._error} {cmd}, NHR returned {ret}")
@@ -0,0 +1,251 @@
+"""
+Declarative module configuration: read back, diff and apply only the changes.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .channel import Polarity, channel_list
+from .codec import COMMANDS
+from .register import ControlRegister
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+
+class Parameter(NamedTuple):
+    query: str
+    write: str
+    parse: Callable[[str], Any]
+    normalize: Callable[[Any], Any]
+    format: Callable[[Any], str]
+
+
+def _parameter(
+    query: str,
+    write: str,
+    parse: Optional[Callable[[str], Any]] = None,
+    normalize: Callable[[Any], Any] = float,
+    format: Callable[[Any], str] = str,
+) -> Parameter:
+    # responses are decoded as in `COMMANDS` unless `parse` is given
+    return Parameter(query, write, parse or COMMANDS[query], normalize, format)
+
+
+def _polarity(value: Any) -> Polarity:
+    if isinstance(value, str):
+        value = value.lower()
+        if value in ("p", "positive", "+"):
+            return Polarity.POSITIVE
+        if value in ("n", "negative", "-"):
+            return Polarity.NEGATIVE
+        raise ValueError(f"invalid polarity {value}")
+    return Polarity(value)
+
+
+# channel parameters in the order in which they are written: polarity first, while
+# the output is still at its previous setpoint, and the new setpoint last, after
+# ramp speeds and bounds are in place
+PARAMETERS: Dict[str, Parameter] = {
+    "polarity": _parameter(
+        ":CONF:OUTP:POL?",
+        ":CONF:OUTP:POL",
+        _polarity,
+        _polarity,
+        lambda value: value.name[0].lower(),
+    ),
+    "inhibit": _parameter(":CONF:INH:ACT?", ":CONF:INH:ACT", normalize=int),
+    "current_ramp_up": _parameter(":CONF:RAMP:CURR:UP?", ":CONF:RAMP:CURR:UP"),
+    "current_ramp_down": _parameter(":CONF:RAMP:CURR:DOWN?", ":CONF:RAMP:CURR:DOWN"),
+    "ramp_up": _parameter(":CONF:RAMP:VOLT:UP?", ":CONF:RAMP:VOLT:UP"),
+    "ramp_down": _parameter(":CONF:RAMP:VOLT:DOWN?", ":CONF:RAMP:VOLT:DOWN"),
+    "current_bounds": _parameter(":READ:CURR:BOU?", ":CURR:BOU"),
+    "voltage_bounds": _parameter(":READ:VOLT:BOU?", ":VOLT:BOU"),
+    "setpoint": _parameter(":READ:VOLT?", ":VOLT"),
+}
+
+# module control register bits that can be written, and their commands
+CONTROL_COMMANDS: Dict[ControlRegister, str] = {
+    ControlRegister.SetKillEnable: ":CONF:KILL",
+    ControlRegister.SetFineAdjustment: ":CONF:ADJUST",
+}
+
+
+@dataclass(frozen=True)
+class Change:
+    """
+    Difference between the module state and the requested configuration
+
+    Attributes:
+        channel (int, optional): channel index, None for module settings
+        name (str): parameter name
+        current: value read back from the module
+        desired: requested value
+        command (str): command that applies the change
+    """
+
+    channel: Optional[int]
+    name: str
+    current: Any
+    desired: Any
+    command: str
+
+
+def _equal(current: Any, desired: Any, rel_tol: float, abs_tol: float) -> bool:
+    if isinstance(desired, float):
+        return math.isclose(current, desired, rel_tol=rel_tol, abs_tol=abs_tol)
+    return current == desired
+
+
+def _normalize(
+    config: Mapping[str, Any], inhibit_options: Sequence[int]
+) -> Tuple[Dict[ControlRegister, bool], Dict[int, Dict[str, Any]]]:
+    unknown = set(config) - {"control", "channels"}
+    if unknown:
+        raise ValueError(f"unknown configuration keys {sorted(unknown)}")
+
+    control = {}
+    for bit, enabled in config.get("control", {}).items():
+        if not isinstance(bit, ControlRegister):
+            bit = ControlRegister[bit]
+        if bit not in CONTROL_COMMANDS:
+            raise ValueError(f"control register bit {bit.name} can not be configured")
+        control[bit] = bool(enabled)
+
+    channels: Dict[int, Dict[str, Any]] = {}
+    for ch, settings in config.get("channels", {}).items():
+        unknown = set(settings) - set(PARAMETERS)
+        if unknown:
+            raise ValueError(f"channel {ch} unknown parameters {sorted(unknown)}")
+        channels[int(ch)] = {
+            name: PARAMETERS[name].normalize(value) for name, value in settings.items()
+        }
+        inhibit = channels[int(ch)].get("inhibit")
+        if inhibit is not None and inhibit not in inhibit_options:
+            raise ValueError(
+                f"channel {ch} inhibit option {inhibit} not available, choose from"
+                f" {list(inhibit_options)}"
+            )
+    return control, channels
+
+
+def diff(
+    nhr: NHR,
+    config: Mapping[str, Any],
+    rel_tol: float = 1e-6,
+    abs_tol: float = 1e-12,
+) -> List[Change]:
+    """
+    Read back the configured parameters in one burst and list the differences
+
+    Args:
+        nhr (NHR): module
+        config (Mapping[str, Any]): configuration with optional `control` and
+            `channels` sections
+        rel_tol (float): relative tolerance for numeric parameters
+        abs_tol (float): absolute tolerance for numeric parameters
+
+    Returns:
+        List[Change]: changes in the order in which they should be written
+    """
+    control, channels = _normalize(config, list(nhr.channel(0).inhibit_options))
+    for ch in channels:
+        nhr.channel(ch)
+
+    queries = []
+    if control:
+        queries.append((None, "control", ":READ:MOD:CONT?"))
+    for name, parameter in PARAMETERS.items():
+        configured = [ch for ch in sorted(channels) if name in channels[ch]]
+        if configured:
+            queries.append(
+                (configured, name, f"{parameter.query} {channel_list(configured)}")
+            )
+    reversing = sorted(ch for ch in channels if "polarity" in channels[ch])
+    if reversing:
+        queries.append(
+            (reversing, "measured", f":MEAS:VOLT? {channel_list(reversing)}")
+        )
+    responses = nhr._pipeline([cmd for _, _, cmd in queries])
+
+    current: Dict[Optional[int], Dict[str, Any]] = {}
+    for (configured, name, cmd), response in zip(queries, responses):
+        if configured is None:
+            current[None] = {name: COMMANDS[cmd](response)}
+            continue
+        parse = (
+            PARAMETERS[name].parse
+            if name in PARAMETERS
+            else COMMANDS[cmd.partition(" ")[0]]
+        )
+        for ch, value in zip(configured, response.split(",")):
+            current.setdefault(ch, {})[name] = parse(value)
+
+    changes = []
+    for bit, enabled in control.items():
+        is_set = bool(current[None]["control"] >> bit.value & 1)
+        if is_set != enabled:
+            changes.append(
+                Change(
+                    None,
+                    bit.name,
+                    is_set,
+                    enabled,
+                    f"{CONTROL_COMMANDS[bit]} {int(enabled)}",
+                )
+            )
+    for name, parameter in PARAMETERS.items():
+        for ch in sorted(channels):
+            if name not in channels[ch]:
+                continue
+            desired = channels[ch][name]
+            value = current[ch][name]
+            if _equal(value, desired, rel_tol, abs_tol):
+                continue
+            if name == "polarity" and current[ch]["measured"] != 0:
+                raise ValueError(
+                    f"channel {ch} can't reverse polarity with non-zero voltage"
+                    f" {current[ch]['measured']} V"
+                )
+            changes.append(
+                Change(
+                    ch,
+                    name,
+                    value,
+                    desired,
+                    f"{parameter.write} {parameter.format(desired)},(@{ch})",
+                )
+            )
+    return changes
+
+
+def apply(nhr: NHR, config: Mapping[str, Any], **tolerances: float) -> List[Change]:
+    """
+    Write only the parameters that differ from `config`, as one burst
+
+    Args:
+        nhr (NHR): module
+        config (Mapping[str, Any]): configuration, see `diff`
+        **tolerances (float): `rel_tol` and `abs_tol` passed on to `diff`
+
+    Returns:
+        List[Change]: applied changes
+    """
+    changes = diff(nhr, config, **tolerances)
+    if changes:
+        nhr._pipeline([change.command for change in changes])
+    return changes
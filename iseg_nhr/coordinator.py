@@ -0,0 +1,223 @@
+"""
+Lockstep ramping of a group of channels with a bounded voltage difference.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence, Tuple, Union
+
+from .channel import channel_list
+from .codec import COMMANDS, INTEGER, VOLTS, Values
+from .register import ChannelStatusRegister
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+_RAMPING = 1 << ChannelStatusRegister.IsVoltageRamp.value
+_ON = 1 << ChannelStatusRegister.IsOn.value
+# status bits of a channel that was switched off by the module
+_TRIPPED = sum(
+    1 << bit.value
+    for bit in (
+        ChannelStatusRegister.IsEmergencyOff,
+        ChannelStatusRegister.IsCurrentTrip,
+        ChannelStatusRegister.IsArcNumberExceeded,
+        ChannelStatusRegister.IsExternalInhibit,
+    )
+)
+_SPEEDS = Values(COMMANDS[":CONF:RAMP:VOLT:UP?"])
+# default ramp timeout: expected ramp time at the slowest ramp speed times the
+# factor, plus the slack and one poll interval per step [s]
+TIMEOUT_FACTOR = 2.0
+TIMEOUT_SLACK = 5.0
+_VOLTAGES = Values(VOLTS)
+_STATUSES = Values(INTEGER)
+
+
+@dataclass
+class RampReport:
+    """
+    Summary of a coordinated ramp
+
+    Attributes:
+        steps (int): number of setpoint steps
+        polls (int): number of readbacks
+        duration (float): time from the first step to the end of the ramp [s]
+        max_spread (float): largest measured voltage difference in the group [V]
+    """
+
+    steps: int = 0
+    polls: int = 0
+    duration: float = 0.0
+    max_spread: float = 0.0
+
+
+class RampCoordinator:
+    """
+    Ramp a group of channels in lockstep
+
+    The setpoints of all channels are moved along a common linear profile in steps
+    of at most `step` volts. Every step is written in one burst, a single channel
+    list write if all setpoints are equal, and the next step is issued only after
+    a readback of the measured voltages and status registers, sent as one burst,
+    shows that all channels have settled. If the measured voltages in the group
+    ever differ by more than `max_difference` the channels are held at their
+    measured voltage and a ValueError is raised; the same happens when a channel
+    is off or was tripped. Without `timeout` a ramp times out after twice the time
+    it takes at the slowest configured ramp speed, plus some slack.
+    """
+
+    def __init__(
+        self,
+        nhr: NHR,
+        channels: Sequence[int],
+        max_difference: float,
+        step: Optional[float] = None,
+        tolerance: float = 1.0,
+        poll_interval: float = 0.1,
+        timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if not channels:
+            raise ValueError("channel group is empty")
+        if max_difference <= 0:
+            raise ValueError(f"max_difference must be positive, not {max_difference}")
+        for ch in channels:
+            nhr.channel(ch)
+
+        self._nhr = nhr
+        self.channels = tuple(channels)
+        self.max_difference = max_difference
+        self.step = max_difference / 2 if step is None else step
+        self.tolerance = tolerance
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._clock = clock
+        self._sleep = sleep
+        self._list = channel_list(self.channels)
+
+    def readback(self) -> Tuple[List[float], List[int]]:
+        """
+        Read measured voltages and status registers of the group in one burst
+
+        Returns:
+            Tuple[List[float], List[int]]: measured voltages [V] and status values
+        """
+        voltages, statuses = self._nhr._pipeline(
+            [f":MEAS:VOLT? {self._list}", f":READ:CHAN:STAT? {self._list}"]
+        )
+        return _VOLTAGES(voltages), _STATUSES(statuses)
+
+    def _write_setpoints(self, setpoints: Sequence[float]):
+        if all(setpoint == setpoints[0] for setpoint in setpoints):
+            self._nhr._write(f":VOLT {setpoints[0]},{self._list}")
+            return
+        self._nhr._pipeline(
+            [
+                f":VOLT {setpoint},(@{ch})"
+                for ch, setpoint in zip(self.channels, setpoints)
+            ]
+        )
+
+    def _hold(self, voltages: Sequence[float]):
+        self._write_setpoints([round(voltage, 3) for voltage in voltages])
+
+    def ramp_to(self, targets: Union[float, Sequence[float]]) -> RampReport:
+        """
+        Ramp the group to `targets`
+
+        Args:
+            targets (float | Sequence[float]): common target or one target per
+                channel [V]
+
+        Returns:
+            RampReport: ramp summary
+        """
+        if isinstance(targets, (int, float)):
+            targets = [float(targets)] * len(self.channels)
+        targets = [float(target) for target in targets]
+        if len(targets) != len(self.channels):
+            raise ValueError(
+                f"expected {len(self.channels)} targets, got {len(targets)}"
+            )
+        if max(targets) - min(targets) > self.max_difference:
+            raise ValueError(
+                f"targets {targets} differ by more than {self.max_difference} V"
+            )
+
+        cmds = [f":READ:VOLT? {self._list}"]
+        if self.timeout is None:
+            cmds += [f":CONF:RAMP:VOLT:UP? {self._list}"]
+            cmds += [f":CONF:RAMP:VOLT:DOWN? {self._list}"]
+        response, *speeds = self._nhr._pipeline(cmds)
+        start = _VOLTAGES(response)
+        span = max(abs(t - s) for t, s in zip(targets, start))
+        steps = max(math.ceil(span / self.step), 1)
+        timeout = self.timeout
+        if timeout is None:
+            speed = min(min(_SPEEDS(values)) for values in speeds)
+            if speed <= 0:
+                raise ValueError(f"channels {self.channels} ramp speed is {speed}")
+            timeout = (
+                TIMEOUT_FACTOR * span / speed
+                + TIMEOUT_SLACK
+                + steps * self.poll_interval
+            )
+
+        report = RampReport()
+        began = self._clock()
+        for k in range(1, steps + 1):
+            setpoints = [s + (t - s) * k / steps for s, t in zip(start, targets)]
+            if k == steps:
+                setpoints = targets
+            self._write_setpoints(setpoints)
+            report.steps += 1
+            self._settle(setpoints, report, began, timeout)
+        report.duration = self._clock() - began
+        return report
+
+    def _settle(
+        self,
+        setpoints: Sequence[float],
+        report: RampReport,
+        began: float,
+        timeout: float,
+    ):
+        while True:
+            voltages, statuses = self.readback()
+            report.polls += 1
+            spread = max(voltages) - min(voltages)
+            report.max_spread = max(report.max_spread, spread)
+            if spread > self.max_difference:
+                self._hold(voltages)
+                raise ValueError(
+                    f"channels {self.channels} voltage difference {spread} V exceeds"
+                    f" {self.max_difference} V, holding at {voltages}"
+                )
+            stopped = [
+                ch
+                for ch, status in zip(self.channels, statuses)
+                if not status & _ON or status & _TRIPPED
+            ]
+            if stopped:
+                self._hold(voltages)
+                raise ValueError(
+                    f"channels {stopped} are off or tripped, holding {self.channels}"
+                    f" at {voltages}"
+                )
+            if all(
+                abs(voltage - setpoint) <= self.tolerance and not status & _RAMPING
+                for voltage, setpoint, status in zip(voltages, setpoints, statuses)
+            ):
+                return
+            if self._clock() - began > timeout:
+                self._hold(voltages)
+                raise TimeoutError(
+                    f"channels {self.channels} did not reach {list(setpoints)} within"
+                    f" {timeout} s"
+                )
+            self._sleep(self.poll_interval)
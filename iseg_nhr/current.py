@@ -1,9 +1,6 @@
-from typing import Callable, TypeVar
-
+from .codec import Endpoint
 from .ramp import Ramp
-from .transport import DeviceTransport, remove_suffix
-
-_T = TypeVar("_T")
+from .transport import DeviceTransport
 
 
 class Current:
@@ -11,36 +8,17 @@ class Current:
     Channel current
     """
 
+    __slots__ = ("_endpoint", "_ramp")
+
     def __init__(self, device: DeviceTransport, channel: int):
-        self._device = device
-        self._channel = channel
-        self._ramp = Ramp(self._device, channel, "CURR")
+        self._endpoint = Endpoint(device, channel, f"channel {channel} current")
+        self._ramp = Ramp(device, channel, "CURR")
 
     def _query(self, cmd: str) -> str:
-        ret = self._device.query(f"{cmd} (@{self._channel})")
-        if ret != f"{cmd} (@{self._channel})":
-            raise ValueError(
-                f"channel {self._channel} current error in command {cmd}, NHR returned"
-                f" {ret}"
-            )
-        return self._device.read()
-
-    def _query_type_conv_unit(
-        self,
-        cmd: str,
-        value_type: Callable[[str], _T],
-        unit: str = "A",
-    ) -> _T:
-        return value_type(remove_suffix(self._query(cmd), unit))
+        return self._endpoint.query(cmd)
 
     def _write(self, cmd: str):
-        cmd = f"{cmd},(@{self._channel})"
-        ret = self._device.query(cmd)
-        if ret != cmd:
-            raise ValueError(
-                f"channel {self._channel} current error in command {cmd}, NHR returned"
-                f" {ret}"
-            )
+        self._endpoint.write(cmd)
 
     @property
     def ramp(self) -> Ramp:
@@ -54,7 +32,7 @@ class Current:
         Returns:
             float: current [A]
         """
-        return self._query_type_conv_unit(":MEAS:CURR?", value_type=float)
+        return self._endpoint.get(":MEAS:CURR?")
 
     @property
     def limit(self) -> float:
@@ -64,7 +42,7 @@ class Current:
         Returns:
             float: current [A]
         """
-        return self._query_type_conv_unit(":READ:CURR:LIM?", value_type=float)
+        return self._endpoint.get(":READ:CURR:LIM?")
 
     @property
     def maximum(self) -> float:
@@ -74,7 +52,7 @@ class Current:
         Returns:
             float: current [A]
         """
-        return self._query_type_conv_unit(":READ:CURR:NOM?", value_type=float)
+        return self._endpoint.get(":READ:CURR:NOM?")
 
     @property
     def mode(self) -> float:
@@ -84,7 +62,7 @@ class Current:
         Returns:
             str: current mode [A]
         """
-        return self._query_type_conv_unit(":READ:CURR:MODE?", value_type=float)
+        return self._endpoint.get(":READ:CURR:MODE?")
 
     @property
     def mode_list(self) -> str:
@@ -104,7 +82,7 @@ class Current:
         Returns:
             float: current bounds [A]
         """
-        return self._query_type_conv_unit(":READ:CURR:BOU?", value_type=float)
+        return self._endpoint.get(":READ:CURR:BOU?")
 
     @bounds.setter
     def bounds(self, bounds: float):
@@ -0,0 +1,188 @@
+"""
+Dry-run transport recording commands and estimating their serial bus time.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence
+
+from .simulator import SimulatedModule
+from .transport import DeviceTransport, SerialTransport
+
+
+@dataclass(frozen=True)
+class Transaction:
+    """
+    A command with its replies and estimated bus time
+
+    Attributes:
+        command (str): command sent
+        lines (Sequence[str]): echo, and response for queries
+        seconds (float): estimated bus time; for pipelined commands the share of
+            the burst [s]
+        burst (int): index of the burst the command was sent in
+    """
+
+    command: str
+    lines: Sequence[str]
+    seconds: float
+    burst: int
+
+
+@dataclass
+class CostReport:
+    """
+    Recorded transactions and their estimated total bus time
+    """
+
+    transactions: List[Transaction] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return sum(transaction.seconds for transaction in self.transactions)
+
+    @property
+    def bursts(self) -> int:
+        return len({transaction.burst for transaction in self.transactions})
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.transactions)} commands in {self.bursts} bursts,"
+            f" {self.seconds * 1e3:.1f} ms estimated bus time"
+        )
+
+
+class DryRunTransport:
+    """
+    Transport that answers like a module without touching hardware and estimates
+    how long the same traffic would occupy the serial line
+
+    Each character costs a start bit, the data bits, an optional parity bit and the
+    stop bits at `baud_rate`. A single exchange costs the command, the device
+    `turnaround`, and the echo plus response. In a pipelined burst the module
+    receives the next command while answering the previous one, so the burst costs
+    the larger of all transmitted characters and the first command plus every
+    turnaround and reply.
+
+    Replies are generated by a `SimulatedModule`, or by `responder` if given.
+    `response_length` overrides the length of every response to model a firmware
+    with a different number format.
+    """
+
+    def __init__(
+        self,
+        channels: int = 4,
+        baud_rate: int = 9600,
+        data_bits: int = 8,
+        stop_bits: float = 1,
+        parity: str = "N",
+        turnaround: float = 0.002,
+        termination: str = "\r\n",
+        response_length: Optional[int] = None,
+        responder: Optional[DeviceTransport] = None,
+    ):
+        self.baud_rate = baud_rate
+        self.turnaround = turnaround
+        self.termination = termination
+        self.response_length = response_length
+        self.bits_per_character = 1 + data_bits + (parity != "N") + stop_bits
+        self._responder = (
+            responder
+            if responder is not None
+            else SerialTransport.from_serial(
+                SimulatedModule(channels=channels, timeout=0.0),
+                termination=termination,
+                clear_input_before_write=False,
+            )
+        )
+        self._reports: List[CostReport] = [CostReport()]
+        self._bursts = 0
+        self._pending: Optional[str] = None
+
+    @property
+    def report(self) -> CostReport:
+        """
+        All transactions recorded since construction or the last `reset`
+        """
+        return self._reports[0]
+
+    def reset(self):
+        self._reports[0] = CostReport()
+
+    @contextlib.contextmanager
+    def measure(self) -> Iterator[CostReport]:
+        """
+        Record the transactions issued inside a `with` block
+
+        Yields:
+            CostReport: transactions of the block
+        """
+        report = CostReport()
+        self._reports.append(report)
+        try:
+            yield report
+        finally:
+            self._reports.remove(report)
+
+    def characters(self, line: str) -> int:
+        return len(line) + len(self.termination)
+
+    def _reply_characters(self, lines: Sequence[str]) -> int:
+        count = self.characters(lines[0])
+        if len(lines) > 1:
+            length = self.response_length
+            count += (
+                self.characters(lines[1])
+                if length is None
+                else length + len(self.termination)
+            )
+        return count
+
+    def seconds(self, characters: int) -> float:
+        return characters * self.bits_per_character / self.baud_rate
+
+    def _record(self, transactions: Sequence[Transaction]):
+        for report in self._reports:
+            report.transactions.extend(transactions)
+
+    def query(self, cmd: str) -> str:
+        echo = self._responder.query(cmd)
+        lines = [echo]
+        if "?" in cmd:
+            self._pending = self._responder.read()
+            lines.append(self._pending)
+        seconds = self.turnaround + self.seconds(
+            self.characters(cmd) + self._reply_characters(lines)
+        )
+        self._record([Transaction(cmd, tuple(lines), seconds, self._bursts)])
+        self._bursts += 1
+        return echo
+
+    def read(self) -> str:
+        if self._pending is None:
+            raise TimeoutError("timed out waiting for NHR response")
+        response, self._pending = self._pending, None
+        return response
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        replies = self._responder.pipeline(cmds) if cmds else []
+        sent = [self.characters(cmd) for cmd in cmds]
+        received = [self._reply_characters(lines) for lines in replies]
+        if cmds:
+            burst = max(
+                self.seconds(sum(sent)),
+                self.seconds(sent[0] + sum(received)) + self.turnaround * len(cmds),
+            )
+            self._record(
+                [
+                    Transaction(cmd, tuple(lines), burst / len(cmds), self._bursts)
+                    for cmd, lines in zip(cmds, replies)
+                ]
+            )
+            self._bursts += 1
+        return replies
+
+    def close(self):
+        self._responder.close()
@@ -0,0 +1,467 @@
+"""
+Single-threaded multiplexing of many serial ports with `selectors`.
+"""
+
+from __future__ import annotations
+
+import os
+import selectors
+import time
+from collections import deque
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .channel import channel_list
+from .codec import AMPERES, VOLTS, Values
+
+# state machine yielding commands and receiving their reply lines
+Operation = Generator[str, List[str], Any]
+
+
+class Request:
+    """
+    A command sent through an `IOEngine` and its reply lines
+    """
+
+    def __init__(self, command: str):
+        self.command = command
+        self.lines: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.deadline = 0.0
+        self._callbacks: List[Callable[[Request], None]] = []
+
+    @property
+    def expected(self) -> int:
+        if "?" in self.command and self.lines[:1] in ([], [self.command]):
+            return 2
+        return 1
+
+    def result(self) -> List[str]:
+        """
+        Echo, and response for queries
+
+        Returns:
+            List[str]: reply lines
+        """
+        if not self.done:
+            raise RuntimeError(f"request {self.command} is not complete")
+        if self.error is not None:
+            raise self.error
+        return self.lines
+
+    def _finish(self, error: Optional[BaseException] = None):
+        self.error = error
+        self.done = True
+        for callback in self._callbacks:
+            callback(self)
+
+
+class Task:
+    """
+    Operation driven by an `IOEngine`, one command at a time
+    """
+
+    def __init__(self, engine: IOEngine, port: EnginePort, operation: Operation):
+        self._engine = engine
+        self._port = port
+        self._operation = operation
+        self.done = False
+        self._result: Any = None
+        self.error: Optional[BaseException] = None
+        self._advance(lambda: next(operation))
+
+    def _advance(self, step: Callable[[], str]):
+        try:
+            cmd = step()
+        except StopIteration as stop:
+            self._result = stop.value
+            self.done = True
+        except Exception as error:
+            self.error = error
+            self.done = True
+        else:
+            request = self._engine.submit(self._port, cmd)
+            request._callbacks.append(self._resume)
+            # requests on a closed port are finished by submit already
+            if request.done:
+                self._resume(request)
+
+    def _resume(self, request: Request):
+        if request.error is not None:
+            error = request.error
+            self._advance(lambda: self._operation.throw(error))
+        else:
+            self._advance(lambda: self._operation.send(request.lines))
+
+    def result(self) -> Any:
+        if not self.done:
+            raise RuntimeError("task is not complete")
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+
+class EnginePort:
+    """
+    Non-blocking serial port, or any object with a `fileno`, owned by an
+    `IOEngine`
+
+    Commands are sent one at a time; the next one is written once the echo, and
+    the response of a query, of the previous one has arrived or timed out.
+    """
+
+    def __init__(
+        self,
+        fileobj,
+        name: str,
+        termination: str = "\r\n",
+        encoding: str = "ascii",
+        timeout: float = 1.0,
+    ):
+        self.fileobj = fileobj
+        self.name = name
+        self.fd = fileobj.fileno()
+        os.set_blocking(self.fd, False)
+        self.timeout = timeout
+        self._termination = termination.encode(encoding)
+        self._encoding = encoding
+        self._queue: Deque[Request] = deque()
+        self._current: Optional[Request] = None
+        self._output = bytearray()
+        self._input = bytearray()
+        self.closed = False
+
+    def __repr__(self) -> str:
+        return f"EnginePort({self.name!r})"
+
+    @property
+    def busy(self) -> bool:
+        return self._current is not None or bool(self._queue)
+
+    def _start_next(self, now: float):
+        self._current = self._queue.popleft() if self._queue else None
+        if self._current is None:
+            return
+        # bytes left from an earlier command, e.g. after a timeout, are stale
+        self._input.clear()
+        self._current.deadline = now + self.timeout
+        self._output += self._current.command.encode(self._encoding)
+        self._output += self._termination
+
+    def _complete(self, now: float, error: Optional[BaseException] = None):
+        request, self._current = self._current, None
+        self._output.clear()
+        self._start_next(now)
+        request._finish(error)
+
+    def _fail(self, now: float, reason: str):
+        """
+        Mark the port closed and fail the current and queued requests
+        """
+        self.closed = True
+        while self._current is not None:
+            self._complete(now, ConnectionError(f"{self.name} {reason}"))
+
+    def _write(self, now: float):
+        try:
+            written = os.write(self.fd, self._output)
+        except BlockingIOError:
+            return
+        except OSError as error:
+            self._fail(now, f"failed: {error}")
+            return
+        del self._output[:written]
+
+    def _read(self, now: float):
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as error:
+            self._fail(now, f"failed: {error}")
+            return
+        if not data:
+            self._fail(now, "closed")
+            return
+        self._input += data
+        while self._current is not None:
+            line, separator, rest = self._input.partition(self._termination)
+            if not separator:
+                return
+            self._input[:] = rest
+            text = line.decode(self._encoding, "replace").strip("\r\n\x00")
+            if not text:
+                continue
+            self._current.lines.append(text)
+            if len(self._current.lines) >= self._current.expected:
+                self._complete(now)
+
+    def _expire(self, now: float):
+        if self._current is not None and now >= self._current.deadline:
+            self._complete(
+                now, TimeoutError(f"timed out waiting for {self.name} response")
+            )
+
+    def close(self):
+        self.fileobj.close()
+
+
+class IOEngine:
+    """
+    Event loop exchanging commands with many ports from a single thread
+
+    Ports are opened in non-blocking mode and multiplexed with a selector, so
+    polling 30 modules costs one thread instead of 30. Each port has at most one
+    outstanding command. Work is submitted as single commands with `submit` or as
+    generator operations with `spawn`, which yield commands and receive the reply
+    lines, and is driven by `wait` or `gather`. The engine is not thread-safe and
+    must be driven from one thread.
+    """
+
+    def __init__(
+        self,
+        selector: Optional[selectors.BaseSelector] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._selector = (
+            selector if selector is not None else selectors.DefaultSelector()
+        )
+        self._clock = clock
+        self.ports: List[EnginePort] = []
+
+    def open(
+        self,
+        port: str,
+        baud_rate: int = 9600,
+        data_bits: int = 8,
+        stop_bits: float = 1,
+        parity: str = "N",
+        timeout: float = 1.0,
+        termination: str = "\r\n",
+        encoding: str = "ascii",
+    ) -> EnginePort:
+        """
+        Open a serial port in non-blocking mode
+
+        Returns:
+            EnginePort: port handle
+        """
+        import serial
+
+        serial_port = serial.Serial(
+            port=port,
+            baudrate=baud_rate,
+            bytesize=data_bits,
+            stopbits=stop_bits,
+            parity=parity,
+            timeout=0,
+            write_timeout=0,
+        )
+        return self.attach(serial_port, port, termination, encoding, timeout)
+
+    def attach(
+        self,
+        fileobj,
+        name: Optional[str] = None,
+        termination: str = "\r\n",
+        encoding: str = "ascii",
+        timeout: float = 1.0,
+    ) -> EnginePort:
+        """
+        Add an already opened port, socket or pipe with a `fileno`
+
+        Returns:
+            EnginePort: port handle
+        """
+        if name is None:
+            name = f"port{len(self.ports)}"
+        port = EnginePort(fileobj, name, termination, encoding, timeout)
+        self._selector.register(port.fd, selectors.EVENT_READ, port)
+        self.ports.append(port)
+        return port
+
+    def submit(self, port: EnginePort, cmd: str) -> Request:
+        """
+        Queue a command on `port`
+
+        Returns:
+            Request: request completed by `run_once`
+        """
+        request = Request(cmd)
+        if port.closed:
+            request._finish(ConnectionError(f"{port.name} closed"))
+            return request
+        port._queue.append(request)
+        if port._current is None:
+            port._start_next(self._clock())
+        return request
+
+    def spawn(self, port: EnginePort, operation: Operation) -> Task:
+        """
+        Run a generator operation on `port`
+
+        Returns:
+            Task: task completed by `run_once`
+        """
+        return Task(self, port, operation)
+
+    def _update(self, port: EnginePort):
+        events = selectors.EVENT_READ
+        if port._output:
+            events |= selectors.EVENT_WRITE
+        if self._selector.get_key(port.fd).events != events:
+            self._selector.modify(port.fd, events, port)
+
+    def run_once(self, timeout: Optional[float] = None):
+        """
+        Wait once for any port to become ready and process its input and output
+
+        Args:
+            timeout (float, optional): maximum wait, until the next request
+                deadline if None [s]
+        """
+        now = self._clock()
+        deadlines = [p._current.deadline for p in self.ports if p._current is not None]
+        if deadlines:
+            wait = max(min(deadlines) - now, 0.0)
+            timeout = wait if timeout is None else min(timeout, wait)
+        for port in self.ports:
+            if not port.closed:
+                self._update(port)
+        for key, events in self._selector.select(timeout):
+            port = key.data
+            if events & selectors.EVENT_WRITE:
+                port._write(self._clock())
+            if events & selectors.EVENT_READ and not port.closed:
+                port._read(self._clock())
+            if port.closed:
+                self._selector.unregister(port.fd)
+        now = self._clock()
+        for port in self.ports:
+            port._expire(now)
+
+    def wait(self, *pending: Any):
+        """
+        Run the loop until all given requests and tasks are done
+        """
+        while not all(item.done for item in pending):
+            self.run_once()
+
+    def gather(
+        self, operations: Mapping[Hashable, Tuple[EnginePort, Operation]]
+    ) -> Dict[Hashable, Any]:
+        """
+        Run operations on several ports in parallel
+
+        Args:
+            operations (Mapping[Hashable, Tuple[EnginePort, Operation]]): port and
+                operation by key
+
+        Returns:
+            Dict[Hashable, Any]: result of each operation by key; exceptions raised
+            by an operation are returned instead of raised
+        """
+        tasks = {
+            key: self.spawn(port, operation)
+            for key, (port, operation) in operations.items()
+        }
+        self.wait(*tasks.values())
+        return {
+            key: task.error if task.error is not None else task.result()
+            for key, task in tasks.items()
+        }
+
+    def close(self):
+        for port in self.ports:
+            if not port.closed:
+                self._selector.unregister(port.fd)
+            port.close()
+        self.ports.clear()
+        self._selector.close()
+
+
+class EngineTransport:
+    """
+    Blocking `DeviceTransport` on an `IOEngine` port
+
+    A query runs the engine until its reply is complete, so commands queued on
+    other ports progress at the same time.
+    """
+
+    def __init__(self, engine: IOEngine, port: EnginePort):
+        self.engine = engine
+        self.port = port
+        self._response: Optional[str] = None
+
+    def query(self, cmd: str) -> str:
+        self._response = None
+        request = self.engine.submit(self.port, cmd)
+        self.engine.wait(request)
+        lines = request.result()
+        if len(lines) > 1:
+            self._response = lines[1]
+        return lines[0]
+
+    def read(self) -> str:
+        response, self._response = self._response, None
+        if response is None:
+            raise TimeoutError("timed out waiting for NHR response")
+        return response
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        self._response = None
+        requests = [self.engine.submit(self.port, cmd) for cmd in cmds]
+        self.engine.wait(*requests)
+        return [request.result() for request in requests]
+
+    def close(self):
+        self.port.close()
+
+
+# operations
+
+
+def query(cmd: str) -> Generator[str, List[str], str]:
+    """
+    Operation sending a query and returning its response
+    """
+    lines = yield cmd
+    if lines[0] != cmd:
+        raise ValueError(f"error in command {cmd}, NHR returned {lines[0]}")
+    return lines[1]
+
+
+def write(cmd: str) -> Generator[str, List[str], None]:
+    """
+    Operation sending a write and checking its echo
+    """
+    lines = yield cmd
+    if lines[0] != cmd:
+        raise ValueError(f"error in command {cmd}, NHR returned {lines[0]}")
+
+
+def read_measurements(
+    channels: Sequence[int],
+) -> Generator[str, List[str], List[Tuple[float, float]]]:
+    """
+    Operation reading measured voltage and current of `channels` with two channel
+    list queries
+
+    Returns:
+        List[Tuple[float, float]]: voltage [V] and current [A] of each channel
+    """
+    voltages = yield from query(f":MEAS:VOLT? {channel_list(channels)}")
+    currents = yield from query(f":MEAS:CURR? {channel_list(channels)}")
+    return list(zip(Values(VOLTS)(voltages), Values(AMPERES)(currents)))
@@ -0,0 +1,408 @@
+"""
+OpenMetrics exporter serving module and channel readings from a polled cache.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from .codec import AMPERES, INTEGER, VOLTS
+from .register import (
+    ChannelEventRegister,
+    ChannelStatusRegister,
+    EventRegister,
+    StatusRegister,
+)
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+logger = logging.getLogger(__name__)
+
+RAILS: Tuple[str, ...] = ("p24v", "n24v", "p12v", "n12v", "p5v", "p3v")
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+TEXT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass
+class ModuleReading:
+    """
+    Readings of one module, registers as bit masks
+
+    Attributes:
+        timestamp (float): wall clock time of the readout [s]
+        duration (float): time the readout took [s]
+    """
+
+    timestamp: float
+    duration: float = 0.0
+    voltages: List[float] = field(default_factory=list)
+    currents: List[float] = field(default_factory=list)
+    setpoints: List[float] = field(default_factory=list)
+    channel_status: List[int] = field(default_factory=list)
+    channel_events: List[int] = field(default_factory=list)
+    temperature: float = 0.0
+    supply: Dict[str, float] = field(default_factory=dict)
+    status: int = 0
+    events: int = 0
+
+
+def read_module(nhr: NHR, clock: Callable[[], float] = time.time) -> ModuleReading:
+    """
+    Read all exported quantities of a module in one pipelined burst
+
+    Channel quantities are read with one channel list query each, the module
+    quantities through the `NHR` and `Supply` properties.
+    """
+    decoders = {
+        "voltages": (":MEAS:VOLT?", VOLTS),
+        "currents": (":MEAS:CURR?", AMPERES),
+        "setpoints": (":READ:VOLT?", VOLTS),
+        "channel_status": (":READ:CHAN:STAT?", INTEGER),
+        "channel_events": (":READ:CHAN:EV:STAT?", INTEGER),
+    }
+    start = clock()
+    with nhr.batch() as b:
+        channel_queries = {
+            name: b.read(lambda cmd=cmd: nhr._query_channels(cmd))
+            for name, (cmd, _) in decoders.items()
+        }
+        temperature = b.read(lambda: nhr.temperature)
+        supply = {
+            rail: b.read(lambda rail=rail: getattr(nhr.supply, rail)) for rail in RAILS
+        }
+        status = b.read(lambda: nhr.status_register)
+        events = b.read(lambda: nhr.event_register)
+    return ModuleReading(
+        timestamp=start,
+        duration=clock() - start,
+        **{
+            name: [decoders[name][1](value) for value in deferred.value]
+            for name, deferred in channel_queries.items()
+        },
+        temperature=temperature.value,
+        supply={rail: value.value for rail, value in supply.items()},
+        status=sum(1 << bit.value for bit in status.value),
+        events=sum(1 << bit.value for bit in events.value),
+    )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _labels(labels: Mapping[str, object]) -> str:
+    return ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+
+
+class _Family:
+    """
+    Gauge metric family collecting samples before rendering
+    """
+
+    def __init__(self, name: str, help: str, unit: str = ""):
+        self.name = name
+        self.help = help
+        self.unit = unit
+        self.samples: List[Tuple[str, float]] = []
+
+    def add(self, value: float, **labels: object):
+        self.samples.append((_labels(labels), value))
+
+    def add_bits(self, mask: int, register: Type[Enum], **labels: object):
+        for bit in register:
+            self.add(mask >> bit.value & 1, **labels, bit=bit.name)
+
+    def render(self, openmetrics: bool) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        if openmetrics and self.unit:
+            yield f"# UNIT {self.name} {self.unit}"
+        for labels, value in self.samples:
+            yield f"{self.name}{{{labels}}} {_value(value)}"
+
+
+def render(
+    readings: Mapping[str, Optional[ModuleReading]],
+    openmetrics: bool = True,
+    last_success: Optional[Mapping[str, float]] = None,
+) -> str:
+    """
+    Exposition text of the readings of several modules, keyed by module name;
+    a module without reading is exported as down. `last_success` holds the time
+    of the last successful readout of each module, kept while it is down, so
+    stale values can be detected
+    """
+    up = _Family("iseg_nhr_up", "Last readout of the module succeeded")
+    polled = _Family(
+        "iseg_nhr_last_poll_timestamp_seconds", "Time of the last readout", "seconds"
+    )
+    succeeded = _Family(
+        "iseg_nhr_last_success_timestamp_seconds",
+        "Time of the last successful readout",
+        "seconds",
+    )
+    duration = _Family(
+        "iseg_nhr_poll_duration_seconds", "Duration of the last readout", "seconds"
+    )
+    voltage = _Family("iseg_nhr_channel_voltage_volts", "Measured voltage", "volts")
+    current = _Family("iseg_nhr_channel_current_amperes", "Measured current", "amperes")
+    setpoint = _Family("iseg_nhr_channel_setpoint_volts", "Voltage setpoint", "volts")
+    channel_status = _Family("iseg_nhr_channel_status", "Channel status register bit")
+    channel_event = _Family("iseg_nhr_channel_event", "Channel event register bit")
+    temperature = _Family(
+        "iseg_nhr_module_temperature_celsius", "Module temperature", "celsius"
+    )
+    supply = _Family("iseg_nhr_module_supply_volts", "Module supply rail", "volts")
+    status = _Family("iseg_nhr_module_status", "Module status register bit")
+    event = _Family("iseg_nhr_module_event", "Module event register bit")
+
+    for module, reading in readings.items():
+        up.add(0 if reading is None else 1, module=module)
+        if last_success is not None and module in last_success:
+            succeeded.add(last_success[module], module=module)
+        if reading is None:
+            continue
+        polled.add(reading.timestamp, module=module)
+        duration.add(reading.duration, module=module)
+        for ch in range(len(reading.voltages)):
+            voltage.add(reading.voltages[ch], module=module, channel=ch)
+            current.add(reading.currents[ch], module=module, channel=ch)
+            setpoint.add(reading.setpoints[ch], module=module, channel=ch)
+            channel_status.add_bits(
+                reading.channel_status[ch],
+                ChannelStatusRegister,
+                module=module,
+                channel=ch,
+            )
+            channel_event.add_bits(
+                reading.channel_events[ch],
+                ChannelEventRegister,
+                module=module,
+                channel=ch,
+            )
+        temperature.add(reading.temperature, module=module)
+        for rail, value in reading.supply.items():
+            supply.add(value, module=module, rail=rail)
+        status.add_bits(reading.status, StatusRegister, module=module)
+        event.add_bits(reading.events, EventRegister, module=module)
+
+    families = (
+        up,
+        polled,
+        succeeded,
+        duration,
+        voltage,
+        current,
+        setpoint,
+        channel_status,
+        channel_event,
+        temperature,
+        supply,
+        status,
+        event,
+    )
+    lines = [line for family in families for line in family.render(openmetrics)]
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsCache:
+    """
+    Exposition of several modules, refreshed by a background poller
+
+    Every `interval` the modules are read once and both exposition formats are
+    rendered; scrapes only return the rendered text, so the serial traffic does
+    not depend on the number of scrapers or their scrape interval. A failed
+    readout marks its module down and keeps its last success time; the poller
+    keeps running whatever the error.
+    """
+
+    def __init__(
+        self,
+        modules: Mapping[str, NHR],
+        interval: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, not {interval}")
+        self.modules = dict(modules)
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._expositions: Tuple[bytes, bytes] = (b"# EOF\n", b"")
+        self.readings: Dict[str, Optional[ModuleReading]] = {}
+        self.last_success: Dict[str, float] = {}
+        self.polls = 0
+        self.scrapes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self):
+        """
+        Read all modules and render the exposition
+        """
+        readings: Dict[str, Optional[ModuleReading]] = {}
+        last_success = dict(self.last_success)
+        for name, nhr in self.modules.items():
+            try:
+                readings[name] = reading = read_module(nhr, self._clock)
+            except Exception:
+                logger.exception("readout of module %s failed", name)
+                readings[name] = None
+            else:
+                last_success[name] = reading.timestamp
+        expositions = (
+            render(readings, True, last_success).encode(),
+            render(readings, False, last_success).encode(),
+        )
+        with self._lock:
+            self.readings = readings
+            self.last_success = last_success
+            self._expositions = expositions
+            self.polls += 1
+
+    def exposition(self, openmetrics: bool = True) -> Tuple[bytes, str]:
+        """
+        Latest rendered exposition and its content type
+        """
+        with self._lock:
+            self.scrapes += 1
+            body = self._expositions[0 if openmetrics else 1]
+        return body, OPENMETRICS_TYPE if openmetrics else TEXT_TYPE
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="nhr-metrics-poller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                self.poll()
+            except Exception:
+                # the last exposition is served until a poll succeeds again
+                logger.exception("metrics poll failed")
+            self._stop.wait(max(self.interval - (time.monotonic() - start), 0.0))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Server
+
+    def do_GET(self):
+        if self.path.partition("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        accept = self.headers.get("Accept", "")
+        body, content_type = self.server.cache.exposition(
+            "application/openmetrics-text" in accept
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        logger.debug(format, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], cache: MetricsCache):
+        super().__init__(address, _Handler)
+        self.cache = cache
+
+
+class MetricsExporter:
+    """
+    HTTP endpoint serving the exposition of a `MetricsCache` at `/metrics`
+
+    Scrapers asking for `application/openmetrics-text` get OpenMetrics, others
+    the Prometheus text format. `start` also starts the poller of the cache.
+
+    Args:
+        modules: `MetricsCache`, or module name to `NHR`
+        host (str): address to listen on, local only by default
+        port (int): port to listen on, 0 for any free port
+    """
+
+    def __init__(
+        self,
+        modules: MetricsCache | Mapping[str, NHR],
+        host: str = "127.0.0.1",
+        port: int = 9807,
+        interval: float = 5.0,
+    ):
+        self.cache = (
+            modules
+            if isinstance(modules, MetricsCache)
+            else MetricsCache(modules, interval)
+        )
+        self._server = _Server((host, port), self.cache)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self):
+        self.cache.start()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, name="nhr-metrics-http", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        self.cache.stop()
+
+    def __enter__(self) -> MetricsExporter:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,232 @@
+"""
+Load and soak harness driving simulated modules through the real `NHR` stack.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .module import NHR
+from .simulator import FaultProfile, SimulatedModule
+from .transport import SerialTransport
+
+Operation = Callable[[NHR], object]
+
+
+def _read_voltage(nhr: NHR) -> object:
+    return nhr.channel(0).voltage.measured
+
+
+def _read_current(nhr: NHR) -> object:
+    return nhr.channel(0).current.measured
+
+
+def _read_status(nhr: NHR) -> object:
+    return nhr.channel(0).status_register
+
+
+def _write_setpoint(nhr: NHR) -> object:
+    nhr.channel(0).voltage.setpoint = 100.0
+    return None
+
+
+DEFAULT_OPERATIONS: Sequence[Operation] = (
+    _read_voltage,
+    _read_current,
+    _read_status,
+    _write_setpoint,
+)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile of `values`
+
+    Args:
+        values (Sequence[float]): samples, need not be sorted
+        q (float): percentile in [0, 100]
+
+    Returns:
+        float: percentile, nan if there are no samples
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class LoadReport:
+    """
+    Result of a load run
+
+    Attributes:
+        duration (float): wall time of the run [s]
+        requests (int): completed operations, successful or not
+        errors (Dict[str, int]): failed operations by exception type
+        latencies (List[float]): latency of each successful operation [s]
+        recovery_times (List[float]): time from the first failure of an outage to
+            the next successful operation [s]
+    """
+
+    duration: float
+    requests: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    latencies: List[float] = field(default_factory=list)
+    recovery_times: List[float] = field(default_factory=list)
+
+    @property
+    def successes(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        """
+        Sustained rate of successful operations [1/s]
+        """
+        return self.successes / self.duration if self.duration > 0 else math.nan
+
+    def latency(self, q: float) -> float:
+        """
+        Latency percentile of successful operations [s]
+        """
+        return percentile(self.latencies, q)
+
+    def recovery(self, q: float) -> float:
+        """
+        Recovery time percentile [s]
+        """
+        return percentile(self.recovery_times, q)
+
+    def summary(self) -> str:
+        errors = ", ".join(f"{k}={v}" for k, v in sorted(self.errors.items()))
+        return (
+            f"{self.requests} requests in {self.duration:.2f} s,"
+            f" {self.throughput:.1f}/s sustained,"
+            f" p50 {self.latency(50) * 1e3:.2f} ms,"
+            f" p99 {self.latency(99) * 1e3:.2f} ms,"
+            f" max {self.latency(100) * 1e3:.2f} ms,"
+            f" errors [{errors}],"
+            f" recovery p50 {self.recovery(50) * 1e3:.2f} ms,"
+            f" max {self.recovery(100) * 1e3:.2f} ms"
+        )
+
+
+def simulated_modules(
+    count: int,
+    channels: int = 4,
+    faults: Optional[FaultProfile] = None,
+    timeout: float = 0.05,
+    latency: float = 0.0,
+) -> List[NHR]:
+    """
+    Create `NHR` instances backed by `SimulatedModule` serial ports
+
+    Each module gets its own fault sequence, derived from `faults.seed` if given.
+
+    Args:
+        count (int): number of modules
+        channels (int): channels per module
+        faults (FaultProfile, optional): faults injected after construction
+        timeout (float): simulated serial read timeout [s]
+        latency (float): simulated reply latency [s]
+
+    Returns:
+        List[NHR]: connected modules
+    """
+    modules = []
+    for index in range(count):
+        simulator = SimulatedModule(
+            channels=channels,
+            serial_number=f"{4200000 + index}",
+            timeout=timeout,
+            latency=latency,
+        )
+        nhr = NHR(transport=SerialTransport.from_serial(simulator))
+        if faults is not None:
+            seed = None if faults.seed is None else faults.seed + index
+            simulator.set_faults(replace(faults, seed=seed))
+        modules.append(nhr)
+    return modules
+
+
+def run_load(
+    modules: Sequence[NHR],
+    duration: float,
+    rate: Optional[float] = None,
+    operations: Sequence[Operation] = DEFAULT_OPERATIONS,
+    clock: Callable[[], float] = time.perf_counter,
+) -> LoadReport:
+    """
+    Drive `modules` concurrently, one thread per module, and collect statistics
+
+    Operations are cycled per module and scheduled at absolute times, so a slow
+    operation does not shift the schedule of the following ones. Failed
+    operations are counted by exception type and the run continues.
+
+    Args:
+        modules (Sequence[NHR]): modules to drive
+        duration (float): run time [s]
+        rate (float, optional): operations per second per module, as fast as
+            possible if None
+        operations (Sequence[Operation]): callables applied to a module in turn
+        clock (Callable[[], float]): monotonic clock [s]
+
+    Returns:
+        LoadReport: aggregated statistics
+    """
+    report = LoadReport(duration=duration)
+    errors: Counter = Counter()
+    lock = threading.Lock()
+    start = clock()
+    stop = start + duration
+
+    def worker(nhr: NHR):
+        latencies: List[float] = []
+        recovery_times: List[float] = []
+        failures: Counter = Counter()
+        outage: Optional[float] = None
+        for count in itertools.count():
+            if rate is not None:
+                due = start + count / rate
+                now = clock()
+                if due > now:
+                    time.sleep(due - now)
+            t0 = clock()
+            if t0 >= stop:
+                break
+            try:
+                operations[count % len(operations)](nhr)
+            except Exception as error:
+                # any failure is part of the result, the worker keeps going
+                failures[type(error).__name__] += 1
+                if outage is None:
+                    outage = t0
+                continue
+            t1 = clock()
+            latencies.append(t1 - t0)
+            if outage is not None:
+                recovery_times.append(t1 - outage)
+                outage = None
+        with lock:
+            report.latencies.extend(latencies)
+            report.recovery_times.extend(recovery_times)
+            errors.update(failures)
+
+    threads = [threading.Thread(target=worker, args=(nhr,)) for nhr in modules]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report.duration = clock() - start
+    report.errors = dict(errors)
+    report.requests = len(report.latencies) + sum(errors.values())
+    return report
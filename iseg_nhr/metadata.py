@@ -0,0 +1,180 @@
+"""
+Persistent cache of static device metadata keyed by serial number.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .channel import channel_list
+from .transport import DeviceTransport, pipeline
+
+# queries whose responses only change with the hardware or firmware
+MODULE_METADATA: Tuple[str, ...] = (
+    ":READ:MOD:CHAN?",
+    ":READ:FIRM:NAME?",
+    ":READ:FIRM:REL?",
+)
+
+CHANNEL_METADATA: Tuple[str, ...] = (
+    ":READ:VOLT:NOM?",
+    ":READ:VOLT:MODE:LIST?",
+    ":READ:CURR:NOM?",
+    ":READ:CURR:MODE:LIST?",
+    ":CONF:OUTP:POL:LIST?",
+    ":CONF:OUTP:MODE:LIST?",
+    ":READ:RAMP:VOLT:MIN?",
+    ":READ:RAMP:VOLT:MAX?",
+    ":READ:RAMP:CURR:MIN?",
+    ":READ:RAMP:CURR:MAX?",
+)
+
+_FORMAT = 1
+
+
+def parse_identity(identity: str) -> Tuple[str, str]:
+    """
+    Extract serial number and firmware version from a `*IDN?` response
+
+    Args:
+        identity (str): e.g. `iseg Spezialelektronik GmbH,NHR4,8200001,2.11`
+
+    Returns:
+        Tuple[str, str]: serial number and firmware version
+    """
+    fields = [field.strip() for field in identity.split(",")]
+    if len(fields) < 4:
+        raise ValueError(f"unexpected identity {identity}")
+    return fields[2], fields[3]
+
+
+def metadata_commands(channels: int) -> List[str]:
+    """
+    Queries collecting the static metadata of a module with `channels` channels
+    """
+    commands = list(MODULE_METADATA)
+    for ch in range(channels):
+        commands.extend(f"{cmd} {channel_list([ch])}" for cmd in CHANNEL_METADATA)
+    return commands
+
+
+class MetadataCache:
+    """
+    JSON file mapping serial numbers to the static query responses of a module
+
+    An entry is only returned while the firmware version reported by `*IDN?`
+    matches the version it was recorded with, so a firmware update invalidates
+    it. Writes replace the file atomically and can be shared by several modules.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = os.fspath(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if not isinstance(data, dict) or data.get("format") != _FORMAT:
+            return {}
+        return data.get("modules", {})
+
+    def _write(self, modules: Dict[str, dict]):
+        # readers in other processes see either the old or the new file
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"format": _FORMAT, "modules": modules}, f, indent=1)
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def load(self, serial_number: str, firmware: str) -> Optional[Dict[str, str]]:
+        """
+        Cached responses of a module
+
+        Args:
+            serial_number (str): serial number from `*IDN?`
+            firmware (str): firmware version from `*IDN?`
+
+        Returns:
+            Dict[str, str] | None: response of each command, None if there is no
+            entry for this firmware
+        """
+        with self._lock:
+            entry = self._read().get(serial_number)
+        if entry is None or entry.get("firmware") != firmware:
+            return None
+        return dict(entry["responses"])
+
+    def store(self, serial_number: str, firmware: str, responses: Dict[str, str]):
+        """
+        Save the responses of a module, replacing an older entry
+        """
+        with self._lock:
+            modules = self._read()
+            modules[serial_number] = {"firmware": firmware, "responses": responses}
+            self._write(modules)
+
+    def invalidate(self, serial_number: Optional[str] = None):
+        """
+        Remove the entry of `serial_number`, all entries if None
+        """
+        with self._lock:
+            if serial_number is None:
+                modules = {}
+            else:
+                modules = self._read()
+                if modules.pop(serial_number, None) is None:
+                    return
+            self._write(modules)
+
+
+class MetadataTransport:
+    """
+    Transport wrapper answering cached metadata queries without sending them
+    """
+
+    def __init__(self, transport: DeviceTransport, responses: Dict[str, str]):
+        self.transport = transport
+        self.responses = responses
+        self.hits = 0
+        self._pending: Optional[str] = None
+
+    def query(self, cmd: str) -> str:
+        self._pending = self.responses.get(cmd)
+        if self._pending is not None:
+            self.hits += 1
+            return cmd
+        return self.transport.query(cmd)
+
+    def read(self) -> str:
+        response, self._pending = self._pending, None
+        if response is not None:
+            return response
+        return self.transport.read()
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        self._pending = None
+        forwarded = [cmd for cmd in cmds if cmd not in self.responses]
+        forwarded_replies = iter(pipeline(self.transport, forwarded))
+        replies = []
+        for cmd in cmds:
+            response = self.responses.get(cmd)
+            if response is None:
+                replies.append(next(forwarded_replies))
+            else:
+                self.hits += 1
+                replies.append([cmd, response])
+        return replies
+
+    def close(self):
+        self.transport.close()
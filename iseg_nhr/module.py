@@ -1,13 +1,36 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence, Tuple
-
-import serial
-
-from .channel import Channel
+import contextlib
+import os
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .cache import WriteCache
+from .channel import Channel, channel_list
+from .codec import COMMANDS, Endpoint
 from .register import ControlRegister, EventRegister, StatusRegister, get_set_bits
 from .supply import Supply
-from .transport import DeviceTransport, SerialTransport
+from .transport import Connection, DeviceTransport, SerialTransport
+
+# subsystems used by a few methods only are imported on first use
+if TYPE_CHECKING:
+    from .batch import Batch
+    from .config import Change
+    from .metadata import MetadataCache
+    from .monitor import Callback, EventMonitor, Subscription
+    from .timeouts import AdaptiveTimeouts
+    from .trace import Tracer
 
 
 class NHR:
@@ -15,20 +38,26 @@ class NHR:
         self,
         port: Optional[str] = None,
         baud_rate: int = 9600,
-        data_bits: int = serial.EIGHTBITS,
-        stop_bits: float = serial.STOPBITS_ONE,
-        parity: str = serial.PARITY_NONE,
+        data_bits: int = 8,
+        stop_bits: float = 1,
+        parity: str = "N",
         timeout: float = 1.0,
         write_timeout: float = 1.0,
         transport: DeviceTransport | None = None,
         resource_name: Optional[str] = None,
+        write_cache: bool = False,
+        metadata_cache: Union[str, os.PathLike, MetadataCache, None] = None,
+        adaptive_timeouts: Optional[AdaptiveTimeouts] = None,
+        retries: Optional[int] = None,
+        coalesce_reads: bool = True,
     ):
         if port is None:
             port = resource_name
         if transport is None and port is None:
             raise TypeError("missing required argument: 'port'")
 
-        self._device = (
+        self._monitor: Optional[EventMonitor] = None
+        device = (
             transport
             if transport is not None
             else SerialTransport(
@@ -39,17 +68,29 @@ class NHR:
                 parity=parity,
                 timeout=timeout,
                 write_timeout=write_timeout,
+                timeouts=adaptive_timeouts,
             )
         )
+        self._write_cache = WriteCache(device) if write_cache else None
+        self._device = Connection(
+            self._write_cache if self._write_cache is not None else device,
+            retries,
+            coalesce_reads,
+        )
+        self._endpoint = Endpoint(self._device)
+        if metadata_cache is not None:
+            self._load_metadata(metadata_cache)
 
         self._channels = self.number_channels
         self._channel_instances = tuple(
-            Channel(self._device, ch) for ch in range(self._channels)
+            Channel(self._device, ch, module=self) for ch in range(self._channels)
         )
 
         self._supply = Supply(self._device)
 
     def close(self):
+        if self._monitor is not None:
+            self._monitor.stop()
         self._device.close()
 
     def __enter__(self) -> NHR:
@@ -80,6 +121,180 @@ class NHR:
         if ret != cmd:
             raise ValueError(f"error in command {cmd}, NHR returned {ret}")
 
+    def _pipeline(self, cmds: Sequence[str]) -> List[Optional[str]]:
+        """
+        Send several module or channel commands as one burst
+
+        Args:
+            cmds (Sequence[str]): complete commands including any channel list
+
+        Returns:
+            List[Optional[str]]: response of each query, None for writes
+        """
+        responses: List[Optional[str]] = []
+        for cmd, lines in zip(cmds, self._device.pipeline(cmds)):
+            if lines[0] != cmd:
+                raise ValueError(f"error in command {cmd}, NHR returned {lines[0]}")
+            responses.append(lines[1] if len(lines) > 1 else None)
+        return responses
+
+    def _load_metadata(self, cache: Union[str, os.PathLike, MetadataCache]):
+        """
+        Answer static metadata queries from `cache`, after reading and storing
+        them in one burst if the module or its firmware version is not cached
+        """
+        from .metadata import MetadataCache, MetadataTransport, parse_identity
+
+        if not isinstance(cache, MetadataCache):
+            cache = MetadataCache(cache)
+        identity = self._query("*IDN?")
+        serial_number, firmware = parse_identity(identity)
+        responses = cache.load(serial_number, firmware)
+        if responses is None:
+            responses = self._read_metadata()
+            cache.store(serial_number, firmware, responses)
+        responses["*IDN?"] = identity
+        self._device.transport = MetadataTransport(self._device.transport, responses)
+
+    def _read_metadata(self) -> Dict[str, str]:
+        from .metadata import metadata_commands
+
+        responses = {":READ:MOD:CHAN?": self._query(":READ:MOD:CHAN?")}
+        cmds = [
+            cmd
+            for cmd in metadata_commands(
+                COMMANDS[":READ:MOD:CHAN?"](responses[":READ:MOD:CHAN?"])
+            )
+            if cmd not in responses
+        ]
+        for cmd, lines in zip(cmds, self._device.pipeline(cmds)):
+            # firmware without a query leaves it uncached
+            if lines[0] == cmd and len(lines) > 1:
+                responses[cmd] = lines[1]
+        return responses
+
+    def _query_channels(
+        self, cmd: str, channels: Optional[Sequence[int]] = None
+    ) -> List[str]:
+        """
+        Query several channels with a single channel list command
+
+        Args:
+            cmd (str): channel query without channel list, e.g. `:MEAS:VOLT?`
+            channels (Sequence[int], optional): channel indices, all if None
+
+        Returns:
+            List[str]: response for each channel
+        """
+        if channels is None:
+            channels = range(self._channels)
+        values = self._query(f"{cmd} {channel_list(channels)}").split(",")
+        if len(values) != len(channels):
+            raise ValueError(
+                f"error in command {cmd}, expected {len(channels)} values, NHR"
+                f" returned {len(values)}"
+            )
+        return values
+
+    def _write_channels(self, cmd: str, channels: Sequence[int]):
+        """
+        Apply a channel command to several channels with a single channel list
+        command
+
+        Args:
+            cmd (str): channel command without channel list, e.g. `:VOLT OFF`
+            channels (Sequence[int]): channel indices
+        """
+        for ch in channels:
+            self.channel(ch)
+        self._write(f"{cmd},{channel_list(channels)}")
+
+    def batch(self) -> Batch:
+        """
+        Context manager queueing writes, and reads wrapped with `Batch.read`, of
+        the current thread and sending them as one burst on exit
+
+        Returns:
+            Batch: batch context
+        """
+        from .batch import Batch
+
+        return Batch(self)
+
+    @contextlib.contextmanager
+    def trace(
+        self, tracer: Optional[Tracer] = None, name: str = "NHR"
+    ) -> Iterator[Tracer]:
+        """
+        Record every transaction inside a `with` block
+
+        The tracer wraps the innermost transport, so it records the serial
+        traffic only, not writes skipped by the write cache or queries answered
+        from the metadata cache. Pass the same tracer to several modules to get
+        one timeline of all ports.
+
+        Args:
+            tracer (Tracer, optional): tracer to record into, a new one if None
+            name (str): name of this module in the timeline
+
+        Yields:
+            Tracer: tracer, export with `tracer.export("trace.json")`
+        """
+        from .trace import Tracer, TracingTransport
+
+        tracer = Tracer() if tracer is None else tracer
+        with self._device.lock:
+            layer = self._device
+            while hasattr(layer.transport, "transport"):
+                layer = layer.transport
+            transport = layer.transport
+            layer.transport = TracingTransport(transport, tracer, name)
+        try:
+            yield tracer
+        finally:
+            with self._device.lock:
+                layer.transport = transport
+
+    @property
+    def write_cache(self) -> Optional[WriteCache]:
+        """
+        Write-through cache of channel settings, None unless enabled with
+        `write_cache=True`
+        """
+        return self._write_cache
+
+    @property
+    def monitor(self) -> EventMonitor:
+        """
+        Background event register monitor shared by all subscriptions
+        """
+        if self._monitor is None:
+            from .monitor import EventMonitor
+
+            self._monitor = EventMonitor(self)
+        return self._monitor
+
+    def subscribe(
+        self,
+        callback: Callback,
+        events: Optional[Iterable[EventRegister]] = None,
+    ) -> Subscription:
+        """
+        Call `callback` from a worker thread when module events are raised or
+        cleared, and start the background monitor if needed
+
+        Args:
+            callback (Callback): called with an `EventChange`
+            events (Iterable[EventRegister], optional): events of interest, all if
+                None
+
+        Returns:
+            Subscription: handle to cancel the subscription
+        """
+        subscription = self.monitor.subscribe(callback, events)
+        self.monitor.start()
+        return subscription
+
     @property
     def supply(self) -> Supply:
         return self._supply
@@ -96,7 +311,7 @@ class NHR:
 
     @property
     def operation_complete(self) -> bool:
-        return bool(int(self._query("*OPC?")))
+        return bool(self._endpoint.get("*OPC?"))
 
     @property
     def instruction_set(self) -> str:
@@ -116,19 +331,19 @@ class NHR:
 
     @property
     def control_register(self) -> Tuple[ControlRegister, ...]:
-        control = int(self._query(":READ:MOD:CONT?"))
+        control = self._endpoint.get(":READ:MOD:CONT?")
         set_bits = get_set_bits(control, 32)
         return tuple([ControlRegister(bit) for bit in set_bits])
 
     @property
     def status_register(self) -> Tuple[StatusRegister, ...]:
-        status = int(self._query(":READ:MOD:STAT?"))
+        status = self._endpoint.get(":READ:MOD:STAT?")
         set_bits = get_set_bits(status, 32)
         return tuple([StatusRegister(bit) for bit in set_bits])
 
     @property
     def event_register(self) -> Tuple[EventRegister, ...]:
-        event = int(self._query(":READ:MOD:EV:STAT?"))
+        event = self._endpoint.get(":READ:MOD:EV:STAT?")
         set_bits = get_set_bits(event, 32)
         return tuple([EventRegister(bit) for bit in set_bits])
 
@@ -146,7 +361,7 @@ class NHR:
         Returns:
             float: temperature [C]
         """
-        return float(self._query(":READ:MOD:TEMP?").strip("C"))
+        return self._endpoint.get(":READ:MOD:TEMP?")
 
     @property
     def number_channels(self) -> int:
@@ -156,7 +371,7 @@ class NHR:
         Returns:
             int: channels
         """
-        return int(self._query(":READ:MOD:CHAN?"))
+        return self._endpoint.get(":READ:MOD:CHAN?")
 
     @property
     def firmware_version(self) -> str:
@@ -168,7 +383,7 @@ class NHR:
 
     @property
     def config(self) -> str:
-        config = int(self._query(":SYS:USER:CONF?"))
+        config = self._endpoint.get(":SYS:USER:CONF?")
         if config == 0:
             return "normal mode"
         elif config == 1:
@@ -181,6 +396,28 @@ class NHR:
     def config_save(self):
         self._write(":SYS:USER:CONF SAVE")
 
+    def apply(self, config: Mapping[str, Any], **tolerances: float) -> List[Change]:
+        """
+        Bring the module to the state described by `config`, writing only what
+        differs
+
+        The configured parameters are read back in one burst and the changes are
+        written in one burst, ordered polarity, inhibit, ramp speeds, bounds and
+        setpoints. Polarity can only be changed at zero measured voltage.
+
+        Args:
+            config (Mapping[str, Any]): e.g. `{"control": {"SetKillEnable": True},
+                "channels": {0: {"setpoint": 1000, "ramp_up": 50}}}`, see
+                `iseg_nhr.config.PARAMETERS` for the channel parameters
+            **tolerances (float): `rel_tol` and `abs_tol` for numeric comparisons
+
+        Returns:
+            List[Change]: applied changes
+        """
+        from .config import apply
+
+        return apply(self, config, **tolerances)
+
     def channel(self, channel: int) -> Channel:
         if channel < 0 or channel >= self._channels:
             raise ValueError("channel index exceeds module channel number")
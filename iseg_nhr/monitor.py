@@ -0,0 +1,298 @@
+"""
+Background monitoring of module and channel event registers with callbacks.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .codec import INTEGER
+from .register import ChannelEventRegister, EventRegister, get_set_bits
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+logger = logging.getLogger(__name__)
+
+Event = Union[EventRegister, ChannelEventRegister]
+
+
+@dataclass(frozen=True)
+class EventChange:
+    """
+    Change of an event register
+
+    Attributes:
+        channel (int, optional): channel index, None for the module event register
+        raised (Tuple[Event, ...]): events that were set since the previous poll
+        cleared (Tuple[Event, ...]): events that were cleared since the previous poll
+        events (Tuple[Event, ...]): all events currently set
+        timestamp (float): monotonic time of the poll that detected the change [s]
+    """
+
+    channel: Optional[int]
+    raised: Tuple[Event, ...]
+    cleared: Tuple[Event, ...]
+    events: Tuple[Event, ...]
+    timestamp: float
+
+
+Callback = Callable[[EventChange], None]
+
+
+class Subscription:
+    """
+    Handle of a registered callback, use `cancel` to unsubscribe
+    """
+
+    def __init__(
+        self,
+        monitor: EventMonitor,
+        callback: Callback,
+        channel: Optional[int],
+        events: Optional[FrozenSet[Event]],
+    ):
+        self._monitor = monitor
+        self.callback = callback
+        self.channel = channel
+        self.events = events
+        # changes waiting for the callback, delivered one at a time in order
+        self._pending: Deque[EventChange] = deque()
+        self._delivering = False
+        self._lock = threading.Lock()
+
+    def matches(self, change: EventChange) -> bool:
+        if change.channel != self.channel:
+            return False
+        if self.events is None:
+            return True
+        return not self.events.isdisjoint(change.raised + change.cleared)
+
+    def cancel(self):
+        self._monitor.unsubscribe(self)
+
+
+def _decode(value: int, register: Callable[[int], Event]) -> Tuple[Event, ...]:
+    decoded = []
+    for bit in get_set_bits(value, 32):
+        try:
+            decoded.append(register(bit))
+        except ValueError:
+            continue
+    return tuple(decoded)
+
+
+class EventMonitor:
+    """
+    Poll event registers in a background thread and dispatch changes to callbacks
+
+    Each poll reads the module event register and the event registers of all
+    subscribed channels with one channel list query, so the bus traffic does not
+    grow with the number of subscribers. Callbacks run on a worker pool and never
+    delay the next poll; each subscriber gets its changes one at a time, in the
+    order they were detected. The first poll of a register reports the events that are
+    already set as raised.
+    """
+
+    def __init__(
+        self,
+        nhr: NHR,
+        interval: float = 0.1,
+        max_workers: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._nhr = nhr
+        self.interval = interval
+        self._clock = clock
+        self._subscriptions: List[Subscription] = []
+        self._previous: Dict[Optional[int], int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def subscribe(
+        self,
+        callback: Callback,
+        events: Optional[Iterable[Event]] = None,
+        channel: Optional[int] = None,
+    ) -> Subscription:
+        """
+        Register `callback` for changes of the module or a channel event register
+
+        Args:
+            callback (Callback): called with an `EventChange`
+            events (Iterable[Event], optional): only report changes of these events,
+                all events if None
+            channel (int, optional): channel index, None for the module register
+
+        Returns:
+            Subscription: handle to cancel the subscription
+        """
+        register = EventRegister if channel is None else ChannelEventRegister
+        if events is not None:
+            events = frozenset(events)
+            for event in events:
+                if not isinstance(event, register):
+                    raise ValueError(f"{event} is not a {register.__name__}")
+        subscription = Subscription(self, callback, channel, events)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+            if not any(s.channel == subscription.channel for s in self._subscriptions):
+                self._previous.pop(subscription.channel, None)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="nhr-event-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop polling and wait for pending callbacks, unless called from a callback,
+        which would wait for itself
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=not getattr(self._local, "delivering", False))
+            self._executor = None
+
+    def poll(self) -> List[EventChange]:
+        """
+        Read the subscribed event registers once and dispatch changes
+
+        Returns:
+            List[EventChange]: detected changes
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        module = any(s.channel is None for s in subscriptions)
+        channels = sorted({s.channel for s in subscriptions if s.channel is not None})
+
+        values: Dict[Optional[int], int] = {}
+        if module:
+            values[None] = INTEGER(self._nhr._query(":READ:MOD:EV:STAT?"))
+        if channels:
+            registers = self._nhr._query_channels(":READ:CHAN:EV:STAT?", channels)
+            values.update(zip(channels, map(INTEGER, registers)))
+        timestamp = self._clock()
+
+        changes = []
+        # the previous values are shared with unsubscribe, and dispatching under
+        # the lock keeps the changes of concurrent polls in order
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            subscribed = {s.channel for s in subscriptions}
+            for channel, value in values.items():
+                if channel not in subscribed:
+                    continue
+                previous = self._previous.get(channel, 0)
+                self._previous[channel] = value
+                if value == previous:
+                    continue
+                register = EventRegister if channel is None else ChannelEventRegister
+                changes.append(
+                    EventChange(
+                        channel=channel,
+                        raised=_decode(value & ~previous, register),
+                        cleared=_decode(previous & ~value, register),
+                        events=_decode(value, register),
+                        timestamp=timestamp,
+                    )
+                )
+
+            for change in changes:
+                for subscription in subscriptions:
+                    # a failing subscriber must not keep the others from their
+                    # events
+                    try:
+                        if subscription.matches(change):
+                            self._dispatch(subscription, change)
+                    except Exception:
+                        logger.exception(
+                            "dispatch of %s to %r failed", change, subscription
+                        )
+        return changes
+
+    def _dispatch(self, subscription: Subscription, change: EventChange):
+        with subscription._lock:
+            subscription._pending.append(change)
+            if subscription._delivering:
+                return
+            subscription._delivering = True
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="nhr-event"
+            )
+        try:
+            future = self._executor.submit(self._deliver, subscription)
+        except BaseException:
+            with subscription._lock:
+                subscription._delivering = False
+            raise
+        future.add_done_callback(_log_exception)
+
+    def _deliver(self, subscription: Subscription):
+        self._local.delivering = True
+        while True:
+            with subscription._lock:
+                if not subscription._pending:
+                    subscription._delivering = False
+                    return
+                change = subscription._pending.popleft()
+            try:
+                subscription.callback(change)
+            except Exception:
+                logger.exception("event callback failed")
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = self._clock()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("event register poll failed")
+            self._stop.wait(max(self.interval - (self._clock() - start), 0.0))
+
+
+def _log_exception(future: Future):
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error("event callback failed", exc_info=error)
@@ -0,0 +1,183 @@
+"""
+Adaptive polling of channel measurements driven by the channel status register.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .codec import AMPERES, INTEGER, VOLTS
+from .module import NHR
+from .register import ChannelStatusRegister, get_set_bits
+
+ACTIVE_STATUS: FrozenSet[ChannelStatusRegister] = frozenset(
+    {
+        ChannelStatusRegister.IsArc,
+        ChannelStatusRegister.IsVoltageRamp,
+        ChannelStatusRegister.IsCurrentRamp,
+        ChannelStatusRegister.IsConstantCurrent,
+        ChannelStatusRegister.IsCurrentLimit,
+        ChannelStatusRegister.IsCurrentTrip,
+    }
+)
+
+
+@dataclass(frozen=True)
+class ChannelSample:
+    """
+    Measurement of a single channel
+
+    Attributes:
+        channel (int): channel index
+        timestamp (float): monotonic time of the readout [s]
+        voltage (float): measured voltage [V]
+        current (float): measured current [A]
+        status (Tuple[ChannelStatusRegister, ...]): channel status bits
+        interval (float): polling interval of the channel at this sample [s]
+    """
+
+    channel: int
+    timestamp: float
+    voltage: float
+    current: float
+    status: Tuple[ChannelStatusRegister, ...]
+    interval: float
+
+
+class AdaptivePoller:
+    """
+    Poll channel voltage and current at a rate set by the channel status
+
+    Every cycle reads the status register of all channels with one channel list
+    query. Channels with an active status bit, e.g. ramping or current limited,
+    are polled at `min_interval`; stable channels back off by `backoff` per sample
+    up to `max_interval`. Due channels are measured with one voltage and one current
+    channel list query, and `run` spaces cycles so that no more than `budget`
+    transactions per second are sent.
+    """
+
+    def __init__(
+        self,
+        nhr: NHR,
+        channels: Optional[Iterable[int]] = None,
+        min_interval: float = 0.1,
+        max_interval: float = 5.0,
+        backoff: float = 2.0,
+        budget: float = 20.0,
+        active: Iterable[ChannelStatusRegister] = ACTIVE_STATUS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("require 0 < min_interval <= max_interval")
+        if backoff < 1:
+            raise ValueError(f"backoff must be >= 1, not {backoff}")
+        if budget <= 0:
+            raise ValueError(f"budget must be positive, not {budget}")
+
+        self._nhr = nhr
+        self.channels = (
+            tuple(range(nhr.number_channels)) if channels is None else tuple(channels)
+        )
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.budget = budget
+        self._active_mask = sum(1 << bit.value for bit in active)
+        self._clock = clock
+
+        self.intervals: Dict[int, float] = {ch: min_interval for ch in self.channels}
+        self._due: Dict[int, float] = {ch: 0.0 for ch in self.channels}
+        self.transactions = 0
+
+    def _is_active(self, status: int) -> bool:
+        return bool(status & self._active_mask)
+
+    def poll(self) -> List[ChannelSample]:
+        """
+        Run a single polling cycle
+
+        Returns:
+            List[ChannelSample]: samples of the channels that were due
+        """
+        statuses = [
+            INTEGER(value)
+            for value in self._nhr._query_channels(":READ:CHAN:STAT?", self.channels)
+        ]
+        self.transactions += 1
+        now = self._clock()
+
+        due = []
+        for ch, status in zip(self.channels, statuses):
+            if self._is_active(status):
+                if self.intervals[ch] > self.min_interval:
+                    self._due[ch] = now
+                self.intervals[ch] = self.min_interval
+            if self._due[ch] <= now:
+                due.append((ch, status))
+        if not due:
+            return []
+
+        channels = [ch for ch, _ in due]
+        voltages = self._nhr._query_channels(":MEAS:VOLT?", channels)
+        currents = self._nhr._query_channels(":MEAS:CURR?", channels)
+        self.transactions += 2
+
+        samples = []
+        for (ch, status), voltage, current in zip(due, voltages, currents):
+            samples.append(
+                ChannelSample(
+                    channel=ch,
+                    timestamp=now,
+                    voltage=VOLTS(voltage),
+                    current=AMPERES(current),
+                    status=tuple(
+                        ChannelStatusRegister(bit) for bit in get_set_bits(status, 32)
+                    ),
+                    interval=self.intervals[ch],
+                )
+            )
+            self._due[ch] = now + self.intervals[ch]
+            if not self._is_active(status):
+                self.intervals[ch] = min(
+                    self.intervals[ch] * self.backoff, self.max_interval
+                )
+        return samples
+
+    def next_due(self) -> float:
+        """
+        Monotonic time at which the next channel measurement is due [s]
+        """
+        return min(self._due.values())
+
+    def run(
+        self,
+        callback: Callable[[List[ChannelSample]], None],
+        stop: Optional[threading.Event] = None,
+        cycles: Optional[int] = None,
+    ):
+        """
+        Poll until `stop` is set or `cycles` cycles have run
+
+        Args:
+            callback (Callable[[List[ChannelSample]], None]): called with the
+                samples of every cycle that measured at least one channel
+            stop (threading.Event, optional): event to end polling
+            cycles (int, optional): number of cycles to run
+        """
+        stop = threading.Event() if stop is None else stop
+        count = 0
+        while not stop.is_set() and (cycles is None or count < cycles):
+            start = self._clock()
+            transactions = self.transactions
+            samples = self.poll()
+            if samples:
+                callback(samples)
+            count += 1
+
+            spent = self.transactions - transactions
+            earliest = start + spent / self.budget
+            wake = max(earliest, min(self.next_due(), start + self.min_interval))
+            stop.wait(max(wake - self._clock(), 0.0))
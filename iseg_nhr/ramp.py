@@ -1,19 +1,34 @@
-from typing import Callable, Optional, TypeVar
-
-from .transport import DeviceTransport, remove_suffix
-
-_T = TypeVar("_T")
+from .codec import Endpoint
+from .transport import DeviceTransport
+
+# query and write header of each ramp setting, per property type
+_HEADERS = {
+    property_type: {
+        "speed": (f":READ:RAMP:{property_type}?", f":CONF:RAMP:{property_type}"),
+        "speed_up": (
+            f":CONF:RAMP:{property_type}:UP?",
+            f":CONF:RAMP:{property_type}:UP",
+        ),
+        "speed_down": (
+            f":CONF:RAMP:{property_type}:DOWN?",
+            f":CONF:RAMP:{property_type}:DOWN",
+        ),
+        "min": (f":READ:RAMP:{property_type}:MIN?", None),
+        "max": (f":READ:RAMP:{property_type}:MAX?", None),
+    }
+    for property_type in ("VOLT", "CURR")
+}
 
 
 class Ramp:
+    __slots__ = ("property_type", "unit", "_endpoint", "_headers")
+
     def __init__(
         self,
         device: DeviceTransport,
         channel: int,
         property_type: str,
     ):
-        self._device = device
-        self._channel = channel
         self.property_type = property_type
 
         if property_type == "VOLT":
@@ -24,37 +39,16 @@ class Ramp:
             raise ValueError(
                 f"valid property_type options are VOLT and CURR, not {property_type}"
             )
+        self._endpoint = Endpoint(
+            device, channel, f"channel {channel} {property_type} ramp"
+        )
+        self._headers = _HEADERS[property_type]
 
     def _query(self, cmd: str) -> str:
-        ret = self._device.query(f"{cmd} (@{self._channel})")
-        if ret != f"{cmd} (@{self._channel})":
-            raise ValueError(
-                f"channel {self._channel} {self.property_type} ramp error in command"
-                f" {cmd}, NHR returned {ret}"
-            )
-        return self._device.read()
-
-    def _query_type_conv_unit(
-        self,
-        cmd: str,
-        value_type: Callable[[str], _T],
-        unit: Optional[str] = None,
-    ) -> _T:
-        if unit is None:
-            _unit = f"{self.unit}/s"
-        else:
-            _unit = unit
-
-        return value_type(remove_suffix(self._query(cmd), _unit))
+        return self._endpoint.query(cmd)
 
     def _write(self, cmd: str):
-        cmd = f"{cmd},(@{self._channel})"
-        ret = self._device.query(cmd)
-        if ret != cmd:
-            raise ValueError(
-                f"channel {self._channel} {self.property_type} ramp error in command"
-                f" {cmd}, NHR returned {ret}"
-            )
+        self._endpoint.write(cmd)
 
     @property
     def speed(self) -> float:
@@ -64,9 +58,7 @@ class Ramp:
         Returns:
             float: ramp speed [unit/s]
         """
-        return self._query_type_conv_unit(
-            f":READ:RAMP:{self.property_type}?", value_type=float
-        )
+        return self._endpoint.get(self._headers["speed"][0])
 
     @speed.setter
     def speed(self, value: float):
@@ -76,7 +68,7 @@ class Ramp:
         Args:
             value (float): ramp speed [units/s]
         """
-        self._write(f":CONF:RAMP:{self.property_type} {value}")
+        self._write(f"{self._headers['speed'][1]} {value}")
 
     @property
     def speed_up(self) -> float:
@@ -86,9 +78,7 @@ class Ramp:
         Returns:
             float: upward ramp speed [unit/s]
         """
-        return self._query_type_conv_unit(
-            f":CONF:RAMP:{self.property_type}:UP?", value_type=float
-        )
+        return self._endpoint.get(self._headers["speed_up"][0])
 
     @speed_up.setter
     def speed_up(self, value: float):
@@ -98,7 +88,7 @@ class Ramp:
         Returns:
             float: upward ramp speed [unit/s]
         """
-        self._write(f":CONF:RAMP:{self.property_type}:UP {value}")
+        self._write(f"{self._headers['speed_up'][1]} {value}")
 
     @property
     def speed_down(self) -> float:
@@ -108,9 +98,7 @@ class Ramp:
         Returns:
             float: downward ramp speed [unit/s]
         """
-        return self._query_type_conv_unit(
-            f":CONF:RAMP:{self.property_type}:DOWN?", value_type=float
-        )
+        return self._endpoint.get(self._headers["speed_down"][0])
 
     @speed_down.setter
     def speed_down(self, value: float):
@@ -120,7 +108,7 @@ class Ramp:
         Returns:
             float: downward ramp speed [unit/s]
         """
-        self._write(f":CONF:RAMP:{self.property_type}:DOWN {value}")
+        self._write(f"{self._headers['speed_down'][1]} {value}")
 
     @property
     def min(self) -> float:
@@ -130,9 +118,7 @@ class Ramp:
         Returns:
             float: minimum ramp speed [unit/s]
         """
-        return self._query_type_conv_unit(
-            f":READ:RAMP:{self.property_type}:MIN?", value_type=float
-        )
+        return self._endpoint.get(self._headers["min"][0])
 
     @property
     def max(self) -> float:
@@ -142,6 +128,4 @@ class Ramp:
         Returns:
             float: maximum ramp speed [units/s]
         """
-        return self._query_type_conv_unit(
-            f":READ:RAMP:{self.property_type}:MAX?", value_type=float
-        )
+        return self._endpoint.get(self._headers["max"][0])
@@ -0,0 +1,303 @@
+"""
+Recording of transport sessions to a compact file and their replay.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .channel import channel_list, split_channel_list
+from .transport import DeviceTransport, pipeline
+
+_FORMAT = 1
+
+Path = Union[str, os.PathLike]
+
+
+class Record(NamedTuple):
+    """
+    One exchange: a query with its response, a write, a pipelined burst or a read
+
+    Attributes:
+        commands (Tuple[str, ...]): commands sent, empty for a plain read
+        replies (Tuple[Tuple[str, ...], ...]): reply lines of each command
+        gap (float): time since the end of the previous exchange [s]
+        duration (float): time from sending until the last reply [s]
+        pipelined (bool): commands were sent as one burst
+        error (str, optional): `timeout` if the exchange timed out
+    """
+
+    commands: Tuple[str, ...]
+    replies: Tuple[Tuple[str, ...], ...]
+    gap: float
+    duration: float
+    pipelined: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class Recording:
+    """
+    Recorded session, stored as gzip compressed JSON lines
+
+    Times are stored in whole microseconds.
+    """
+
+    records: List[Record] = field(default_factory=list)
+
+    def save(self, path: Path):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"format": _FORMAT}) + "\n")
+            for r in self.records:
+                row = [
+                    r.commands,
+                    r.replies,
+                    round(r.gap * 1e6),
+                    round(r.duration * 1e6),
+                ]
+                if r.pipelined or r.error is not None:
+                    row.extend([int(r.pipelined), r.error])
+                f.write(json.dumps(row, separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, path: Path) -> Recording:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != _FORMAT:
+                raise ValueError(f"unsupported recording format {header}")
+            records = []
+            for line in f:
+                commands, replies, gap, duration, *rest = json.loads(line)
+                records.append(
+                    Record(
+                        tuple(commands),
+                        tuple(tuple(lines) for lines in replies),
+                        gap / 1e6,
+                        duration / 1e6,
+                        bool(rest[0]) if rest else False,
+                        rest[1] if rest else None,
+                    )
+                )
+        return cls(records)
+
+
+class RecordingTransport:
+    """
+    Transport wrapper recording every exchange with its timing
+
+    A query and the read of its response are recorded as one exchange. The
+    recording is written to `path` on `close`, or with `recording.save`.
+    """
+
+    def __init__(
+        self,
+        transport: DeviceTransport,
+        path: Optional[Path] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.transport = transport
+        self.path = path
+        self.recording = Recording()
+        self._clock = clock
+        self._last: Optional[float] = None
+        self._pending: Optional[Tuple[str, str, float]] = None
+
+    def _record(
+        self,
+        commands: Sequence[str],
+        replies: Sequence[Sequence[str]],
+        start: float,
+        pipelined: bool = False,
+        error: Optional[str] = None,
+    ):
+        end = self._clock()
+        gap = 0.0 if self._last is None else max(start - self._last, 0.0)
+        self._last = end
+        self.recording.records.append(
+            Record(
+                tuple(commands),
+                tuple(tuple(lines) for lines in replies),
+                gap,
+                end - start,
+                pipelined,
+                error,
+            )
+        )
+
+    def query(self, cmd: str) -> str:
+        self._pending = None
+        start = self._clock()
+        try:
+            echo = self.transport.query(cmd)
+        except TimeoutError:
+            self._record([cmd], [[]], start, error="timeout")
+            raise
+        if "?" in cmd and echo == cmd:
+            self._pending = (cmd, echo, start)
+        else:
+            self._record([cmd], [[echo]], start)
+        return echo
+
+    def read(self) -> str:
+        pending, self._pending = self._pending, None
+        commands, lines, start = (
+            ([], [], self._clock())
+            if pending is None
+            else ([pending[0]], [pending[1]], pending[2])
+        )
+        try:
+            response = self.transport.read()
+        except TimeoutError:
+            self._record(commands, [lines], start, error="timeout")
+            raise
+        self._record(commands, [lines + [response]], start)
+        return response
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        self._pending = None
+        start = self._clock()
+        try:
+            replies = pipeline(self.transport, cmds)
+        except TimeoutError:
+            self._record(cmds, [[] for _ in cmds], start, True, "timeout")
+            raise
+        self._record(cmds, replies, start, pipelined=True)
+        return replies
+
+    def close(self):
+        try:
+            self.transport.close()
+        finally:
+            if self.path is not None:
+                self.recording.save(self.path)
+
+
+class ReplayTransport:
+    """
+    Transport answering from a recording
+
+    In strict mode every command must match the recording in order, which
+    verifies that code sends exactly the recorded traffic. Otherwise each command
+    is answered with the next unused recorded reply of the same command, so layers
+    that reorder, batch or skip commands can be tested against the recorded
+    responses: channel list queries that were not recorded are assembled from the
+    recorded single channel responses, and unrecorded writes are echoed.
+
+    With `timing=True` every exchange takes its recorded duration.
+    """
+
+    def __init__(
+        self,
+        recording: Union[Recording, Path],
+        strict: bool = False,
+        timing: bool = False,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if not isinstance(recording, Recording):
+            recording = Recording.load(recording)
+        self.recording = recording
+        self.strict = strict
+        self.timing = timing
+        self._sleep = sleep
+        self._position = 0
+        self._response: Optional[str] = None
+        self._replies: Dict[str, Deque[Tuple[Tuple[str, ...], float, bool]]] = (
+            defaultdict(deque)
+        )
+        self._last: Dict[str, Tuple[Tuple[str, ...], float, bool]] = {}
+        for record in recording.records:
+            for cmd, lines in zip(record.commands, record.replies):
+                share = record.duration / len(record.commands)
+                entry = (lines, share, record.error is not None)
+                self._replies[cmd].append(entry)
+                self._last[cmd] = entry
+
+    @property
+    def remaining(self) -> int:
+        """
+        Recorded exchanges not replayed yet in strict mode
+        """
+        return len(self.recording.records) - self._position
+
+    def _next_record(self, commands: Sequence[str]) -> Record:
+        if self._position >= len(self.recording.records):
+            raise ValueError(f"recording exhausted at {list(commands)}")
+        record = self.recording.records[self._position]
+        if record.commands != tuple(commands):
+            raise ValueError(
+                f"expected {list(record.commands)} at exchange {self._position},"
+                f" got {list(commands)}"
+            )
+        self._position += 1
+        return record
+
+    def _lookup(self, cmd: str) -> Tuple[Tuple[str, ...], float, bool]:
+        replies = self._replies.get(cmd)
+        if replies:
+            return replies.popleft()
+        if cmd in self._last:
+            return self._last[cmd]
+        head, channels = split_channel_list(cmd)
+        if channels is None:
+            if "?" in cmd:
+                raise ValueError(f"command {cmd} not in recording")
+            return (cmd,), 0.0, False
+        if "?" not in cmd:
+            return (cmd,), 0.0, False
+        parts = [self._lookup(f"{head} {channel_list([ch])}") for ch in channels]
+        if any(timeout or len(lines) < 2 for lines, _, timeout in parts):
+            return (), max(duration for _, duration, _ in parts), True
+        response = ",".join(lines[1] for lines, _, _ in parts)
+        return (cmd, response), max(duration for _, duration, _ in parts), False
+
+    def _exchange(self, cmds: Sequence[str]) -> List[Tuple[str, ...]]:
+        if self.strict:
+            record = self._next_record(cmds)
+            duration, timeout = record.duration, record.error is not None
+            replies = list(record.replies)
+        else:
+            entries = [self._lookup(cmd) for cmd in cmds]
+            duration = sum(entry[1] for entry in entries)
+            timeout = any(entry[2] for entry in entries)
+            replies = [entry[0] for entry in entries]
+        if self.timing and duration > 0:
+            self._sleep(duration)
+        if timeout:
+            raise TimeoutError("timed out waiting for NHR response")
+        return replies
+
+    def query(self, cmd: str) -> str:
+        self._response = None
+        lines = self._exchange([cmd])[0]
+        if len(lines) > 1:
+            self._response = lines[1]
+        return lines[0]
+
+    def read(self) -> str:
+        response, self._response = self._response, None
+        if response is None:
+            raise TimeoutError("timed out waiting for NHR response")
+        return response
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        self._response = None
+        return [list(lines) for lines in self._exchange(cmds)]
+
+    def close(self):
+        pass
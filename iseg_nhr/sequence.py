@@ -0,0 +1,194 @@
+"""
+Timed playback of setpoint sequences and sampled waveforms.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .channel import channel_list
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+
+@dataclass(frozen=True, order=True)
+class Step:
+    """
+    Setpoint change at a time relative to the start of playback
+
+    Attributes:
+        time (float): time after the start of playback [s]
+        channel (int): channel index
+        setpoint (float): voltage setpoint [V]
+    """
+
+    time: float
+    channel: int
+    setpoint: float
+
+
+@dataclass(frozen=True)
+class StepTiming:
+    """
+    Intended and achieved time of a played step, relative to the start [s]
+    """
+
+    step: Step
+    achieved: float
+
+    @property
+    def lateness(self) -> float:
+        return self.achieved - self.step.time
+
+
+@dataclass
+class PlaybackReport:
+    """
+    Timing of a playback
+
+    Attributes:
+        timings (List[StepTiming]): timing of every played step
+        bursts (int): number of bursts sent
+        completed (bool): False if playback was stopped early
+    """
+
+    timings: List[StepTiming] = field(default_factory=list)
+    bursts: int = 0
+    completed: bool = True
+
+    @property
+    def max_lateness(self) -> float:
+        return max((t.lateness for t in self.timings), default=0.0)
+
+    @property
+    def mean_lateness(self) -> float:
+        if not self.timings:
+            return 0.0
+        return sum(t.lateness for t in self.timings) / len(self.timings)
+
+
+class SequencePlayer:
+    """
+    Play setpoint steps on a monotonic schedule
+
+    Steps are scheduled at absolute offsets from the start, so the time spent on
+    serial traffic or a late wake-up does not accumulate over long runs. The player
+    learns how much the sleep function oversleeps and wakes up that much earlier.
+    All steps that are due at a wake-up are sent in one burst; steps with the same
+    time and setpoint on several channels become a single channel list write.
+    """
+
+    def __init__(
+        self,
+        nhr: NHR,
+        steps: Iterable[Union[Step, Tuple[float, int, float]]],
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._nhr = nhr
+        self.steps = sorted(
+            step if isinstance(step, Step) else Step(*step) for step in steps
+        )
+        for channel in {step.channel for step in self.steps}:
+            nhr.channel(channel)
+        self._clock = clock
+        self._sleep = sleep
+        self._oversleep = 0.0
+
+    @classmethod
+    def from_waveform(
+        cls,
+        nhr: NHR,
+        channels: Union[int, Sequence[int]],
+        samples: Sequence[float],
+        interval: float,
+        **kwargs,
+    ) -> SequencePlayer:
+        """
+        Play sampled setpoints on one or more channels
+
+        Args:
+            nhr (NHR): module
+            channels (int | Sequence[int]): channel index or indices
+            samples (Sequence[float]): setpoints [V]
+            interval (float): time between samples [s]
+
+        Returns:
+            SequencePlayer: player for the waveform
+        """
+        if isinstance(channels, int):
+            channels = [channels]
+        steps = [
+            Step(index * interval, channel, setpoint)
+            for index, setpoint in enumerate(samples)
+            for channel in channels
+        ]
+        return cls(nhr, steps, **kwargs)
+
+    def _wait_until(self, start: float, offset: float, stop: threading.Event):
+        while not stop.is_set():
+            remaining = start + offset - self._clock()
+            if remaining <= 0:
+                return
+            planned = max(remaining - self._oversleep, 0.0)
+            before = self._clock()
+            self._sleep(planned)
+            overshoot = self._clock() - before - planned
+            self._oversleep = 0.8 * self._oversleep + 0.2 * max(overshoot, 0.0)
+            if planned == 0.0:
+                return
+
+    def _commands(self, steps: Sequence[Step]) -> List[str]:
+        groups: Dict[Tuple[float, float], List[int]] = defaultdict(list)
+        for step in steps:
+            groups[(step.time, step.setpoint)].append(step.channel)
+        return [
+            f":VOLT {setpoint},{channel_list(channels)}"
+            for (_, setpoint), channels in groups.items()
+        ]
+
+    def play(self, stop: Optional[threading.Event] = None) -> PlaybackReport:
+        """
+        Play all steps, blocking until the last one has been sent
+
+        Args:
+            stop (threading.Event, optional): event to end playback early
+
+        Returns:
+            PlaybackReport: intended versus achieved timing
+        """
+        stop = threading.Event() if stop is None else stop
+        report = PlaybackReport()
+        start = self._clock()
+        index = 0
+        while index < len(self.steps):
+            self._wait_until(start, self.steps[index].time, stop)
+            if stop.is_set():
+                report.completed = False
+                break
+            now = self._clock() - start
+            due = index
+            while due < len(self.steps) and self.steps[due].time <= now:
+                due += 1
+            batch = self.steps[index:due]
+            self._nhr._pipeline(self._commands(batch))
+            achieved = self._clock() - start
+            report.timings.extend(StepTiming(step, achieved) for step in batch)
+            report.bursts += 1
+            index = due
+        return report
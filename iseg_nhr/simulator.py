@@ -0,0 +1,510 @@
+"""
+Simulated NHR module speaking the serial line protocol.
+
+`SimulatedModule` mimics the `serial.Serial` methods used by `SerialTransport`, so
+the real `NHR`/`Channel` code paths can be exercised without hardware, optionally
+with injected line faults.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .channel import split_channel_list
+from .register import (
+    ChannelEventRegister,
+    ChannelStatusRegister,
+    ControlRegister,
+    EventRegister,
+    StatusRegister,
+)
+
+
+@dataclass
+class FaultProfile:
+    """
+    Probabilities of line faults injected per command by a `SimulatedModule`
+
+    Attributes:
+        drop_line (float): a single echo or response line is lost
+        corrupt_echo (float): the echo is garbled
+        slow_response (float): the reply arrives `slow_delay` seconds late
+        slow_delay (float): delay of a slow reply [s]
+        timeout (float): the module does not reply at all
+        stray_bytes (float): a stray line arrives ahead of the echo
+        seed (int, optional): seed for reproducible fault sequences
+    """
+
+    drop_line: float = 0.0
+    corrupt_echo: float = 0.0
+    slow_response: float = 0.0
+    slow_delay: float = 0.05
+    timeout: float = 0.0
+    stray_bytes: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class SimulatedChannel:
+    """
+    State of a single simulated channel
+    """
+
+    voltage_nominal: float = 3000.0
+    current_nominal: float = 3e-3
+    setpoint: float = 0.0
+    voltage: float = 0.0
+    on: bool = False
+    emergency: bool = False
+    positive: bool = True
+    voltage_bounds: float = 0.0
+    current_bounds: float = 0.0
+    voltage_ramp_up: float = 100.0
+    voltage_ramp_down: float = 100.0
+    current_ramp_up: float = 1e-4
+    current_ramp_down: float = 1e-4
+    inhibit: int = 0
+    output_mode: int = 1
+    load: float = 1e9
+    leakage: float = 0.0
+    events: int = 0
+    latched: int = 0
+
+
+def _bits(bits: Sequence[int]) -> int:
+    value = 0
+    for bit in bits:
+        value |= 1 << bit
+    return value
+
+
+_TRIP_EVENTS = _bits(
+    [
+        ChannelEventRegister.Arc.value,
+        ChannelEventRegister.ArcNumberExceeded.value,
+        ChannelEventRegister.CurrentTrip.value,
+        ChannelEventRegister.ExternalInhibit.value,
+    ]
+)
+
+
+class SimulatedModule:
+    """
+    Serial-port stand-in emulating an NHR module
+
+    Commands written with `write` are echoed and answered line by line, and the
+    channel outputs ramp towards their setpoints on the monotonic clock.
+    """
+
+    def __init__(
+        self,
+        channels: int = 4,
+        serial_number: str = "4200001",
+        firmware_name: str = "2.11",
+        firmware_release: str = "23.01.01",
+        faults: Optional[FaultProfile] = None,
+        timeout: float = 0.05,
+        latency: float = 0.0,
+        termination: str = "\r\n",
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.channels = [SimulatedChannel() for _ in range(channels)]
+        self.serial_number = serial_number
+        self.firmware_name = firmware_name
+        self.firmware_release = firmware_release
+        self.faults = faults if faults is not None else FaultProfile()
+        self.timeout = timeout
+        self.latency = latency
+        self.termination = termination
+        self.temperature = 33.0
+        self.module_events = 0
+        self.control = 0
+        self.local = True
+        self.configuration_mode = False
+        self.supply = {
+            "P24V": 24.0,
+            "N24V": -24.0,
+            "P12V": 12.0,
+            "N12V": -12.0,
+            "P5V": 5.0,
+            "P3V": 3.3,
+        }
+        self.commands: List[str] = []
+        self.is_open = True
+
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random(self.faults.seed)
+        self._output: Deque[Tuple[float, bytes]] = deque()
+        self._pending = ""
+        self._last_update = clock()
+        self._lock = threading.RLock()
+
+    # serial.Serial compatible interface
+
+    def write(self, data: bytes) -> int:
+        with self._lock:
+            self._pending += data.decode("ascii")
+            *lines, self._pending = self._pending.split(self.termination)
+            for line in lines:
+                self._reply(line)
+        return len(data)
+
+    def readline(self) -> bytes:
+        deadline = self._clock() + self.timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                if self._output and self._output[0][0] <= now:
+                    return self._output.popleft()[1]
+                ready = self._output[0][0] if self._output else None
+            if ready is None or ready > deadline:
+                self._sleep(max(deadline - now, 0.0))
+                return b""
+            self._sleep(max(ready - now, 0.0))
+
+    def reset_input_buffer(self):
+        with self._lock:
+            now = self._clock()
+            while self._output and self._output[0][0] <= now:
+                self._output.popleft()
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            now = self._clock()
+            return sum(len(line) for ready, line in self._output if ready <= now)
+
+    def close(self):
+        self.is_open = False
+
+    # fault and state injection
+
+    def set_faults(self, faults: FaultProfile):
+        """
+        Replace the fault profile and reseed the fault sequence
+
+        Args:
+            faults (FaultProfile): new fault profile
+        """
+        with self._lock:
+            self.faults = faults
+            self._random.seed(faults.seed)
+
+    def inject_event(self, channel: int, event: ChannelEventRegister):
+        """
+        Raise a channel event; trips switch the channel off without ramp
+
+        Args:
+            channel (int): channel index
+            event (ChannelEventRegister): event to raise
+        """
+        with self._lock:
+            self._advance()
+            state = self.channels[channel]
+            state.events |= 1 << event.value
+            if (1 << event.value) & _TRIP_EVENTS:
+                state.latched |= 1 << event.value
+                state.on = False
+                state.voltage = 0.0
+
+    def inject_module_event(self, event: EventRegister):
+        """
+        Raise a module event
+
+        Args:
+            event (EventRegister): event to raise
+        """
+        with self._lock:
+            self.module_events |= 1 << event.value
+
+    # protocol
+
+    def _reply(self, cmd: str):
+        self.commands.append(cmd)
+        lines = [cmd]
+        response = self._handle(cmd)
+        if response is not None:
+            lines.append(response)
+
+        faults = self.faults
+        now = self._clock()
+        ready = now + self.latency
+        if faults.timeout and self._random.random() < faults.timeout:
+            return
+        if faults.slow_response and self._random.random() < faults.slow_response:
+            ready += faults.slow_delay
+        if faults.corrupt_echo and self._random.random() < faults.corrupt_echo:
+            lines[0] = self._corrupt(lines[0])
+        if faults.drop_line and self._random.random() < faults.drop_line:
+            del lines[self._random.randrange(len(lines))]
+        if faults.stray_bytes and self._random.random() < faults.stray_bytes:
+            lines.insert(0, "\x00#")
+        for line in lines:
+            self._output.append(
+                (ready, f"{line}{self.termination}".encode("ascii", "replace"))
+            )
+
+    def _corrupt(self, line: str) -> str:
+        if not line:
+            return "#"
+        index = self._random.randrange(len(line))
+        return f"{line[:index]}#{line[index + 1 :]}"
+
+    def _handle(self, cmd: str) -> Optional[str]:
+        self._advance()
+        if "?" in cmd:
+            header, channels = split_channel_list(cmd)
+            header = header.rstrip("?").rstrip()
+            if channels is None:
+                handler = self._module_queries.get(header)
+                return "0" if handler is None else handler(self)
+            handler = self._channel_queries.get(header)
+            if handler is None:
+                return ",".join("0" for _ in channels)
+            return ",".join(handler(self, self.channels[ch]) for ch in channels)
+
+        text, channels = split_channel_list(cmd)
+        header, _, value = text.partition(" ")
+        if channels is None:
+            handler = self._module_writes.get(header)
+            if handler is not None:
+                handler(self, value)
+            return None
+        handler = self._channel_writes.get(header)
+        if handler is not None:
+            for ch in channels:
+                handler(self, self.channels[ch], value)
+        return None
+
+    def _advance(self):
+        now = self._clock()
+        dt = now - self._last_update
+        self._last_update = now
+        for state in self.channels:
+            target = state.setpoint if state.on and not state.emergency else 0.0
+            delta = target - state.voltage
+            if delta == 0:
+                continue
+            speed = state.voltage_ramp_up if delta > 0 else state.voltage_ramp_down
+            step = speed * dt
+            if abs(delta) <= step:
+                state.voltage = target
+                state.events |= 1 << ChannelEventRegister.EndOfVoltageRamp.value
+            else:
+                state.voltage += step if delta > 0 else -step
+
+    # channel state encoding
+
+    def _channel_status(self, state: SimulatedChannel) -> int:
+        target = state.setpoint if state.on and not state.emergency else 0.0
+        bits = []
+        if state.positive:
+            bits.append(ChannelStatusRegister.IsPositive.value)
+        if state.on:
+            bits.append(ChannelStatusRegister.IsOn.value)
+        if state.emergency:
+            bits.append(ChannelStatusRegister.IsEmergencyOff.value)
+        if state.voltage != target:
+            bits.append(ChannelStatusRegister.IsVoltageRamp.value)
+            if target > state.voltage:
+                bits.append(ChannelStatusRegister.IsVoltageRampUp.value)
+            else:
+                bits.append(ChannelStatusRegister.IsVoltageRampDown.value)
+        elif state.on:
+            bits.append(ChannelStatusRegister.IsConstantVoltage.value)
+        return _bits(bits) | state.latched
+
+    def _module_status(self) -> int:
+        bits = [
+            StatusRegister.IsSafetyLoopGood.value,
+            StatusRegister.IsModuleGood.value,
+            StatusRegister.IsSupplyGood.value,
+            StatusRegister.IsTemperatureGood.value,
+        ]
+        states = [self._channel_status(state) for state in self.channels]
+        if any(state.on for state in self.channels):
+            bits.append(StatusRegister.IsHighVoltageOn.value)
+        if not any(
+            status >> ChannelStatusRegister.IsVoltageRamp.value & 1 for status in states
+        ):
+            bits.append(StatusRegister.IsNoRamp.value)
+        if self.module_events or any(state.events for state in self.channels):
+            bits.append(StatusRegister.IsEventActive.value)
+        return _bits(bits)
+
+    def _current(self, state: SimulatedChannel) -> float:
+        return abs(state.voltage) / state.load + state.leakage
+
+    def _voltage_on(self, state: SimulatedChannel, value: str):
+        if value == "ON":
+            if not state.emergency:
+                state.on = True
+        elif value == "OFF":
+            state.on = False
+        elif value == "EMCY_OFF":
+            state.on = False
+            state.emergency = True
+            state.voltage = 0.0
+            state.events |= 1 << ChannelEventRegister.EmergencyOff.value
+        elif value == "EMCY_CLR":
+            state.emergency = False
+        else:
+            state.setpoint = float(value)
+
+    def _reset(self, value: str):
+        for index, state in enumerate(self.channels):
+            self.channels[index] = SimulatedChannel(
+                voltage_nominal=state.voltage_nominal,
+                current_nominal=state.current_nominal,
+                load=state.load,
+                leakage=state.leakage,
+            )
+        self.module_events = 0
+
+    def _event_clear(self, value: str):
+        self.module_events = 0
+        for state in self.channels:
+            state.events = 0
+            state.latched = 0
+
+    def _set_local(self, local: bool):
+        self.local = local
+
+    def _set_control(self, bit: ControlRegister, value: str):
+        if int(value):
+            self.control |= 1 << bit.value
+        else:
+            self.control &= ~(1 << bit.value)
+
+    _module_queries: Dict[str, Callable[[SimulatedModule], str]] = {
+        "*IDN": lambda self: (
+            f"iseg Spezialelektronik GmbH,NHR{len(self.channels)},"
+            f"{self.serial_number},{self.firmware_name}"
+        ),
+        "*OPC": lambda self: "1",
+        "*INSTR": lambda self: "EDCP",
+        ":READ:MOD:CONT": lambda self: str(self.control),
+        ":READ:MOD:STAT": lambda self: str(self._module_status()),
+        ":READ:MOD:EV:STAT": lambda self: str(self.module_events),
+        ":READ:MOD:TEMP": lambda self: f"{self.temperature:.1f}C",
+        ":READ:MOD:CHAN": lambda self: str(len(self.channels)),
+        ":READ:FIRM:NAME": lambda self: self.firmware_name,
+        ":READ:FIRM:REL": lambda self: self.firmware_release,
+        ":SYS:USER:CONF": lambda self: str(int(self.configuration_mode)),
+        **{
+            f":READ:MOD:SUP:{rail}": (
+                lambda self, rail=rail: f"{self.supply[rail]:.5E}V"
+            )
+            for rail in ("P24V", "N24V", "P12V", "N12V", "P5V", "P3V")
+        },
+    }
+
+    _channel_queries: Dict[str, Callable[[SimulatedModule, SimulatedChannel], str]] = {
+        ":READ:VOLT:ON": lambda self, state: str(int(state.on)),
+        ":READ:VOLT:EMCY": lambda self, state: str(int(state.emergency)),
+        ":READ:CHAN:CONT": lambda self, state: str(
+            _bits([3] if state.on else []) | _bits([5] if state.emergency else [])
+        ),
+        ":READ:CHAN:STAT": lambda self, state: str(self._channel_status(state)),
+        ":READ:CHAN:EV:STAT": lambda self, state: str(state.events),
+        ":CONF:OUTP:POL": lambda self, state: "p" if state.positive else "n",
+        ":CONF:OUTP:POL:LIST": lambda self, state: "p,n",
+        ":CONF:OUTP:MODE": lambda self, state: str(state.output_mode),
+        ":CONF:OUTP:MODE:LIST": lambda self, state: "1,2,3",
+        ":CONF:INH:ACT": lambda self, state: str(state.inhibit),
+        ":MEAS:VOLT": lambda self, state: f"{state.voltage:.5E}V",
+        ":READ:VOLT": lambda self, state: f"{state.setpoint:.5E}V",
+        ":READ:VOLT:LIM": lambda self, state: f"{state.voltage_nominal:.5E}V",
+        ":READ:VOLT:NOM": lambda self, state: f"{state.voltage_nominal:.5E}V",
+        ":READ:VOLT:MODE": lambda self, state: (
+            f"{state.voltage_nominal if state.positive else -state.voltage_nominal}V"
+        ),
+        ":READ:VOLT:MODE:LIST": lambda self, state: (
+            f"{state.voltage_nominal:.0f},{-state.voltage_nominal:.0f}"
+        ),
+        ":READ:VOLT:BOU": lambda self, state: f"{state.voltage_bounds:.5E}V",
+        ":MEAS:CURR": lambda self, state: f"{self._current(state):.5E}A",
+        ":READ:CURR:LIM": lambda self, state: f"{state.current_nominal:.5E}A",
+        ":READ:CURR:NOM": lambda self, state: f"{state.current_nominal:.5E}A",
+        ":READ:CURR:MODE": lambda self, state: f"{state.current_nominal:.5E}A",
+        ":READ:CURR:MODE:LIST": lambda self, state: f"{state.current_nominal:.5E}",
+        ":READ:CURR:BOU": lambda self, state: f"{state.current_bounds:.5E}A",
+        ":READ:RAMP:VOLT": lambda self, state: f"{state.voltage_ramp_up:.5E}V/s",
+        ":CONF:RAMP:VOLT:UP": lambda self, state: f"{state.voltage_ramp_up:.5E}V/s",
+        ":CONF:RAMP:VOLT:DOWN": lambda self, state: f"{state.voltage_ramp_down:.5E}V/s",
+        ":READ:RAMP:VOLT:MIN": lambda self, state: "1.00000E+00V/s",
+        ":READ:RAMP:VOLT:MAX": lambda self, state: (
+            f"{state.voltage_nominal / 5:.5E}V/s"
+        ),
+        ":READ:RAMP:CURR": lambda self, state: f"{state.current_ramp_up:.5E}A/s",
+        ":CONF:RAMP:CURR:UP": lambda self, state: f"{state.current_ramp_up:.5E}A/s",
+        ":CONF:RAMP:CURR:DOWN": lambda self, state: f"{state.current_ramp_down:.5E}A/s",
+        ":READ:RAMP:CURR:MIN": lambda self, state: "1.00000E-06A/s",
+        ":READ:RAMP:CURR:MAX": lambda self, state: (
+            f"{state.current_nominal / 5:.5E}A/s"
+        ),
+    }
+
+    _module_writes: Dict[str, Callable[[SimulatedModule, str], None]] = {
+        "*CLS": _event_clear,
+        "*RST": _reset,
+        "*LLO": lambda self, value: self._set_local(False),
+        "*GTL": lambda self, value: self._set_local(True),
+        ":CONF:EV": _event_clear,
+        ":SYS:USER:CONF": lambda self, value: None,
+        ":CONF:KILL": lambda self, value: self._set_control(
+            ControlRegister.SetKillEnable, value
+        ),
+        ":CONF:ADJUST": lambda self, value: self._set_control(
+            ControlRegister.SetFineAdjustment, value
+        ),
+    }
+
+    _channel_writes: Dict[
+        str, Callable[[SimulatedModule, SimulatedChannel, str], None]
+    ] = {
+        ":VOLT": _voltage_on,
+        ":VOLT:BOU": lambda self, state, value: setattr(
+            state, "voltage_bounds", float(value)
+        ),
+        ":CURR:BOU": lambda self, state, value: setattr(
+            state, "current_bounds", float(value)
+        ),
+        ":EV": lambda self, state, value: (
+            setattr(state, "events", 0),
+            setattr(state, "latched", 0),
+        ),
+        ":CONF:OUTP:POL": lambda self, state, value: setattr(
+            state, "positive", value == "p"
+        ),
+        ":CONF:INH:ACT": lambda self, state, value: setattr(
+            state, "inhibit", int(value)
+        ),
+        ":CONF:RAMP:VOLT": lambda self, state, value: (
+            setattr(state, "voltage_ramp_up", float(value)),
+            setattr(state, "voltage_ramp_down", float(value)),
+        ),
+        ":CONF:RAMP:VOLT:UP": lambda self, state, value: setattr(
+            state, "voltage_ramp_up", float(value)
+        ),
+        ":CONF:RAMP:VOLT:DOWN": lambda self, state, value: setattr(
+            state, "voltage_ramp_down", float(value)
+        ),
+        ":CONF:RAMP:CURR": lambda self, state, value: (
+            setattr(state, "current_ramp_up", float(value)),
+            setattr(state, "current_ramp_down", float(value)),
+        ),
+        ":CONF:RAMP:CURR:UP": lambda self, state, value: setattr(
+            state, "current_ramp_up", float(value)
+        ),
+        ":CONF:RAMP:CURR:DOWN": lambda self, state, value: setattr(
+            state, "current_ramp_down", float(value)
+        ),
+    }
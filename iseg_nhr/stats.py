@@ -0,0 +1,282 @@
+"""
+Incremental statistics of channel readings in constant memory.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from .module import NHR
+    from .poller import ChannelSample
+
+
+class Moments:
+    """
+    Running count, mean, variance, extremes and linear drift of timestamped values
+
+    Mean and variance use Welford's update, the drift is the least squares slope
+    of value over time from a running covariance. Two `Moments` can be merged, so
+    summaries of consecutive intervals combine into the summary of their union.
+    """
+
+    __slots__ = (
+        "count",
+        "mean",
+        "_m2",
+        "_mean_t",
+        "_m2_t",
+        "_c_tx",
+        "minimum",
+        "maximum",
+        "first",
+        "last",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._mean_t = 0.0
+        self._m2_t = 0.0
+        self._c_tx = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.first = math.nan
+        self.last = math.nan
+
+    def __repr__(self) -> str:
+        return (
+            f"Moments(count={self.count}, mean={self.mean:.6g},"
+            f" std={self.std:.6g}, minimum={self.minimum:.6g},"
+            f" maximum={self.maximum:.6g}, drift={self.drift:.6g})"
+        )
+
+    def update(self, timestamp: float, value: float):
+        """
+        Add a value measured at `timestamp` [s]
+        """
+        self.count += 1
+        dx = value - self.mean
+        self.mean += dx / self.count
+        dt = timestamp - self._mean_t
+        self._mean_t += dt / self.count
+        self._m2 += dx * (value - self.mean)
+        self._m2_t += dt * (timestamp - self._mean_t)
+        self._c_tx += dt * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        if self.count == 1:
+            self.first = timestamp
+        self.last = timestamp
+
+    def merge(self, other: Moments) -> Moments:
+        """
+        Combine with the moments of another set of values
+
+        Returns:
+            Moments: moments of both sets
+        """
+        merged = Moments()
+        if self.count == 0 or other.count == 0:
+            source = other if self.count == 0 else self
+            for name in Moments.__slots__:
+                setattr(merged, name, getattr(source, name))
+            return merged
+        count = self.count + other.count
+        weight = self.count * other.count / count
+        dx = other.mean - self.mean
+        dt = other._mean_t - self._mean_t
+        merged.count = count
+        merged.mean = self.mean + dx * other.count / count
+        merged._m2 = self._m2 + other._m2 + dx * dx * weight
+        merged._mean_t = self._mean_t + dt * other.count / count
+        merged._m2_t = self._m2_t + other._m2_t + dt * dt * weight
+        merged._c_tx = self._c_tx + other._c_tx + dt * dx * weight
+        merged.minimum = min(self.minimum, other.minimum)
+        merged.maximum = max(self.maximum, other.maximum)
+        merged.first = min(self.first, other.first)
+        merged.last = max(self.last, other.last)
+        return merged
+
+    @property
+    def variance(self) -> float:
+        """
+        Sample variance, 0 for fewer than two values
+        """
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def drift(self) -> float:
+        """
+        Least squares slope of value over time [unit/s], 0 without a time span
+        """
+        return self._c_tx / self._m2_t if self._m2_t > 0 else 0.0
+
+
+class RollingWindow:
+    """
+    Moments of the values in a sliding time window, kept in fixed time buckets
+
+    The window is split into `buckets` buckets of equal width. A bucket collects
+    the moments of its values and is reused once it falls out of the window, so
+    memory is independent of the sample rate; the window edge has the resolution
+    of one bucket.
+    """
+
+    def __init__(self, duration: float, buckets: int = 10):
+        if duration <= 0:
+            raise ValueError(f"duration must be positive, not {duration}")
+        if buckets < 1:
+            raise ValueError(f"buckets must be at least 1, not {buckets}")
+        self.duration = duration
+        self.width = duration / buckets
+        self._indices: List[Optional[int]] = [None] * buckets
+        self._moments = [Moments() for _ in range(buckets)]
+
+    def update(self, timestamp: float, value: float):
+        index = math.floor(timestamp / self.width)
+        slot = index % len(self._moments)
+        if self._indices[slot] != index:
+            self._indices[slot] = index
+            self._moments[slot] = Moments()
+        self._moments[slot].update(timestamp, value)
+
+    def _current(self, now: Optional[float]) -> Optional[int]:
+        if now is not None:
+            return math.floor(now / self.width)
+        return max((i for i in self._indices if i is not None), default=None)
+
+    def summaries(self, now: Optional[float] = None) -> List[Tuple[float, Moments]]:
+        """
+        Decimated history: start time and moments of every bucket in the window,
+        oldest first
+
+        Args:
+            now (float, optional): end of the window, the latest bucket if None
+
+        Returns:
+            List[Tuple[float, Moments]]: bucket start [s] and moments
+        """
+        current = self._current(now)
+        if current is None:
+            return []
+        oldest = current - len(self._moments)
+        return sorted(
+            (
+                (index * self.width, moments)
+                for index, moments in zip(self._indices, self._moments)
+                if index is not None and oldest < index <= current
+            ),
+            key=lambda item: item[0],
+        )
+
+    def moments(self, now: Optional[float] = None) -> Moments:
+        """
+        Moments of all values in the window ending at `now`
+        """
+        total = Moments()
+        for _, moments in self.summaries(now):
+            total = total.merge(moments)
+        return total
+
+
+class Statistics:
+    """
+    Statistics of one quantity since the start and over several time scales
+
+    Attributes:
+        total (Moments): moments of all values
+        windows (Dict[float, RollingWindow]): rolling window by duration [s]
+    """
+
+    def __init__(
+        self, windows: Sequence[float] = (10.0, 600.0, 86400.0), buckets: int = 10
+    ):
+        self.total = Moments()
+        self.windows: Dict[float, RollingWindow] = {
+            duration: RollingWindow(duration, buckets) for duration in windows
+        }
+
+    def update(self, timestamp: float, value: float):
+        self.total.update(timestamp, value)
+        for window in self.windows.values():
+            window.update(timestamp, value)
+
+    def window(self, duration: float, now: Optional[float] = None) -> Moments:
+        """
+        Moments over the window of `duration` seconds ending at `now`
+        """
+        if duration not in self.windows:
+            raise ValueError(
+                f"no {duration} s window, available are {sorted(self.windows)}"
+            )
+        return self.windows[duration].moments(now)
+
+
+class CurrentStatistics:
+    """
+    Incremental leakage current statistics of the channels of a module
+
+    Feed it with `sample` from a monitoring loop, or pass `feed` as callback of
+    `AdaptivePoller.run`. Memory per channel depends only on the number of windows
+    and buckets, not on how long it runs.
+    """
+
+    def __init__(
+        self,
+        nhr: Optional[NHR] = None,
+        windows: Sequence[float] = (10.0, 600.0, 86400.0),
+        buckets: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._nhr = nhr
+        self._windows = tuple(windows)
+        self._buckets = buckets
+        self._clock = clock
+        self.channels: Dict[int, Statistics] = {}
+
+    def __getitem__(self, channel: int) -> Statistics:
+        return self.channels[channel]
+
+    def update(self, channel: int, timestamp: float, current: float):
+        statistics = self.channels.get(channel)
+        if statistics is None:
+            statistics = Statistics(self._windows, self._buckets)
+            self.channels[channel] = statistics
+        statistics.update(timestamp, current)
+
+    def feed(self, samples: Iterable[ChannelSample]):
+        """
+        Add the currents of poller samples
+        """
+        for sample in samples:
+            self.update(sample.channel, sample.timestamp, sample.current)
+
+    def sample(self):
+        """
+        Read and add the currents of all channels with `NHR.currents`
+        """
+        if self._nhr is None:
+            raise RuntimeError("no NHR module to sample")
+        currents = self._nhr.currents
+        now = self._clock()
+        for channel, current in enumerate(currents):
+            self.update(channel, now, current)
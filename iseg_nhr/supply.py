@@ -1,8 +1,5 @@
-from typing import Callable, TypeVar
-
-from .transport import DeviceTransport, remove_suffix
-
-_T = TypeVar("_T")
+from .codec import Endpoint
+from .transport import DeviceTransport
 
 
 class Supply:
@@ -10,27 +7,16 @@ class Supply:
     Module supply voltages
     """
 
+    __slots__ = ("_endpoint",)
+
     def __init__(self, device: DeviceTransport):
-        self._device = device
+        self._endpoint = Endpoint(device)
 
     def _query(self, cmd: str) -> str:
-        ret = self._device.query(cmd)
-        if ret != cmd:
-            raise ValueError(f"error in command {cmd}, NHR returned {ret}")
-        return self._device.read()
+        return self._endpoint.query(cmd)
 
     def _write(self, cmd: str):
-        ret = self._device.query(cmd)
-        if ret != cmd:
-            raise ValueError(f"error in command {cmd}, NHR returned {ret}")
-
-    def _query_type_conv_unit(
-        self,
-        cmd: str,
-        value_type: Callable[[str], _T],
-        unit: str = "V",
-    ) -> _T:
-        return value_type(remove_suffix(self._query(cmd), unit))
+        self._endpoint.write(cmd)
 
     @property
     def p24v(self) -> float:
@@ -40,9 +26,7 @@ class Supply:
         Returns:
             float: voltage [V]
         """
-        return float(
-            self._query_type_conv_unit(":READ:MOD:SUP:P24V?", value_type=float)
-        )
+        return self._endpoint.get(":READ:MOD:SUP:P24V?")
 
     @property
     def n24v(self) -> float:
@@ -52,9 +36,7 @@ class Supply:
         Returns:
             float: voltage [V]
         """
-        return float(
-            self._query_type_conv_unit(":READ:MOD:SUP:N24V?", value_type=float)
-        )
+        return self._endpoint.get(":READ:MOD:SUP:N24V?")
 
     @property
     def p5v(self) -> float:
@@ -64,7 +46,7 @@ class Supply:
         Returns:
             float: voltage [V]
         """
-        return float(self._query_type_conv_unit(":READ:MOD:SUP:P5V?", value_type=float))
+        return self._endpoint.get(":READ:MOD:SUP:P5V?")
 
     @property
     def p3v(self) -> float:
@@ -74,7 +56,7 @@ class Supply:
         Returns:
             float: voltage [V]
         """
-        return float(self._query_type_conv_unit(":READ:MOD:SUP:P3V?", value_type=float))
+        return self._endpoint.get(":READ:MOD:SUP:P3V?")
 
     @property
     def p12v(self) -> float:
@@ -84,9 +66,7 @@ class Supply:
         Returns:
             float: voltage [V]
         """
-        return float(
-            self._query_type_conv_unit(":READ:MOD:SUP:P12V?", value_type=float)
-        )
+        return self._endpoint.get(":READ:MOD:SUP:P12V?")
 
     @property
     def n12v(self) -> float:
@@ -96,6 +76,4 @@ class Supply:
         Returns:
             float: voltage [V]
         """
-        return float(
-            self._query_type_conv_unit(":READ:MOD:SUP:N12V?", value_type=float)
-        )
+        return self._endpoint.get(":READ:MOD:SUP:N12V?")
@@ -0,0 +1,152 @@
+"""
+Per-command read timeouts learned from observed latencies, and detection of
+modules that stopped answering.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+
+class ModuleDownError(TimeoutError):
+    """
+    Raised without waiting while a module is considered down
+    """
+
+
+def command_key(cmd: str) -> str:
+    """
+    Command header without value and channel list, e.g. `:MEAS:VOLT?`, with the
+    number of channels of a channel list query, e.g. `:MEAS:VOLT? x16`, whose
+    response grows with the number of channels
+    """
+    header = cmd.partition(" ")[0].partition(",")[0]
+    if "?" in header and cmd.endswith(")") and "(@" in cmd:
+        from .channel import parse_channel_list
+
+        channels = len(parse_channel_list(cmd.rsplit("(@", 1)[1][:-1]))
+        if channels > 1:
+            return f"{header} x{channels}"
+    return header
+
+
+class AdaptiveTimeouts:
+    """
+    Read timeouts per command from the latency distribution seen so far
+
+    The timeout of a command is the `quantile` of its last `window` line latencies
+    times `margin`, limited to `minimum` and `default`. Until `min_samples`
+    latencies are known `default` is used. A timeout is recorded as a latency equal
+    to the timeout, so a too short timeout grows on the next attempt.
+
+    After `max_failures` consecutive timeouts the module is considered down and
+    every command fails immediately with `ModuleDownError`, except for a `probe`
+    query sent at most every `probe_interval` seconds; the module is up again as
+    soon as a probe is answered.
+
+    Timeouts are rounded up to `resolution`, so the serial port is only
+    reconfigured when a timeout changes by at least that much.
+    """
+
+    def __init__(
+        self,
+        default: float = 1.0,
+        minimum: float = 0.02,
+        quantile: float = 0.99,
+        margin: float = 2.0,
+        window: int = 200,
+        min_samples: int = 20,
+        max_failures: int = 3,
+        probe: str = "*OPC?",
+        probe_interval: float = 1.0,
+        resolution: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 < minimum <= default:
+            raise ValueError("require 0 < minimum <= default")
+        if not 0 < quantile <= 1:
+            raise ValueError(f"quantile must be in (0, 1], not {quantile}")
+        self.default = default
+        self.minimum = minimum
+        self.quantile = quantile
+        self.margin = margin
+        self.window = window
+        self.min_samples = min_samples
+        self.max_failures = max_failures
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.resolution = resolution
+        self._clock = clock
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._timeouts: Dict[str, float] = {}
+        self._observed: Dict[str, int] = {}
+        self.failures = 0
+        self.down = False
+        self._next_probe = 0.0
+
+    def timeout(self, cmd: str) -> float:
+        """
+        Read timeout for a line of `cmd` [s]
+        """
+        return self._timeouts.get(command_key(cmd), self.default)
+
+    def observe(self, cmd: str, latency: float):
+        """
+        Record the time a line of `cmd` took to arrive [s]
+        """
+        key = command_key(cmd)
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies[key] = deque(maxlen=self.window)
+        latencies.append(latency)
+        count = self._observed[key] = self._observed.get(key, 0) + 1
+        # the quantile is refreshed when it may grow and every 16 samples otherwise
+        grows = latency * self.margin > self._timeouts.get(key, 0.0)
+        if len(latencies) >= self.min_samples and (grows or count % 16 == 0):
+            ordered = sorted(latencies)
+            rank = max(math.ceil(self.quantile * len(ordered)), 1)
+            timeout = ordered[rank - 1] * self.margin
+            if self.resolution > 0:
+                steps = math.ceil(timeout / self.resolution - 1e-9)
+                timeout = steps * self.resolution
+            self._timeouts[key] = min(max(timeout, self.minimum), self.default)
+
+    def success(self, cmd: str, latency: float):
+        self.failures = 0
+        self.observe(cmd, latency)
+
+    def failure(self, cmd: str):
+        if cmd:
+            self.observe(cmd, self.timeout(cmd))
+        self.failures += 1
+        if self.failures >= self.max_failures and not self.down:
+            self.down = True
+            self._next_probe = self._clock() + self.probe_interval
+
+    def probe_due(self) -> bool:
+        """
+        Whether a probe may be sent to a module that is down
+        """
+        if self._clock() < self._next_probe:
+            return False
+        self._next_probe = self._clock() + self.probe_interval
+        return True
+
+    def recover(self):
+        self.down = False
+        self.failures = 0
+
+    def reset(self, cmd: Optional[str] = None):
+        """
+        Forget learned latencies of `cmd`, of all commands if None
+        """
+        if cmd is None:
+            self._latencies.clear()
+            self._timeouts.clear()
+            self._observed.clear()
+        else:
+            for values in (self._latencies, self._timeouts, self._observed):
+                values.pop(command_key(cmd), None)
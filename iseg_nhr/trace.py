@@ -0,0 +1,276 @@
+"""
+Tracing of transport transactions with export to the Chrome trace-event format.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .transport import DeviceTransport, pipeline
+
+_PACKAGE = __name__.rpartition(".")[0]
+# modules forwarding calls to the transport, never reported as callers
+_PLUMBING = {
+    __name__,
+    f"{_PACKAGE}.transport",
+    f"{_PACKAGE}.cache",
+    f"{_PACKAGE}.metadata",
+}
+
+
+def api_caller(depth: int = 1) -> str:
+    """
+    Name the outermost function of this package on the current call stack
+
+    Called from a transport this is the API entry point that caused a command,
+    e.g. `NHR.voltages` or `Channel.status_register`.
+
+    Args:
+        depth (int): frames to skip
+
+    Returns:
+        str: qualified name of the function, `?` if called from outside the package
+    """
+    caller = "?"
+    frame = sys._getframe(depth)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _PLUMBING and (
+            module == _PACKAGE or module.startswith(f"{_PACKAGE}.")
+        ):
+            caller = frame.f_code.co_qualname
+        frame = frame.f_back
+    return caller
+
+
+@dataclass(frozen=True)
+class TraceEvent:
+    """
+    A transaction on the serial line
+
+    Attributes:
+        caller (str): API function that caused the transaction
+        commands (Tuple[str, ...]): commands sent, several for a pipelined burst
+        responses (Tuple[Optional[str], ...]): response of each query, None for
+            writes
+        start (float): time the first command was sent [s]
+        end (float): time the last reply was received [s]
+        thread_id (int): native id of the calling thread
+        thread_name (str): name of the calling thread
+        process (int): id of the traced transport within the tracer
+        error (str, optional): timeout or unexpected echo
+    """
+
+    caller: str
+    commands: Tuple[str, ...]
+    responses: Tuple[Optional[str], ...]
+    start: float
+    end: float
+    thread_id: int
+    thread_name: str
+    process: int
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class Tracer:
+    """
+    Collect the transactions of one or more traced transports
+
+    Every traced transport appears as a process in the exported timeline and every
+    calling thread as a thread of that process, so callers contending for the same
+    port are shown next to each other.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.events: List[TraceEvent] = []
+        self._processes: List[str] = []
+        self._origin = clock()
+        self._lock = threading.Lock()
+
+    def register(self, name: str) -> int:
+        """
+        Add a traced transport
+
+        Args:
+            name (str): name of the process in the timeline
+
+        Returns:
+            int: process id of the transport
+        """
+        with self._lock:
+            self._processes.append(name)
+            return len(self._processes)
+
+    def record(self, event: TraceEvent):
+        with self._lock:
+            self.events.append(event)
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self._origin = self.clock()
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        Convert the recorded events to Chrome trace-event JSON, viewable in
+        `chrome://tracing` and Perfetto
+
+        Returns:
+            Dict[str, Any]: trace object with a `traceEvents` list
+        """
+        with self._lock:
+            events = list(self.events)
+            processes = list(self._processes)
+        trace: List[Dict[str, Any]] = []
+        for pid, name in enumerate(processes, start=1):
+            trace.append(
+                {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}}
+            )
+        threads = {(e.process, e.thread_id): e.thread_name for e in events}
+        for (pid, tid), name in threads.items():
+            trace.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+            )
+        for event in events:
+            args: Dict[str, Any] = {}
+            if len(event.commands) == 1:
+                args["command"] = event.commands[0]
+                args["response"] = event.responses[0]
+            else:
+                args["commands"] = list(event.commands)
+                args["responses"] = list(event.responses)
+            if event.error is not None:
+                args["error"] = event.error
+            trace.append(
+                {
+                    "name": event.caller,
+                    "cat": "serial",
+                    "ph": "X",
+                    "ts": (event.start - self._origin) * 1e6,
+                    "dur": event.duration * 1e6,
+                    "pid": event.process,
+                    "tid": event.thread_id,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export(self, file: Union[str, os.PathLike, IO[str]]):
+        """
+        Write the trace as Chrome trace-event JSON
+
+        Args:
+            file (str | os.PathLike | IO[str]): path or text file
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "w", encoding="utf-8") as f:
+                json.dump(self.to_chrome(), f)
+        else:
+            json.dump(self.to_chrome(), file)
+
+
+class TracingTransport:
+    """
+    Transport wrapper recording every transaction in a `Tracer`
+
+    A query and the read of its response are recorded as one transaction, from
+    sending the command until the response is received.
+    """
+
+    def __init__(self, transport: DeviceTransport, tracer: Tracer, name: str = "NHR"):
+        self.transport = transport
+        self.tracer = tracer
+        self.process = tracer.register(name)
+        self._pending: Optional[Tuple[str, str, float]] = None
+
+    def _record(
+        self,
+        caller: str,
+        commands: Sequence[str],
+        responses: Sequence[Optional[str]],
+        start: float,
+        error: Optional[str] = None,
+    ):
+        thread = threading.current_thread()
+        self.tracer.record(
+            TraceEvent(
+                caller,
+                tuple(commands),
+                tuple(responses),
+                start,
+                self.tracer.clock(),
+                threading.get_native_id(),
+                thread.name,
+                self.process,
+                error,
+            )
+        )
+
+    def query(self, cmd: str) -> str:
+        self._pending = None
+        caller = api_caller(2)
+        start = self.tracer.clock()
+        try:
+            echo = self.transport.query(cmd)
+        except Exception as error:
+            self._record(caller, [cmd], [None], start, repr(error))
+            raise
+        if echo != cmd:
+            self._record(caller, [cmd], [None], start, f"echo {echo!r}")
+        elif "?" in cmd:
+            self._pending = (caller, cmd, start)
+        else:
+            self._record(caller, [cmd], [None], start)
+        return echo
+
+    def read(self) -> str:
+        pending, self._pending = self._pending, None
+        if pending is None:
+            caller, commands, start = api_caller(2), [], self.tracer.clock()
+        else:
+            caller, commands, start = pending[0], [pending[1]], pending[2]
+        try:
+            response = self.transport.read()
+        except Exception as error:
+            self._record(caller, commands, [None] * len(commands), start, repr(error))
+            raise
+        self._record(caller, commands, [response], start)
+        return response
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        self._pending = None
+        if not cmds:
+            return []
+        caller = api_caller(2)
+        start = self.tracer.clock()
+        try:
+            replies = pipeline(self.transport, cmds)
+        except Exception as error:
+            self._record(caller, cmds, [None] * len(cmds), start, repr(error))
+            raise
+        responses = [lines[1] if len(lines) > 1 else None for lines in replies]
+        errors = [
+            f"echo {lines[0]!r}" for cmd, lines in zip(cmds, replies) if lines[0] != cmd
+        ]
+        self._record(caller, cmds, responses, start, "; ".join(errors) or None)
+        return replies
+
+    def close(self):
+        self.transport.close()
@@ -1,6 +1,13 @@
-from typing import Protocol
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence
 
-import serial
+from .timeouts import AdaptiveTimeouts, ModuleDownError
+
+# encoded commands kept per transport, enough for all queries of a module
+ENCODE_CACHE_SIZE = 512
+# lines skipped while looking for the resync marker before giving up
+RESYNC_LINES = 64
 
 
 class DeviceTransport(Protocol):
@@ -15,21 +22,282 @@ def remove_suffix(value: str, suffix: str) -> str:
     return value.removesuffix(suffix)
 
 
+def pipeline(transport: DeviceTransport, cmds: Sequence[str]) -> List[List[str]]:
+    """
+    Exchange several commands with `transport`, as one burst if it has a
+    `pipeline` method and one command at a time otherwise
+
+    Args:
+        transport (DeviceTransport): transport
+        cmds (Sequence[str]): commands, queries are recognized by a `?`
+
+    Returns:
+        List[List[str]]: echo, and response for queries, of each command
+    """
+    method = getattr(transport, "pipeline", None)
+    if method is not None:
+        return method(cmds)
+    replies = []
+    for cmd in cmds:
+        lines = [transport.query(cmd)]
+        if "?" in cmd and lines[0] == cmd:
+            lines.append(transport.read())
+        replies.append(lines)
+    return replies
+
+
+def find_layer(transport: DeviceTransport, attribute: str):
+    """
+    First transport with `attribute` in a chain of wrappers linked by their
+    `transport` attribute, None if there is none
+    """
+    while transport is not None:
+        if hasattr(transport, attribute):
+            return transport
+        transport = getattr(transport, "transport", None)
+    return None
+
+
+class _Flight:
+    """
+    Query in progress whose result is shared with concurrent identical queries
+    """
+
+    __slots__ = ("done", "invalid", "echo", "response", "error")
+
+    def __init__(self):
+        self.done = False
+        self.invalid = False
+        self.echo = ""
+        self.response: Optional[str] = None
+        self.error: Optional[Exception] = None
+
+
+class Connection:
+    """
+    Thread-safe access to a transport shared by several callers
+
+    A query and the read of its response form one transaction: the response is
+    read while holding the lock and handed to the next `read` of the same thread, so
+    concurrent callers, such as background monitors, cannot interleave lines.
+
+    With `coalesce`, a query issued while the same query of another thread waits
+    for or holds the lock shares its result instead of sending it again. A write
+    acts as a barrier: queries of the channels it addresses, and module queries,
+    that are in flight are not shared with callers that are still waiting.
+
+    With `retries` set, the line is resynchronized after a timeout, a port error or
+    an unexpected echo if the transport supports `resync`, and queries, which do
+    not change the module state, are retried up to `retries` times. Writes are
+    never repeated.
+    """
+
+    def __init__(
+        self,
+        transport: DeviceTransport,
+        retries: Optional[int] = None,
+        coalesce: bool = True,
+    ):
+        self.transport = transport
+        self.retries = retries
+        self.coalesce = coalesce
+        self.lock = threading.RLock()
+        self._local = threading.local()
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        # queries answered with the result of another thread's query
+        self.coalesced = 0
+
+    @property
+    def batch(self):
+        """
+        Batch collecting the commands of the current thread, if any
+        """
+        return getattr(self._local, "batch", None)
+
+    @batch.setter
+    def batch(self, batch):
+        self._local.batch = batch
+
+    def query(self, cmd: str) -> str:
+        self._local.response = None
+        if self.batch is not None:
+            return self.batch.query(cmd)
+        if "?" not in cmd:
+            if self._flights:
+                self._invalidate(cmd)
+        elif self.coalesce:
+            return self._coalesced_query(cmd)
+        with self.lock:
+            return self._transact(cmd)
+
+    def _coalesced_query(self, cmd: str) -> str:
+        with self._flights_lock:
+            flight = self._flights.get(cmd)
+            leader = flight is None
+            if leader:
+                flight = self._flights[cmd] = _Flight()
+        # the leader holds the lock until its query is done, so a follower that
+        # gets the lock after it finds the result; a follower that gets the lock
+        # first, e.g. because it already holds it, sends the query itself
+        with self.lock:
+            if not leader:
+                if not flight.done or flight.invalid:
+                    return self._transact(cmd)
+                self.coalesced += 1
+                if flight.error is not None:
+                    raise flight.error
+                self._local.response = flight.response
+                return flight.echo
+            try:
+                flight.echo = self._transact(cmd)
+                flight.response = self._local.response
+            except Exception as error:
+                flight.error = error
+                raise
+            finally:
+                flight.done = True
+                with self._flights_lock:
+                    if self._flights.get(cmd) is flight:
+                        del self._flights[cmd]
+            return flight.echo
+
+    def _invalidate(self, cmd: str):
+        """
+        Stop sharing in-flight queries that the write `cmd` may change
+        """
+        from .channel import split_channel_list
+
+        _, channels = split_channel_list(cmd)
+        with self._flights_lock:
+            for query in list(self._flights):
+                if channels is not None:
+                    _, queried = split_channel_list(query)
+                    if queried is not None and set(queried).isdisjoint(channels):
+                        continue
+                self._flights.pop(query).invalid = True
+
+    def _transact(self, cmd: str) -> str:
+        if self.retries is None:
+            return self._exchange(cmd)
+        attempts = self.retries + 1 if "?" in cmd else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                ret = self._exchange(cmd)
+            except ModuleDownError:
+                raise
+            except OSError:
+                if not self.resync() or last:
+                    raise
+                continue
+            if ret == cmd or not self.resync() or last:
+                return ret
+
+    def _exchange(self, cmd: str) -> str:
+        ret = self.transport.query(cmd)
+        if "?" in cmd and ret == cmd:
+            self._local.response = self.transport.read()
+        return ret
+
+    def resync(self) -> bool:
+        """
+        Realign the line stream after an error, reopening the port if needed
+
+        A reopened module may have lost its settings, so a write cache in the
+        transport chain is cleared.
+
+        Returns:
+            bool: False if the transport does not support resynchronization or it
+            failed
+        """
+        with self.lock:
+            transport = find_layer(self.transport, "resync")
+            if transport is None:
+                return False
+            try:
+                reopened = transport.resync()
+            except OSError:
+                return False
+            if reopened:
+                cache = find_layer(self.transport, "invalidate")
+                if cache is not None:
+                    cache.invalidate()
+            return True
+
+    def read(self) -> str:
+        if self.batch is not None:
+            return self.batch.read_response()
+        response = getattr(self._local, "response", None)
+        if response is not None:
+            self._local.response = None
+            return response
+        with self.lock:
+            return self.transport.read()
+
+    def close(self):
+        self.transport.close()
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        """
+        Send several commands as one burst and collect the reply lines
+
+        Transports providing a `pipeline` method write all commands before reading
+        any reply; other transports fall back to one exchange per command.
+
+        Args:
+            cmds (Sequence[str]): commands, queries are recognized by a `?`
+
+        Returns:
+            List[List[str]]: echo, and response for queries, of each command
+        """
+        if self._flights:
+            for cmd in cmds:
+                if "?" not in cmd:
+                    self._invalidate(cmd)
+        with self.lock:
+            if self.retries is None:
+                return pipeline(self.transport, cmds)
+            attempts = self.retries + 1 if all("?" in cmd for cmd in cmds) else 1
+            for attempt in range(attempts):
+                last = attempt == attempts - 1
+                try:
+                    replies = pipeline(self.transport, cmds)
+                except ModuleDownError:
+                    raise
+                except OSError:
+                    if not self.resync() or last:
+                        raise
+                    continue
+                aligned = all(lines[0] == cmd for cmd, lines in zip(cmds, replies))
+                if aligned or not self.resync() or last:
+                    return replies
+
+
 class SerialTransport:
+    _encoded: Optional[Dict[str, bytes]] = None
+    _timeouts: Optional[AdaptiveTimeouts] = None
+    _command = ""
+    _opener: Optional[Callable[[], Any]] = None
+
     def __init__(
         self,
         port: str,
         baud_rate: int = 9600,
-        data_bits: int = serial.EIGHTBITS,
-        stop_bits: float = serial.STOPBITS_ONE,
-        parity: str = serial.PARITY_NONE,
+        data_bits: int = 8,
+        stop_bits: float = 1,
+        parity: str = "N",
         timeout: float = 1.0,
         write_timeout: float = 1.0,
         termination: str = "\r\n",
         encoding: str = "ascii",
         clear_input_before_write: bool = True,
+        timeouts: Optional[AdaptiveTimeouts] = None,
     ):
-        self._serial = serial.Serial(
+        # pyserial is only needed for real ports, not for wrapped or simulated ones
+        import serial
+
+        self._opener = lambda: serial.Serial(
             port=port,
             baudrate=baud_rate,
             bytesize=data_bits,
@@ -38,22 +306,219 @@ class SerialTransport:
             timeout=timeout,
             write_timeout=write_timeout,
         )
+        self._serial = self._opener()
         self._termination = termination
         self._encoding = encoding
         self._clear_input_before_write = clear_input_before_write
+        self._timeouts = timeouts
+
+    @classmethod
+    def from_serial(
+        cls,
+        serial_port,
+        termination: str = "\r\n",
+        encoding: str = "ascii",
+        clear_input_before_write: bool = True,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+        opener: Optional[Callable[[], Any]] = None,
+    ) -> "SerialTransport":
+        """
+        Wrap an already opened serial port, or an object with the same interface
+        such as `SimulatedModule`
+
+        Args:
+            serial_port: object providing write, readline, reset_input_buffer and
+                close
+            opener (Callable, optional): returns a newly opened port, used by
+                `reopen`
+
+        Returns:
+            SerialTransport: transport using `serial_port`
+        """
+        transport = cls.__new__(cls)
+        transport._serial = serial_port
+        transport._termination = termination
+        transport._encoding = encoding
+        transport._clear_input_before_write = clear_input_before_write
+        transport._timeouts = timeouts
+        transport._opener = opener
+        return transport
+
+    @property
+    def timeouts(self) -> Optional[AdaptiveTimeouts]:
+        """
+        Adaptive read timeouts, None if every read uses the port timeout
+        """
+        return self._timeouts
+
+    def _encode(self, cmd: str) -> bytes:
+        if self._encoded is None:
+            self._encoded = {}
+        data = self._encoded.get(cmd)
+        if data is None:
+            data = f"{cmd}{self._termination}".encode(self._encoding)
+            # only queries repeat verbatim, writes carry values
+            if "?" in cmd and len(self._encoded) < ENCODE_CACHE_SIZE:
+                self._encoded[cmd] = data
+        return data
 
     def query(self, cmd: str) -> str:
+        if self._timeouts is not None and self._timeouts.down:
+            self._probe()
         if self._clear_input_before_write:
             self._serial.reset_input_buffer()
-        self._serial.write(f"{cmd}{self._termination}".encode(self._encoding))
+        self._serial.write(self._encode(cmd))
+        self._command = cmd
         return self.read()
 
+    def _probe(self):
+        """
+        Fail fast while the module is down, unless a probe is due and answered
+        """
+        timeouts = self._timeouts
+        if not timeouts.probe_due():
+            raise ModuleDownError("NHR module is not responding")
+        probe = timeouts.probe
+        self._serial.reset_input_buffer()
+        self._serial.write(self._encode(probe))
+        self._command = probe
+        try:
+            lines = [self.read()]
+            if "?" in probe:
+                lines.append(self.read())
+        except TimeoutError:
+            raise ModuleDownError("NHR module is not responding") from None
+        if lines[0] != probe:
+            raise ModuleDownError(f"NHR module answered probe with {lines[0]}")
+        timeouts.recover()
+
+    def pipeline(self, cmds: Sequence[str]) -> List[List[str]]:
+        """
+        Write all commands in a single write and read the replies in order
+
+        Args:
+            cmds (Sequence[str]): commands, queries are recognized by a `?`
+
+        Returns:
+            List[List[str]]: echo, and response for queries, of each command
+        """
+        if self._timeouts is not None and self._timeouts.down:
+            self._probe()
+        if self._clear_input_before_write:
+            self._serial.reset_input_buffer()
+        self._serial.write(b"".join(self._encode(cmd) for cmd in cmds))
+        # the first reply of a burst waits for all commands to be transmitted
+        self._command = ""
+        replies = []
+        for cmd in cmds:
+            lines = [self.read()]
+            if "?" in cmd:
+                lines.append(self.read())
+            replies.append(lines)
+        return replies
+
     def read(self) -> str:
-        line = self._serial.readline()
+        timeouts = self._timeouts
+        if timeouts is None:
+            line = self._serial.readline()
+        else:
+            line = self._timed_readline(timeouts, self._command)
         if not line:
             raise TimeoutError("timed out waiting for NHR response")
         return self._strip_termination(line.decode(self._encoding))
 
+    def _timed_readline(self, timeouts: AdaptiveTimeouts, cmd: str) -> bytes:
+        # commands of a burst are not learned, they use the default timeout
+        timeout = timeouts.timeout(cmd) if cmd else timeouts.default
+        if self._serial.timeout != timeout:
+            self._serial.timeout = timeout
+        start = time.perf_counter()
+        line = self._serial.readline()
+        if not line:
+            timeouts.failure(cmd)
+        elif cmd:
+            timeouts.success(cmd, time.perf_counter() - start)
+        else:
+            timeouts.failures = 0
+        return line
+
+    def resync(self, marker: str = "*OPC?", attempts: int = 3) -> bool:
+        """
+        Realign the line stream after a timeout or an unexpected echo
+
+        Pending input is discarded, then `marker` is sent and lines are skipped
+        until its echo, so late replies of earlier commands are consumed. If the
+        port fails it is reopened.
+
+        Args:
+            marker (str): command whose echo marks the realigned stream
+            attempts (int): markers sent before giving up
+
+        Returns:
+            bool: True if the port was reopened
+
+        Raises:
+            TimeoutError: the module did not echo the marker
+        """
+        reopened = False
+        for _ in range(attempts):
+            try:
+                self._realign(marker)
+                return reopened
+            except TimeoutError:
+                continue
+            except OSError:
+                self.reopen()
+                reopened = True
+        raise TimeoutError(f"NHR did not echo {marker} while resynchronizing")
+
+    def _realign(self, marker: str):
+        self._serial.reset_input_buffer()
+        self._serial.write(self._encode(marker))
+        self._command = ""
+        for _ in range(RESYNC_LINES):
+            line = self._serial.readline()
+            if not line:
+                break
+            text = line.decode(self._encoding, errors="replace")
+            if self._strip_termination(text) == marker:
+                if "?" in marker and not self._serial.readline():
+                    break
+                return
+        raise TimeoutError(f"NHR did not echo {marker} while resynchronizing")
+
+    def reopen(
+        self,
+        attempts: int = 5,
+        delay: float = 0.1,
+        max_delay: float = 5.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Close and reopen the port, with exponential backoff between attempts
+
+        Raises:
+            ConnectionError: no opener is known or every attempt failed
+        """
+        if self._opener is None:
+            raise ConnectionError("port cannot be reopened without an opener")
+        try:
+            self._serial.close()
+        except OSError:
+            pass
+        error: Optional[OSError] = None
+        for attempt in range(attempts):
+            if attempt:
+                sleep(min(delay * 2 ** (attempt - 1), max_delay))
+            try:
+                self._serial = self._opener()
+                return
+            except OSError as e:
+                error = e
+        raise ConnectionError(
+            f"could not reopen port in {attempts} attempts"
+        ) from error
+
     def close(self):
         self._serial.close()
 
@@ -1,9 +1,6 @@
-from typing import Callable, TypeVar
-
+from .codec import Endpoint
 from .ramp import Ramp
-from .transport import DeviceTransport, remove_suffix
-
-_T = TypeVar("_T")
+from .transport import DeviceTransport
 
 
 class Voltage:
@@ -11,36 +8,17 @@ class Voltage:
     Channel voltage
     """
 
+    __slots__ = ("_endpoint", "_ramp")
+
     def __init__(self, device: DeviceTransport, channel: int):
-        self._device = device
-        self._channel = channel
-        self._ramp = Ramp(self._device, channel, "VOLT")
+        self._endpoint = Endpoint(device, channel, f"channel {channel} voltage")
+        self._ramp = Ramp(device, channel, "VOLT")
 
     def _query(self, cmd: str) -> str:
-        ret = self._device.query(f"{cmd} (@{self._channel})")
-        if ret != f"{cmd} (@{self._channel})":
-            raise ValueError(
-                f"channel {self._channel} voltage error in command {cmd}, NHR returned"
-                f" {ret}"
-            )
-        return self._device.read()
-
-    def _query_type_conv_unit(
-        self,
-        cmd: str,
-        value_type: Callable[[str], _T],
-        unit: str = "V",
-    ) -> _T:
-        return value_type(remove_suffix(self._query(cmd), unit))
+        return self._endpoint.query(cmd)
 
     def _write(self, cmd: str):
-        cmd = f"{cmd},(@{self._channel})"
-        ret = self._device.query(cmd)
-        if ret != cmd:
-            raise ValueError(
-                f"channel {self._channel} voltage error in command {cmd}, NHR returned"
-                f" {ret}"
-            )
+        self._endpoint.write(cmd)
 
     @property
     def ramp(self) -> Ramp:
@@ -54,7 +32,7 @@ class Voltage:
         Returns:
             float: voltage [V]
         """
-        return self._query_type_conv_unit(":MEAS:VOLT?", value_type=float)
+        return self._endpoint.get(":MEAS:VOLT?")
 
     @property
     def setpoint(self) -> float:
@@ -64,7 +42,7 @@ class Voltage:
         Returns:
             float: voltage [V]
         """
-        return self._query_type_conv_unit(":READ:VOLT?", value_type=float)
+        return self._endpoint.get(":READ:VOLT?")
 
     @setpoint.setter
     def setpoint(self, setpoint: float):
@@ -84,7 +62,7 @@ class Voltage:
         Returns:
             float: voltage [V]
         """
-        return self._query_type_conv_unit(":READ:VOLT:LIM?", value_type=float)
+        return self._endpoint.get(":READ:VOLT:LIM?")
 
     @property
     def maximum(self) -> float:
@@ -94,7 +72,7 @@ class Voltage:
         Returns:
             float: voltage [V]
         """
-        return self._query_type_conv_unit(":READ:VOLT:NOM?", value_type=float)
+        return self._endpoint.get(":READ:VOLT:NOM?")
 
     @property
     def mode(self) -> float:
@@ -104,7 +82,7 @@ class Voltage:
         Returns:
             str: configured channel voltage mode with polarity sign [V]
         """
-        return self._query_type_conv_unit(":READ:VOLT:MODE?", value_type=float)
+        return self._endpoint.get(":READ:VOLT:MODE?")
 
     @property
     def mode_list(self) -> str:
@@ -124,7 +102,7 @@ class Voltage:
         Returns:
             float: voltage [V]
         """
-        return self._query_type_conv_unit(":READ:VOLT:BOU?", value_type=float)
+        return self._endpoint.get(":READ:VOLT:BOU?")
 
     @bounds.setter
     def bounds(self, value: float):
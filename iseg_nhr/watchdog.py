@@ -0,0 +1,258 @@
+"""
+Trip watchdog switching off channels on event register or leakage conditions.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .channel import channel_list
+from .codec import AMPERES, COMMANDS, INTEGER
+from .register import ChannelEventRegister, EventRegister
+
+if TYPE_CHECKING:
+    from .module import NHR
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_TRIPS: FrozenSet[ChannelEventRegister] = frozenset(
+    {
+        ChannelEventRegister.CurrentTrip,
+        ChannelEventRegister.ArcNumberExceeded,
+        ChannelEventRegister.ExternalInhibit,
+    }
+)
+
+MODULE_TRIPS: FrozenSet[EventRegister] = frozenset(
+    {
+        EventRegister.TemperatureNotGood,
+        EventRegister.SafetyLoopNotGood,
+        EventRegister.SupplyNotGood,
+    }
+)
+
+ACTIONS = {"emergency_off": ":VOLT EMCY_OFF", "off": ":VOLT OFF"}
+
+
+@dataclass(frozen=True)
+class TripEvent:
+    """
+    Action taken by the watchdog
+
+    Attributes:
+        channels (Tuple[int, ...]): channels that were switched off
+        reasons (Tuple[str, ...]): conditions that triggered the action
+        detected (float): monotonic time at which the condition was read [s]
+        completed (float): monotonic time at which the switch-off was confirmed [s]
+    """
+
+    channels: Tuple[int, ...]
+    reasons: Tuple[str, ...]
+    detected: float
+    completed: float
+
+    @property
+    def latency(self) -> float:
+        """
+        Detection-to-action latency [s]
+        """
+        return self.completed - self.detected
+
+
+class TripWatchdog:
+    """
+    Watch event registers and leakage currents and switch off affected channels
+
+    A check costs one pipelined burst of the module event register query, one
+    channel list query of the channel event registers and, if `leakage_threshold`
+    is set, one channel list query of the measured currents. All affected channels
+    are switched off with a single channel list command. With `scope="module"` any
+    condition switches off every watched channel; module event conditions always
+    do.
+
+    The background loop keeps polling when a check fails; the failure is logged
+    and kept in `error` until the next successful check, `errors` counts them.
+    """
+
+    def __init__(
+        self,
+        nhr: NHR,
+        channels: Optional[Iterable[int]] = None,
+        channel_events: Iterable[ChannelEventRegister] = CHANNEL_TRIPS,
+        module_events: Iterable[EventRegister] = MODULE_TRIPS,
+        leakage_threshold: Optional[float] = None,
+        action: str = "emergency_off",
+        scope: str = "channel",
+        interval: float = 0.01,
+        on_trip: Optional[Callable[[TripEvent], None]] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        if action not in ACTIONS:
+            raise ValueError(f"action must be one of {list(ACTIONS)}, not {action}")
+        if scope not in ("channel", "module"):
+            raise ValueError(f"scope must be 'channel' or 'module', not {scope}")
+
+        self._nhr = nhr
+        self.channels = (
+            tuple(range(nhr.number_channels)) if channels is None else tuple(channels)
+        )
+        self._channel_events = sorted(set(channel_events), key=lambda e: e.value)
+        self._module_events = sorted(set(module_events), key=lambda e: e.value)
+        self._channel_mask = sum(1 << event.value for event in self._channel_events)
+        self._module_mask = sum(1 << event.value for event in self._module_events)
+        self.leakage_threshold = leakage_threshold
+        self._command = ACTIONS[action]
+        self.scope = scope
+        self.interval = interval
+        self.on_trip = on_trip
+        self._clock = clock
+        self._channel_list = channel_list(self.channels)
+
+        self.trips: List[TripEvent] = []
+        self.checks = 0
+        self._acted: Set[int] = set()
+        self._module_tripped = False
+        # last error of the background loop, None after a successful check
+        self.error: Optional[Exception] = None
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> Optional[TripEvent]:
+        """
+        Read the watched conditions once and act on them
+
+        The registers, and the currents if a leakage threshold is set, are read
+        in one pipelined burst. Channels, and the module conditions, stay
+        disarmed after a trip until their condition has cleared. Errors raised
+        by `on_trip` propagate after the trip has been recorded.
+
+        Returns:
+            TripEvent, optional: the action taken, None if nothing tripped
+        """
+        nhr = self._nhr
+        cmds = [":READ:MOD:EV:STAT?", f":READ:CHAN:EV:STAT? {self._channel_list}"]
+        if self.leakage_threshold is not None:
+            cmds.append(f":MEAS:CURR? {self._channel_list}")
+        # the conditions are sampled during the burst, so the latency of a trip
+        # counts from its start
+        detected = self._clock()
+        module, events, *rest = nhr._pipeline(cmds)
+        module = COMMANDS[cmds[0]](module) & self._module_mask
+        events = [
+            INTEGER(value) & self._channel_mask
+            for value in self._split(cmds[1], events)
+        ]
+        if rest:
+            currents = [abs(AMPERES(value)) for value in self._split(cmds[2], rest[0])]
+        else:
+            currents = [0.0] * len(self.channels)
+        self.checks += 1
+
+        reasons = []
+        affected = []
+        for ch, event, current in zip(self.channels, events, currents):
+            leaking = (
+                self.leakage_threshold is not None and current > self.leakage_threshold
+            )
+            if not (event or leaking):
+                self._acted.discard(ch)
+                continue
+            if ch in self._acted:
+                continue
+            affected.append(ch)
+            reasons.extend(
+                f"channel {ch} {e.name}"
+                for e in self._channel_events
+                if event >> e.value & 1
+            )
+            if leaking:
+                reasons.append(f"channel {ch} leakage current {current} A")
+        module_trip = bool(module) and not self._module_tripped
+        self._module_tripped = bool(module)
+        if module_trip:
+            reasons.extend(
+                f"module {e.name}" for e in self._module_events if module >> e.value & 1
+            )
+        if module_trip or (affected and self.scope == "module"):
+            affected = list(self.channels)
+        if not affected:
+            return None
+
+        nhr._write_channels(self._command, affected)
+        trip = TripEvent(
+            channels=tuple(affected),
+            reasons=tuple(reasons),
+            detected=detected,
+            completed=self._clock(),
+        )
+        self._acted.update(affected)
+        self.trips.append(trip)
+        if self.on_trip is not None:
+            self.on_trip(trip)
+        return trip
+
+    def _split(self, cmd: str, response: str) -> List[str]:
+        values = response.split(",")
+        if len(values) != len(self.channels):
+            raise ValueError(
+                f"error in command {cmd}, expected {len(self.channels)} values, NHR"
+                f" returned {len(values)}"
+            )
+        return values
+
+    def rearm(self):
+        """
+        Re-arm all channels, e.g. after clearing the events and switching back on
+        """
+        self._acted.clear()
+        self._module_tripped = False
+
+    @property
+    def latencies(self) -> Tuple[float, ...]:
+        """
+        Detection-to-action latency of every trip [s]
+        """
+        return tuple(trip.latency for trip in self.trips)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="nhr-trip-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = self._clock()
+            try:
+                self.check()
+            except Exception as error:
+                # a safety loop keeps watching, the failure is logged and exposed
+                logger.exception("watchdog check failed")
+                self.error = error
+                self.errors += 1
+            else:
+                self.error = None
+            self._stop.wait(max(self.interval - (self._clock() - start), 0.0))
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.acquisition import SynchronizedAcquisition, read_timed
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+def make_nhr(voltage=0.0, latency=0.0):
+    simulator = SimulatedModule(channels=2, latency=latency)
+    state = simulator.channels[0]
+    state.setpoint = state.voltage = voltage
+    state.on = True
+    return simulator, NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_values_carry_query_times():
+    simulator, nhr = make_nhr(voltage=500.0)
+    sample = read_timed(
+        nhr, ("voltage", "current", "status"), channels=[0, 1], clock=FakeClock()
+    )
+
+    voltage = sample["voltage"]
+    assert voltage[0].value == pytest.approx(500.0)
+    assert voltage[0].requested < voltage[0].received
+    assert voltage[0].received == voltage[1].received
+    assert sample["current"][0].requested > voltage[0].received
+    assert sample.requested == voltage[0].requested
+    assert sample.received == sample["status"][0].received
+    assert simulator.commands[-1] == ":READ:CHAN:STAT? (@0-1)"
+
+
+def test_unknown_or_missing_quantities_are_rejected():
+    _, nhr = make_nhr()
+    with pytest.raises(ValueError):
+        read_timed(nhr, ("charge",))
+    with pytest.raises(ValueError, match="no quantities"):
+        read_timed(nhr, ())
+    with pytest.raises(ValueError, match="no quantities"):
+        SynchronizedAcquisition([nhr], ())
+
+
+def test_modules_start_at_the_same_tick():
+    modules = [make_nhr(voltage=100.0 * (i + 1), latency=0.01)[1] for i in range(3)]
+    acquisition = SynchronizedAcquisition(modules, ("voltage", "current"), lead=0.005)
+    record = acquisition.acquire()
+
+    assert [s.module for s in record.samples] == [0, 1, 2]
+    assert record.samples[2]["voltage"][0].value == pytest.approx(300.0)
+    assert all(s.requested >= record.tick for s in record.samples)
+    # sequential readouts would start at least two 10 ms queries apart
+    assert record.start_skew < 0.01
+    assert record.skew("current") >= 0.0
+
+
+def test_module_error_is_raised():
+    simulator, broken = make_nhr()
+    _, working = make_nhr()
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+    with pytest.raises(ValueError):
+        SynchronizedAcquisition([working, broken]).acquire()
+
+
+def test_concurrent_acquisitions_keep_their_own_tick():
+    modules = [make_nhr(latency=0.01)[1] for _ in range(2)]
+    acquisition = SynchronizedAcquisition(modules, ("voltage",), lead=0.005)
+    records = []
+    threads = [
+        threading.Thread(target=lambda: records.append(acquisition.acquire()))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(records) == 3
+    for record in records:
+        assert all(s.requested >= record.tick for s in record.samples)
@@ -0,0 +1,91 @@
+from array import array
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.alarm import AlarmEngine, AlarmRule, Readings, read
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def cycle(engine, **values):
+    readings = Readings({q: array("d", v) for q, v in values.items()})
+    return [(e.rule.name, e.module, e.raised) for e in engine.evaluate(readings)]
+
+
+def test_debounce_and_hysteresis():
+    engine = AlarmEngine(
+        [AlarmRule("leak", "current", high=1e-6, hysteresis=2e-7, debounce=3)]
+    )
+
+    assert cycle(engine, current=[2e-6, 0.0]) == []
+    assert cycle(engine, current=[2e-6, 2e-6]) == []
+    assert cycle(engine, current=[2e-6, 0.0]) == [("leak", 0, True)]
+    # the second channel restarts its debounce after a good sample
+    assert cycle(engine, current=[2e-6, 2e-6]) == []
+    assert [rule.name for rule, index in engine.active()] == ["leak"]
+    # within the hysteresis margin the alarm stays raised
+    assert cycle(engine, current=[9e-7, 0.0]) == []
+    assert cycle(engine, current=[7e-7, 0.0]) == [("leak", 0, False)]
+    assert engine.active() == []
+
+
+def test_low_and_high_limits_and_release():
+    engine = AlarmEngine([AlarmRule("p24v", "p24v", low=23.0, high=25.0, release=2)])
+
+    assert cycle(engine, p24v=[24.0, 22.0, 26.0]) == [
+        ("p24v", 1, True),
+        ("p24v", 2, True),
+    ]
+    assert cycle(engine, p24v=[24.0, 24.0, 24.0]) == []
+    assert cycle(engine, p24v=[24.0, 24.0, 26.0]) == [("p24v", 1, False)]
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        AlarmRule("x", "humidity", high=1.0)
+    with pytest.raises(ValueError):
+        AlarmRule("x", "current")
+
+
+def test_poll_reads_modules():
+    first, second = SimulatedModule(channels=2), SimulatedModule(channels=2)
+    second.temperature = 60.0
+    state = second.channels[1]
+    state.setpoint, state.voltage, state.on = 100.0, 80.0, True
+    state.voltage_ramp_up = 0.0
+    engine = AlarmEngine(
+        [
+            AlarmRule("hot", "temperature", high=50.0),
+            AlarmRule("off target", "deviation", high=5.0),
+        ]
+    )
+
+    events = engine.poll([make_nhr(first), make_nhr(second)])
+
+    assert sorted((e.rule.name, e.module, e.channel) for e in events) == [
+        ("hot", 1, None),
+        ("off target", 1, 1),
+    ]
+
+
+def test_read_sends_one_burst_per_module():
+    simulator = SimulatedModule(channels=3)
+    nhr = make_nhr(simulator)
+    simulator.channels[2].setpoint = 10.0
+    sent = len(simulator.commands)
+
+    readings = read([nhr], ["deviation", "p5v"])
+
+    assert simulator.commands[sent:] == [
+        ":MEAS:VOLT? (@0-2)",
+        ":READ:VOLT? (@0-2)",
+        ":READ:MOD:SUP:P5V?",
+    ]
+    assert list(readings.values["setpoint"]) == [0.0, 0.0, 10.0]
+    assert list(readings.values["deviation"]) == [0.0, 0.0, 100.0]
+    assert len(readings.values["p5v"]) == 1
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+from iseg_nhr import NHR, Polarity
+from iseg_nhr.register import ChannelStatusRegister
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+class CountingSimulator(SimulatedModule):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bursts = 0
+
+    def write(self, data):
+        self.bursts += 1
+        return super().write(data)
+
+
+def make_nhr(channels=2):
+    simulator = CountingSimulator(channels=channels)
+    return simulator, NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_writes_and_deferred_reads_are_sent_as_one_burst():
+    simulator, nhr = make_nhr()
+    bursts = simulator.bursts
+
+    with nhr.batch() as b:
+        nhr.channel0.voltage.setpoint = 100
+        nhr.channel1.voltage.ramp.speed = 20
+        nhr.channel0.on()
+        setpoints = b.read(lambda: nhr.setpoints)
+        status = b.read(lambda: nhr.channel0.status_register)
+        assert not setpoints.resolved
+        assert simulator.commands[-1] == ":READ:MOD:CHAN?"
+
+    assert simulator.bursts == bursts + 1
+    assert setpoints.value == pytest.approx((100.0, 0.0))
+    assert ChannelStatusRegister.IsOn in status.value
+
+
+def test_deferred_value_is_unavailable_inside_block():
+    simulator, nhr = make_nhr()
+
+    with nhr.batch() as b:
+        measured = b.read(lambda: nhr.channel0.voltage.measured)
+        with pytest.raises(RuntimeError, match="not resolved"):
+            measured.value
+
+
+def test_plain_read_inside_block_flushes_queue_in_order():
+    simulator, nhr = make_nhr()
+
+    with nhr.batch() as b:
+        nhr.channel0.voltage.setpoint = 100
+        assert nhr.channel0.voltage.setpoint == pytest.approx(100.0)
+        nhr.channel1.polarity = Polarity.NEGATIVE
+
+    assert b.bursts == 3
+    assert nhr.channel1.polarity == Polarity.NEGATIVE
+
+
+def test_deferred_reads_parse_non_numeric_responses():
+    simulator, nhr = make_nhr()
+
+    with nhr.batch() as b:
+        polarity = b.read(lambda: nhr.channel0.polarity)
+        inhibit = b.read(lambda: nhr.channel0.inhibit)
+
+    assert polarity.value == Polarity.POSITIVE
+    assert inhibit.value == nhr.channel0.inhibit_options[0]
+
+
+def test_batch_only_intercepts_its_own_thread_and_discards_on_error():
+    simulator, nhr = make_nhr()
+    temperature = []
+
+    with pytest.raises(KeyError):
+        with nhr.batch():
+            nhr.channel0.voltage.setpoint = 100
+            thread = threading.Thread(
+                target=lambda: temperature.append(nhr.temperature)
+            )
+            thread.start()
+            thread.join()
+            raise KeyError
+
+    assert temperature == [33.0]
+    assert nhr.setpoints == pytest.approx((0.0, 0.0))
+
+
+def test_deferred_reads_of_multi_query_getters():
+    simulator, nhr = make_nhr(channels=3)
+    nhr.channel1.voltage.setpoint = 50
+    bursts = simulator.bursts
+
+    with nhr.batch() as b:
+        voltages = b.read(lambda: nhr.voltages)
+        setpoints = b.read(lambda: nhr.setpoints)
+        both = b.read(
+            lambda: (
+                nhr._query_channels(":READ:VOLT?"),
+                [int(v) for v in nhr._query_channels(":READ:CHAN:STAT?")],
+            )
+        )
+
+    assert simulator.bursts == bursts + 1
+    assert voltages.value == pytest.approx((0.0, 0.0, 0.0))
+    assert setpoints.value == pytest.approx((0.0, 50.0, 0.0))
+    assert len(both.value[0]) == len(both.value[1]) == 3
+
+
+def test_queries_missed_while_recording_are_sent_on_replay():
+    simulator, nhr = make_nhr()
+
+    def getter():
+        if nhr._query(":READ:MOD:TEMP?") == "0":
+            raise ValueError("placeholder")
+        return nhr.temperature, nhr.channel1.voltage.measured
+
+    with nhr.batch() as b:
+        value = b.read(getter)
+
+    assert value.value == (33.0, 0.0)
+    assert simulator.commands[-2:] == [":READ:MOD:TEMP?", ":MEAS:VOLT? (@1)"]
+
+
+def test_deferred_reads_without_queries_are_resolved():
+    simulator, nhr = make_nhr()
+    bursts = simulator.bursts
+
+    with nhr.batch() as b:
+        constant = b.read(lambda: 42)
+        failing = b.read(lambda: {}["missing"])
+
+    assert constant.value == 42
+    with pytest.raises(KeyError):
+        failing.value
+    assert b.bursts == 0
+    assert simulator.bursts == bursts
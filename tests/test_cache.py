@@ -0,0 +1,89 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator), write_cache=True)
+
+
+def sent_after(simulator, mark):
+    return simulator.commands[mark:]
+
+
+def test_unchanged_setpoint_is_not_written_again():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    voltage = nhr.channel0.voltage
+
+    voltage.setpoint = 100
+    mark = len(simulator.commands)
+    voltage.setpoint = 100.0
+    voltage.setpoint = 200
+
+    assert sent_after(simulator, mark) == [":VOLT 200,(@0)"]
+    assert nhr.write_cache.skipped == 1
+
+
+def test_read_back_confirms_value_and_ramp_speed_sets_both_directions():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    ramp = nhr.channel0.voltage.ramp
+
+    assert nhr.channel0.voltage.bounds == pytest.approx(0.0)
+    ramp.speed = 20
+    mark = len(simulator.commands)
+    nhr.channel0.voltage.bounds = 0
+    ramp.speed_up = 20
+    ramp.speed_down = 20
+    nhr.channel0.current.bounds = 1e-6
+
+    assert sent_after(simulator, mark) == [":CURR:BOU 1e-06,(@0)"]
+
+
+def test_reset_emergency_off_and_local_invalidate():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    nhr.channel0.voltage.setpoint = 100
+    nhr.channel1.voltage.setpoint = 100
+
+    nhr.channel0.emergency_off()
+    mark = len(simulator.commands)
+    nhr.channel0.voltage.setpoint = 100
+    nhr.channel1.voltage.setpoint = 100
+    assert sent_after(simulator, mark) == [":VOLT 100,(@0)"]
+
+    nhr.reset()
+    mark = len(simulator.commands)
+    nhr.channel1.voltage.setpoint = 100
+    assert sent_after(simulator, mark) == [":VOLT 100,(@1)"]
+
+    nhr.local()
+    mark = len(simulator.commands)
+    nhr.channel1.voltage.setpoint = 100
+    nhr.channel1.voltage.setpoint = 100
+    assert len(sent_after(simulator, mark)) == 2
+
+    nhr.lockout()
+    nhr.channel1.voltage.setpoint = 100
+    mark = len(simulator.commands)
+    nhr.channel1.voltage.setpoint = 100
+    assert sent_after(simulator, mark) == []
+
+
+def test_cache_filters_redundant_writes_in_pipelines():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    nhr.apply({"channels": {0: {"setpoint": 10}, 1: {"setpoint": 20}}})
+    mark = len(simulator.commands)
+
+    assert nhr._pipeline([":VOLT 10.0,(@0)", ":VOLT 30,(@1)"]) == [None, None]
+    assert sent_after(simulator, mark) == [":VOLT 30,(@1)"]
+
+
+def test_cache_is_disabled_by_default():
+    nhr = NHR(transport=SerialTransport.from_serial(SimulatedModule(channels=1)))
+
+    assert nhr.write_cache is None
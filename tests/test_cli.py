@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.cli import CSV_COLUMNS, build_parser, monitor, read_snapshot
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+class FakeClock:
+    def __init__(self, step=0.0):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_nhr(channels=2):
+    simulator = SimulatedModule(channels=channels)
+    simulator.channels[1].setpoint = 100.0
+    simulator.channels[1].voltage = 100.0
+    simulator.channels[1].on = True
+    return simulator, NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_snapshot_is_one_burst():
+    simulator, nhr = make_nhr()
+    sent = len(simulator.commands)
+    snapshot = read_snapshot(nhr)
+
+    assert len(simulator.commands) - sent == 10
+    assert snapshot["voltage"][1] == pytest.approx(100.0)
+    assert len(snapshot["current"]) == len(snapshot["status"]) == 2
+    assert snapshot["temperature"] == 33.0
+    assert snapshot["n24v"] == -24.0
+
+
+def test_monitor_streams_json_lines():
+    _, first = make_nhr()
+    _, second = make_nhr(channels=4)
+    clock = FakeClock()
+    out = io.StringIO()
+    report = monitor(
+        [("COM1", first), ("COM2", second)],
+        out,
+        rate=10.0,
+        cycles=3,
+        clock=clock,
+        sleep=clock.sleep,
+        timestamp=clock,
+    )
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(r["port"], r["cycle"]) for r in records[:2]] == [("COM1", 0), ("COM2", 0)]
+    assert len(records) == 6
+    assert len(records[1]["voltage"]) == 4
+    assert report.cycles == 3 and report.dropped == 0
+    assert report.rate == pytest.approx(10.0, rel=0.5)
+
+
+def test_monitor_counts_dropped_cycles():
+    _, nhr = make_nhr()
+    # every clock reading advances 0.1 s, so a cycle overruns its 0.05 s slot
+    clock = FakeClock(step=0.1)
+    report = monitor(
+        [("COM1", nhr)],
+        io.StringIO(),
+        rate=20.0,
+        cycles=4,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    assert report.cycles == 4
+    assert report.dropped > 0
+
+
+def test_monitor_writes_csv_rows_per_channel():
+    _, nhr = make_nhr()
+    clock = FakeClock()
+    out = io.StringIO()
+    monitor(
+        [("COM1", nhr)],
+        out,
+        format="csv",
+        cycles=2,
+        clock=clock,
+        sleep=clock.sleep,
+        timestamp=clock,
+    )
+
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert tuple(rows[0]) == CSV_COLUMNS
+    assert len(rows) == 1 + 2 * 2
+    assert [row[3] for row in rows[1:3]] == ["0", "1"]
+
+
+def test_parser_reads_monitor_options():
+    args = build_parser().parse_args(
+        ["monitor", "COM1", "COM2", "--rate", "50", "-f", "csv", "-n", "10"]
+    )
+    assert args.ports == ["COM1", "COM2"]
+    assert (args.rate, args.format, args.cycles) == (50.0, "csv", 10)
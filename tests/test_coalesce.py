@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+QUERY = ":MEAS:VOLT? (@0)"
+
+
+def make_nhr(**kwargs):
+    simulator = SimulatedModule(channels=2, latency=0.05, timeout=0.5)
+    state = simulator.channels[0]
+    state.setpoint = state.voltage = 100.0
+    state.on = True
+    return simulator, NHR(transport=SerialTransport.from_serial(simulator), **kwargs)
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 2.0
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def read_in_threads(nhr, count, results):
+    threads = [
+        threading.Thread(target=lambda: results.append(nhr.channel0.voltage.measured))
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_reads_share_one_query():
+    simulator, nhr = make_nhr()
+    results = []
+    (leader,) = read_in_threads(nhr, 1, results)
+    wait_for(lambda: QUERY in simulator.commands)
+    followers = read_in_threads(nhr, 4, results)
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert simulator.commands.count(QUERY) == 1
+    assert results == [pytest.approx(100.0)] * 5
+    assert nhr._device.coalesced == 4
+
+
+def test_write_is_a_barrier_for_its_channel():
+    simulator, nhr = make_nhr()
+    connection = nhr._device
+    results = []
+    (leader,) = read_in_threads(nhr, 1, results)
+    wait_for(lambda: QUERY in simulator.commands)
+
+    # a write to another channel keeps the flight shared
+    connection._invalidate(":VOLT OFF,(@1)")
+    assert QUERY in connection._flights
+
+    writer = threading.Thread(target=nhr.channel0.off)
+    writer.start()
+    wait_for(lambda: QUERY not in connection._flights)
+    (follower,) = read_in_threads(nhr, 1, results)
+    for thread in (leader, writer, follower):
+        thread.join()
+
+    assert simulator.commands.count(QUERY) == 2
+    assert connection.coalesced == 0
+
+
+def test_lock_holder_does_not_wait_for_other_flights():
+    simulator, nhr = make_nhr()
+    results = []
+    with nhr._device.lock:
+        (leader,) = read_in_threads(nhr, 1, results)
+        wait_for(lambda: QUERY in nhr._device._flights)
+        results.append(nhr.channel0.voltage.measured)
+    leader.join()
+
+    assert len(results) == 2
+    assert simulator.commands.count(QUERY) == 2
+
+
+def test_coalescing_can_be_disabled():
+    simulator, nhr = make_nhr(coalesce_reads=False)
+    results = []
+    (leader,) = read_in_threads(nhr, 1, results)
+    wait_for(lambda: QUERY in simulator.commands)
+    followers = read_in_threads(nhr, 2, results)
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert simulator.commands.count(QUERY) == 3
+
+
+def test_batched_write_is_a_barrier_for_its_channel():
+    simulator, nhr = make_nhr()
+    connection = nhr._device
+    setpoint = ":READ:VOLT? (@0)"
+    results = []
+
+    def read_setpoint():
+        results.append(nhr.channel0.voltage.setpoint)
+
+    leader = threading.Thread(target=read_setpoint)
+    leader.start()
+    wait_for(lambda: setpoint in simulator.commands)
+
+    flushing = threading.Event()
+
+    def write_setpoint():
+        with nhr.batch():
+            nhr.channel0.voltage.setpoint = 50.0
+            nhr.channel1.voltage.setpoint = 50.0
+            flushing.set()
+
+    writer = threading.Thread(target=write_setpoint)
+    writer.start()
+    flushing.wait()
+    # the flush waits for the lock held by the leader
+    time.sleep(0.01)
+    assert setpoint not in connection._flights
+    reader = threading.Thread(target=read_setpoint)
+    reader.start()
+    for thread in (leader, writer, reader):
+        thread.join()
+
+    assert simulator.commands.count(setpoint) == 2
+    assert connection.coalesced == 0
+    assert results[0] == pytest.approx(100.0)
+    assert nhr.channel0.voltage.setpoint == pytest.approx(50.0)
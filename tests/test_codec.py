@@ -0,0 +1,84 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.codec import COMMANDS, Endpoint, Number, Values
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_decoders_handle_units_exponents_and_lists():
+    assert Number("V")("1.00000E+03V") == 1000.0
+    assert Number("V/s")("-2.5E-01V/s") == -0.25
+    assert Number("", int)("12") == 12
+    assert Values(Number("A"))("1.0E-06A,2.0E-06A") == [1e-6, 2e-6]
+    assert COMMANDS[":READ:RAMP:CURR:MAX?"]("4.0E-04A/s") == pytest.approx(4e-4)
+    assert COMMANDS[":CONF:OUTP:POL?"]("p") == "p"
+
+
+def test_endpoint_reuses_compiled_commands():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    endpoint = Endpoint(nhr._device, 1, "channel 1")
+
+    assert isinstance(endpoint.get(":READ:CHAN:STAT?"), int)
+    assert endpoint.get(":READ:VOLT:NOM?") == simulator.channels[1].voltage_nominal
+    endpoint.write(":VOLT 12.5")
+    assert simulator.commands[-1] == ":VOLT 12.5,(@1)"
+    assert endpoint._queries == {
+        ":READ:CHAN:STAT?": ":READ:CHAN:STAT? (@1)",
+        ":READ:VOLT:NOM?": ":READ:VOLT:NOM? (@1)",
+    }
+
+
+def test_endpoint_reports_echo_errors_with_label():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    endpoint = Endpoint(nhr._device, 0, "channel 0 voltage")
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+
+    with pytest.raises(ValueError, match="channel 0 voltage error in command :VOLT 1,"):
+        endpoint.write(":VOLT 1")
+
+
+def test_properties_decode_through_table():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+
+    assert nhr.channel0.voltage.ramp.max == simulator.channels[0].voltage_nominal / 5
+    assert nhr.channel0.current.ramp.min == 1e-6
+    assert nhr.channel0.on_state is False
+    assert nhr.supply.p24v == 24.0
+    assert nhr.temperature == 33.0
+    assert nhr.number_channels == 1
+    assert nhr.operation_complete is True
+    assert nhr.config == "normal mode"
+    assert nhr._endpoint._queries.keys() >= {":READ:MOD:TEMP?", ":READ:MOD:CHAN?"}
+    with pytest.raises(AttributeError):
+        nhr.channel0.voltage.undefined = 1
+
+
+def test_tables_of_other_modules_decode_through_codec():
+    from iseg_nhr.cache import QUERIES
+    from iseg_nhr.config import PARAMETERS
+
+    for name, parameter in PARAMETERS.items():
+        if name != "polarity":
+            assert parameter.parse is COMMANDS[parameter.query]
+    assert set(QUERIES) <= set(COMMANDS)
+    assert COMMANDS[":READ:MOD:TEMP?"]("33.0C") == 33.0
+
+
+def test_only_queries_are_kept_encoded():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    transport = nhr._device.transport
+
+    nhr.channel0.voltage.setpoint = 12.5
+    nhr.channel0.voltage.measured
+
+    assert ":MEAS:VOLT? (@0)" in transport._encoded
+    assert all("?" in cmd for cmd in transport._encoded)
@@ -0,0 +1,85 @@
+import pytest
+
+from iseg_nhr import NHR, Polarity
+from iseg_nhr.config import diff
+from iseg_nhr.register import ControlRegister
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+CONFIG = {
+    "control": {"SetKillEnable": True},
+    "channels": {
+        0: {"setpoint": 1000, "ramp_up": 50, "ramp_down": 100, "inhibit": 1},
+        "1": {"polarity": "negative", "voltage_bounds": 5, "current_bounds": 1e-6},
+    },
+}
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_apply_reads_back_in_one_burst_and_writes_only_changes():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    sent = len(simulator.commands)
+
+    changes = nhr.apply(CONFIG)
+
+    assert [(c.channel, c.name) for c in changes] == [
+        (None, "SetKillEnable"),
+        (1, "polarity"),
+        (0, "inhibit"),
+        (0, "ramp_up"),
+        (1, "current_bounds"),
+        (1, "voltage_bounds"),
+        (0, "setpoint"),
+    ]
+    assert simulator.commands[sent : sent + 9] == [
+        ":READ:MOD:CONT?",
+        ":CONF:OUTP:POL? (@1)",
+        ":CONF:INH:ACT? (@0)",
+        ":CONF:RAMP:VOLT:UP? (@0)",
+        ":CONF:RAMP:VOLT:DOWN? (@0)",
+        ":READ:CURR:BOU? (@1)",
+        ":READ:VOLT:BOU? (@1)",
+        ":READ:VOLT? (@0)",
+        ":MEAS:VOLT? (@1)",
+    ]
+    assert ControlRegister.SetKillEnable in nhr.control_register
+    assert nhr.channel1.polarity == Polarity.NEGATIVE
+    assert nhr.setpoints == pytest.approx((1000.0, 0.0))
+    assert nhr.channel0.voltage.ramp.speed_up == pytest.approx(50.0)
+
+
+def test_reapplying_configuration_writes_nothing():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    nhr.apply(CONFIG)
+    sent = len(simulator.commands)
+
+    assert nhr.apply(CONFIG) == []
+    assert all("?" in cmd for cmd in simulator.commands[sent:])
+
+
+def test_polarity_change_requires_zero_voltage():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    simulator.channels[0].voltage = 10.0
+
+    with pytest.raises(ValueError, match="non-zero voltage"):
+        diff(nhr, {"channels": {0: {"polarity": Polarity.NEGATIVE}}})
+
+
+def test_invalid_configuration_is_rejected_before_any_io():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    sent = len(simulator.commands)
+
+    with pytest.raises(ValueError, match="unknown parameters"):
+        nhr.apply({"channels": {0: {"setpiont": 1}}})
+    with pytest.raises(ValueError, match="inhibit option"):
+        nhr.apply({"channels": {0: {"inhibit": 7}}})
+    with pytest.raises(ValueError, match="can not be configured"):
+        nhr.apply({"control": {"DoClear": True}})
+    assert len(simulator.commands) == sent
@@ -0,0 +1,130 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.coordinator import RampCoordinator
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_group(ramp_speeds):
+    clock = FakeClock()
+    simulator = SimulatedModule(channels=len(ramp_speeds), clock=clock)
+    for state, speed in zip(simulator.channels, ramp_speeds):
+        state.voltage_ramp_up = state.voltage_ramp_down = speed
+    nhr = NHR(transport=SerialTransport.from_serial(simulator))
+    for ch in range(len(ramp_speeds)):
+        nhr.channel(ch).on()
+    return clock, simulator, nhr
+
+
+def test_serial_pipeline_writes_burst_and_reads_replies():
+    simulator = SimulatedModule(channels=2)
+    nhr = NHR(transport=SerialTransport.from_serial(simulator))
+
+    responses = nhr._pipeline([":VOLT 10,(@0)", ":READ:VOLT? (@0)"])
+
+    assert responses == [None, "1.00000E+01V"]
+
+
+def test_ramp_keeps_channels_together_despite_different_ramp_speeds():
+    clock, simulator, nhr = make_group([100.0, 20.0])
+    coordinator = RampCoordinator(
+        nhr, [0, 1], max_difference=50.0, clock=clock, sleep=clock.sleep
+    )
+
+    report = coordinator.ramp_to(200.0)
+
+    assert report.steps == 8
+    assert report.max_spread <= 50.0
+    assert nhr.voltages == pytest.approx((200.0, 200.0))
+    assert ":VOLT 25.0,(@0-1)" in simulator.commands
+
+
+def test_ramp_to_different_targets_uses_pipelined_writes():
+    clock, simulator, nhr = make_group([100.0, 100.0])
+    coordinator = RampCoordinator(
+        nhr, [0, 1], max_difference=100.0, step=100.0, clock=clock, sleep=clock.sleep
+    )
+
+    coordinator.ramp_to([100.0, 50.0])
+
+    index = simulator.commands.index(":VOLT 100.0,(@0)")
+    assert simulator.commands[index + 1] == ":VOLT 50.0,(@1)"
+    assert nhr.setpoints == pytest.approx((100.0, 50.0))
+
+
+def test_ramp_holds_and_raises_when_difference_exceeded():
+    clock, simulator, nhr = make_group([100.0, 1.0])
+    coordinator = RampCoordinator(
+        nhr,
+        [0, 1],
+        max_difference=20.0,
+        step=100.0,
+        poll_interval=0.5,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+    with pytest.raises(ValueError, match="exceeds"):
+        coordinator.ramp_to(100.0)
+    assert nhr.setpoints[0] == pytest.approx(nhr.voltages[0], abs=1.0)
+
+
+def test_targets_outside_bound_are_rejected():
+    clock, simulator, nhr = make_group([100.0, 100.0])
+    coordinator = RampCoordinator(nhr, [0, 1], max_difference=10.0)
+
+    with pytest.raises(ValueError, match="differ"):
+        coordinator.ramp_to([0.0, 100.0])
+
+
+def test_ramp_holds_and_raises_when_a_channel_is_off():
+    clock, simulator, nhr = make_group([10.0, 10.0])
+    nhr.channel1.off()
+    coordinator = RampCoordinator(
+        nhr, [0, 1], max_difference=50.0, clock=clock, sleep=clock.sleep
+    )
+
+    with pytest.raises(ValueError, match=r"channels \[1\] are off or tripped"):
+        coordinator.ramp_to(0.0)
+    assert clock.now < 1.0
+
+
+class ClampedModule(SimulatedModule):
+    """
+    Simulator whose last channel does not rise above 20 V
+    """
+
+    def _advance(self):
+        super()._advance()
+        state = self.channels[-1]
+        state.voltage = min(state.voltage, 20.0)
+
+
+def test_ramp_times_out_by_default_when_a_channel_stops_short():
+    clock = FakeClock()
+    simulator = ClampedModule(channels=2, clock=clock)
+    for state in simulator.channels:
+        state.voltage_ramp_up = state.voltage_ramp_down = 10.0
+    nhr = NHR(transport=SerialTransport.from_serial(simulator))
+    nhr.channel0.on()
+    nhr.channel1.on()
+    coordinator = RampCoordinator(
+        nhr, [0, 1], max_difference=50.0, clock=clock, sleep=clock.sleep
+    )
+
+    # 30 V at 10 V/s: 6 s at twice the ramp time, 5 s slack, one poll per step
+    with pytest.raises(TimeoutError, match="within 11.2 s"):
+        coordinator.ramp_to(30.0)
+    assert clock.now == pytest.approx(11.3, abs=0.2)
@@ -0,0 +1,49 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.dryrun import DryRunTransport
+
+
+def test_single_query_cost_follows_line_settings():
+    transport = DryRunTransport(channels=1, turnaround=0.0, response_length=10)
+    nhr = NHR(transport=transport)
+
+    with transport.measure() as report:
+        nhr.channel0.voltage.measured
+
+    # 18 characters command, 18 echo, 12 response, 10 bits each at 9600 baud
+    assert report.transactions[0].command == ":MEAS:VOLT? (@0)"
+    assert report.seconds == pytest.approx((18 + 18 + 12) * 10 / 9600)
+
+
+def test_channel_list_and_batched_reads_are_cheaper_than_a_loop():
+    transport = DryRunTransport(channels=6)
+    nhr = NHR(transport=transport)
+
+    with transport.measure() as loop:
+        voltages = nhr.voltages
+    with transport.measure() as bulk:
+        nhr._query_channels(":MEAS:VOLT?")
+    with transport.measure() as batched:
+        with nhr.batch() as b:
+            b.read(lambda: nhr.voltages)
+
+    assert voltages == (0.0,) * 6
+    assert len(loop.transactions) == 6
+    assert loop.bursts == 6
+    assert batched.bursts == 1
+    assert bulk.seconds < batched.seconds < loop.seconds
+    assert "6 commands in 1 bursts" in batched.summary()
+
+
+def test_report_accumulates_until_reset():
+    transport = DryRunTransport(channels=2)
+    nhr = NHR(transport=transport)
+    nhr.temperature
+
+    assert [t.command for t in transport.report.transactions] == [
+        ":READ:MOD:CHAN?",
+        ":READ:MOD:TEMP?",
+    ]
+    transport.reset()
+    assert transport.report.transactions == []
@@ -0,0 +1,142 @@
+import socket
+import struct
+import threading
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.engine import EngineTransport, IOEngine, query, read_measurements
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+
+
+class SocketModule:
+    """
+    Serve a simulated module on one end of a socket pair
+    """
+
+    def __init__(self, channels=2, silent=False):
+        self.simulator = SimulatedModule(channels=channels, timeout=0.0)
+        self.host, device = socket.socketpair()
+        self._device = device
+        self._silent = silent
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            data = self._device.recv(4096)
+            if not data:
+                return
+            self.simulator.write(data)
+            while not self._silent and self.simulator.in_waiting:
+                self._device.sendall(self.simulator.readline())
+
+    def close(self):
+        # shutdown wakes the serving thread, which close alone does not
+        try:
+            self._device.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._thread.join()
+        self._device.close()
+
+
+@pytest.fixture
+def modules():
+    modules = [SocketModule(channels=2) for _ in range(3)]
+    yield modules
+    for module in modules:
+        module.close()
+
+
+def test_gather_polls_all_ports_from_one_thread(modules):
+    engine = IOEngine()
+    ports = [engine.attach(module.host) for module in modules]
+    state = modules[1].simulator.channels[0]
+    state.voltage = state.setpoint = 12.5
+    state.on = True
+
+    results = engine.gather(
+        {port.name: (port, read_measurements([0, 1])) for port in ports}
+    )
+
+    assert results["port0"] == [(0.0, 0.0), (0.0, 0.0)]
+    assert results["port1"][0][0] == 12.5
+    assert modules[2].simulator.commands == [
+        ":MEAS:VOLT? (@0-1)",
+        ":MEAS:CURR? (@0-1)",
+    ]
+    engine.close()
+
+
+def test_operation_errors_and_timeouts_are_returned(modules):
+    engine = IOEngine()
+    silent = SocketModule(silent=True)
+    good, corrupt = engine.attach(modules[0].host), engine.attach(modules[1].host)
+    bad = engine.attach(silent.host, timeout=0.05)
+    modules[1].simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+
+    results = engine.gather(
+        {
+            "good": (good, query("*IDN?")),
+            "corrupt": (corrupt, query("*IDN?")),
+            "silent": (bad, query("*IDN?")),
+        }
+    )
+
+    assert results["good"].startswith("iseg Spezialelektronik GmbH")
+    assert isinstance(results["corrupt"], ValueError)
+    assert isinstance(results["silent"], TimeoutError)
+    silent.close()
+    engine.close()
+
+
+def test_engine_transport_drives_nhr(modules):
+    engine = IOEngine()
+    nhr = NHR(transport=EngineTransport(engine, engine.attach(modules[0].host)))
+
+    nhr.channel1.voltage.setpoint = 100.0
+    with nhr.batch() as b:
+        setpoints = b.read(lambda: nhr.setpoints)
+
+    assert nhr.number_channels == 2
+    assert setpoints.value == (0.0, 100.0)
+    nhr.close()
+
+
+def test_gather_on_closed_port_completes(modules):
+    engine = IOEngine()
+    port = engine.attach(modules[0].host)
+    modules[0].close()
+    while not port.closed:
+        engine.run_once(0.1)
+
+    results = engine.gather({"closed": (port, read_measurements([0, 1]))})
+
+    assert isinstance(results["closed"], ConnectionError)
+    engine.close()
+
+
+def test_reset_port_fails_alone(modules):
+    server = socket.create_server(("127.0.0.1", 0))
+    host = socket.create_connection(server.getsockname())
+    peer, _ = server.accept()
+    server.close()
+    engine = IOEngine()
+    broken = engine.attach(host, timeout=1.0)
+    good = engine.attach(modules[0].host)
+    # closing with a zero linger time resets the connection
+    peer.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    peer.close()
+
+    results = engine.gather(
+        {
+            "broken": (broken, read_measurements([0, 1])),
+            "good": (good, query("*IDN?")),
+        }
+    )
+
+    assert isinstance(results["broken"], ConnectionError)
+    assert broken.closed
+    assert results["good"].startswith("iseg Spezialelektronik GmbH")
+    engine.close()
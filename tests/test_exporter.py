@@ -0,0 +1,127 @@
+import time
+import urllib.request
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.exporter import (
+    OPENMETRICS_TYPE,
+    MetricsCache,
+    MetricsExporter,
+    read_module,
+    render,
+)
+from iseg_nhr.register import ChannelEventRegister
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(channels=2):
+    simulator = SimulatedModule(channels=channels)
+    state = simulator.channels[1]
+    state.setpoint = state.voltage = 250.0
+    state.on = True
+    return simulator, NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_module_is_read_in_one_burst():
+    simulator, nhr = make_nhr()
+    simulator.inject_event(0, ChannelEventRegister.CurrentTrip)
+    sent = len(simulator.commands)
+    reading = read_module(nhr, clock=lambda: 100.0)
+
+    assert len(simulator.commands) - sent == 14
+    assert reading.voltages[1] == pytest.approx(250.0)
+    assert reading.setpoints == [0.0, 250.0]
+    assert reading.channel_events[0] >> ChannelEventRegister.CurrentTrip.value & 1
+    assert reading.supply["p24v"] == 24.0
+    assert reading.temperature == 33.0
+
+
+def test_render_labels_and_units():
+    _, nhr = make_nhr()
+    text = render({"COM3": read_module(nhr, clock=lambda: 100.0), "COM4": None})
+
+    assert 'iseg_nhr_up{module="COM3"} 1' in text
+    assert 'iseg_nhr_up{module="COM4"} 0' in text
+    assert "# UNIT iseg_nhr_channel_voltage_volts volts" in text
+    assert 'iseg_nhr_channel_setpoint_volts{module="COM3",channel="1"} 250.0' in text
+    assert 'iseg_nhr_module_supply_volts{module="COM3",rail="n24v"} -24.0' in text
+    assert 'iseg_nhr_channel_status{module="COM3",channel="1",bit="IsOn"} 1' in text
+    assert text.endswith("# EOF\n")
+
+    prometheus = render({"COM3": None}, openmetrics=False)
+    assert "# EOF" not in prometheus and "# UNIT" not in prometheus
+
+
+def test_failed_readout_marks_module_down():
+    simulator, nhr = make_nhr()
+    cache = MetricsCache({"COM3": nhr})
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+    cache.poll()
+
+    assert cache.readings == {"COM3": None}
+    assert b'iseg_nhr_up{module="COM3"} 0' in cache.exposition()[0]
+
+
+def test_scrapes_do_not_touch_the_port():
+    simulator, nhr = make_nhr()
+    with MetricsExporter({"COM3": nhr}, port=0, interval=60.0) as exporter:
+        host, port = exporter.address
+        while exporter.cache.polls == 0:
+            time.sleep(0.001)
+        sent = len(simulator.commands)
+        for _ in range(5):
+            request = urllib.request.Request(
+                f"http://{host}:{port}/metrics",
+                headers={"Accept": "application/openmetrics-text"},
+            )
+            with urllib.request.urlopen(request) as response:
+                assert response.headers["Content-Type"] == OPENMETRICS_TYPE
+                body = response.read()
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+
+    assert b"iseg_nhr_channel_voltage_volts" in body
+    assert len(simulator.commands) == sent
+    assert exporter.cache.scrapes == 6
+
+
+def test_special_values_and_staleness():
+    simulator, nhr = make_nhr()
+    now = [100.0]
+    cache = MetricsCache({"COM3": nhr}, clock=lambda: now[0])
+    cache.poll()
+    now[0] = 105.0
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+    cache.poll()
+
+    text = cache.exposition()[0].decode()
+    assert 'iseg_nhr_up{module="COM3"} 0' in text
+    assert 'iseg_nhr_last_success_timestamp_seconds{module="COM3"} 100.0' in text
+
+    reading = read_module(make_nhr()[1], clock=lambda: 100.0)
+    reading.voltages[0] = float("nan")
+    reading.currents[0] = float("inf")
+    reading.supply["n24v"] = float("-inf")
+    text = render({"COM3": reading})
+    assert 'iseg_nhr_channel_voltage_volts{module="COM3",channel="0"} NaN' in text
+    assert 'iseg_nhr_channel_current_amperes{module="COM3",channel="0"} +Inf' in text
+    assert 'iseg_nhr_module_supply_volts{module="COM3",rail="n24v"} -Inf' in text
+
+
+def test_poller_survives_unexpected_errors():
+    class BrokenModule:
+        _channels = 1
+
+        def batch(self):
+            raise RuntimeError("unexpected")
+
+    cache = MetricsCache({"COM3": BrokenModule()}, interval=0.001)
+    cache.start()
+    try:
+        while cache.polls < 3:
+            time.sleep(0.001)
+    finally:
+        cache.stop()
+    assert cache.readings == {"COM3": None}
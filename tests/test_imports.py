@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+# generous bound on the time to import the driver, for slow CI machines [s]
+IMPORT_BUDGET = 0.5
+
+
+def run(code):
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_package_import_loads_nothing():
+    result = run(
+        "import sys, iseg_nhr;"
+        "print(sorted(m for m in sys.modules if m.startswith(('iseg_nhr', 'serial'))))"
+    )
+    assert result.stdout.strip() == "['iseg_nhr']"
+
+
+def test_simulated_nhr_does_not_import_unused_subsystems():
+    result = run(
+        "import sys\n"
+        "from iseg_nhr import NHR\n"
+        "from iseg_nhr.simulator import SimulatedModule\n"
+        "from iseg_nhr.transport import SerialTransport\n"
+        "NHR(transport=SerialTransport.from_serial(SimulatedModule())).voltages\n"
+        "print(' '.join(sorted(sys.modules)))"
+    )
+    loaded = set(result.stdout.split())
+    for name in (
+        "serial",
+        "iseg_nhr.batch",
+        "iseg_nhr.config",
+        "iseg_nhr.metadata",
+        "iseg_nhr.monitor",
+        "iseg_nhr.trace",
+        "concurrent.futures",
+    ):
+        assert name not in loaded
+
+
+def test_import_time_budget():
+    result = run(
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "from iseg_nhr import NHR\n"
+        "print(time.perf_counter() - start)"
+    )
+    assert float(result.stdout) < IMPORT_BUDGET
@@ -0,0 +1,98 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.loadtest import percentile, run_load, simulated_modules
+from iseg_nhr.register import ChannelStatusRegister
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_simulated_module_runs_real_channel_code_paths():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+
+    nhr.channel1.voltage.setpoint = 250
+    nhr.channel1.voltage.bounds = 5
+
+    assert nhr.setpoints == pytest.approx((0.0, 250.0))
+    assert nhr.channel1.voltage.bounds == pytest.approx(5.0)
+    assert ChannelStatusRegister.IsPositive in nhr.channel1.status_register
+    assert simulator.commands[-1] == ":READ:CHAN:STAT? (@1)"
+
+
+def test_simulated_module_ramps_towards_setpoint():
+    now = [0.0]
+    simulator = SimulatedModule(channels=1, clock=lambda: now[0])
+    nhr = make_nhr(simulator)
+
+    nhr.channel0.voltage.setpoint = 1000
+    nhr.channel0.on()
+    now[0] = 2.0
+
+    assert nhr.channel0.voltage.measured == pytest.approx(200.0)
+    assert ChannelStatusRegister.IsVoltageRamp in nhr.channel0.status_register
+
+
+def test_corrupted_echo_raises_and_next_command_recovers():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0, seed=1))
+
+    with pytest.raises(ValueError, match="error in command"):
+        nhr.channel0.voltage.measured
+
+    simulator.set_faults(FaultProfile())
+    assert nhr.channel0.voltage.measured == pytest.approx(0.0)
+
+
+def test_dropped_reply_raises_timeout():
+    simulator = SimulatedModule(channels=1, timeout=0.001)
+    nhr = make_nhr(simulator)
+    simulator.set_faults(FaultProfile(timeout=1.0))
+
+    with pytest.raises(TimeoutError):
+        nhr.temperature
+
+
+def test_percentile_uses_nearest_rank():
+    assert percentile([4, 1, 3, 2], 50) == 2
+    assert percentile([4, 1, 3, 2], 100) == 4
+
+
+def test_run_load_reports_errors_and_recovery():
+    modules = simulated_modules(
+        3,
+        channels=1,
+        faults=FaultProfile(corrupt_echo=0.1, stray_bytes=0.1, seed=0),
+        timeout=0.001,
+    )
+
+    report = run_load(modules, duration=0.2)
+
+    assert report.requests == report.successes + sum(report.errors.values())
+    assert report.successes > 0
+    assert report.errors
+    assert report.recovery_times
+    assert report.throughput > 0
+    assert "sustained" in report.summary()
+
+
+def test_run_load_counts_unexpected_errors():
+    (nhr,) = simulated_modules(1, channels=1)
+    calls = []
+
+    def flaky(nhr):
+        calls.append(None)
+        if len(calls) % 2:
+            raise RuntimeError("port gone")
+        return nhr.temperature
+
+    report = run_load([nhr], duration=0.05, operations=[flaky])
+
+    assert report.errors["RuntimeError"] == (len(calls) + 1) // 2
+    assert report.successes == len(calls) // 2
+    assert report.recovery_times
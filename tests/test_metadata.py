@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.metadata import MetadataCache, parse_identity
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator, cache):
+    return NHR(transport=SerialTransport.from_serial(simulator), metadata_cache=cache)
+
+
+def test_parse_identity():
+    assert parse_identity("iseg Spezialelektronik GmbH,NHR4,8200001,2.11") == (
+        "8200001",
+        "2.11",
+    )
+
+
+def test_second_connect_only_sends_identity(tmp_path):
+    path = tmp_path / "metadata.json"
+    cold = SimulatedModule(channels=2, serial_number="8200001")
+    nhr = make_nhr(cold, path)
+    assert nhr.channel1.voltage.maximum == cold.channels[1].voltage_nominal
+    stored = json.loads(path.read_text())["modules"]["8200001"]
+    assert stored["firmware"] == "2.11"
+    assert stored["responses"][":READ:RAMP:CURR:MAX? (@1)"].endswith("A/s")
+
+    warm = SimulatedModule(channels=2, serial_number="8200001")
+    nhr = make_nhr(warm, path)
+    assert nhr.number_channels == 2
+    assert nhr.firmware_release == "23.01.01"
+    assert nhr.channel0.voltage.ramp.max > 0
+    assert nhr.channel0.polarity_list == "p,n"
+    assert nhr.identity.endswith(",8200001,2.11")
+    assert warm.commands == ["*IDN?"]
+
+    nhr.channel0.voltage.setpoint = 5.0
+    assert warm.commands[-1] == ":VOLT 5.0,(@0)"
+
+
+def test_firmware_update_invalidates_entry(tmp_path):
+    cache = MetadataCache(tmp_path / "metadata.json")
+    make_nhr(SimulatedModule(channels=1, serial_number="1"), cache)
+    make_nhr(SimulatedModule(channels=3, serial_number="2"), cache)
+    assert cache.load("1", "2.11") is not None
+
+    updated = SimulatedModule(channels=1, serial_number="1", firmware_name="2.12")
+    make_nhr(updated, cache)
+    assert len(updated.commands) > 1
+    assert cache.load("1", "2.11") is None
+    assert cache.load("1", "2.12") is not None
+    assert cache.load("2", "2.11")[":READ:MOD:CHAN?"] == "3"
+
+    cache.invalidate("2")
+    assert cache.load("2", "2.11") is None
+
+
+def test_invalidate_replaces_file_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "metadata.json"
+    cache = MetadataCache(path)
+    cache.store("1", "2.11", {"*IDN?": "x"})
+    cache.store("2", "2.11", {"*IDN?": "y"})
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(json, "dump", fail)
+    with pytest.raises(OSError):
+        cache.invalidate("2")
+    monkeypatch.undo()
+
+    assert cache.load("2", "2.11") == {"*IDN?": "y"}
+    assert [p.name for p in tmp_path.iterdir()] == ["metadata.json"]
+    cache.invalidate()
+    assert cache.load("1", "2.11") is None
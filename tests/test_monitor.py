@@ -0,0 +1,199 @@
+import threading
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.channel import Channel
+from iseg_nhr.register import ChannelEventRegister, EventRegister
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_connection_keeps_query_and_response_together_across_threads():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    nhr.channel1.voltage.setpoint = 500
+    errors = []
+
+    def read(getter, expected):
+        for _ in range(200):
+            try:
+                assert getter() == expected
+            except Exception as error:
+                errors.append(error)
+
+    threads = [
+        threading.Thread(target=read, args=(lambda: nhr.setpoints, (0.0, 500.0))),
+        threading.Thread(target=read, args=(lambda: nhr.temperature, 33.0)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_poll_reports_raised_and_cleared_events_with_one_query_per_register():
+    simulator = SimulatedModule(channels=3)
+    nhr = make_nhr(simulator)
+    changes = []
+    nhr.monitor.subscribe(changes.append, channel=0)
+    nhr.monitor.subscribe(changes.append, channel=2)
+
+    simulator.inject_event(2, ChannelEventRegister.CurrentTrip)
+    nhr.monitor.poll()
+    nhr.channel2.event_clear()
+    nhr.monitor.poll()
+    nhr.monitor.stop()
+
+    assert simulator.commands.count(":READ:CHAN:EV:STAT? (@0,2)") == 2
+    assert [(c.channel, c.raised, c.cleared) for c in changes] == [
+        (2, (ChannelEventRegister.CurrentTrip,), ()),
+        (2, (), (ChannelEventRegister.CurrentTrip,)),
+    ]
+
+
+def test_subscribe_filters_events_and_runs_in_background():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    trips = []
+    done = threading.Event()
+
+    def on_trip(change):
+        trips.append(change)
+        done.set()
+
+    nhr.channel0.subscribe(on_trip, events=[ChannelEventRegister.CurrentTrip])
+    nhr.monitor.interval = 0.001
+    simulator.inject_event(0, ChannelEventRegister.Arc)
+    simulator.inject_event(0, ChannelEventRegister.CurrentTrip)
+
+    assert done.wait(1.0)
+    nhr.close()
+    assert ChannelEventRegister.CurrentTrip in trips[0].raised
+
+
+def test_slow_callback_does_not_block_polling():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    release = threading.Event()
+    changes = []
+    nhr.monitor.subscribe(lambda change: release.wait(1.0))
+    nhr.monitor.subscribe(changes.append)
+
+    simulator.inject_module_event(EventRegister.SafetyLoopNotGood)
+    nhr.monitor.poll()
+    simulator.inject_module_event(EventRegister.TemperatureNotGood)
+    nhr.monitor.poll()
+    release.set()
+    nhr.monitor.stop()
+
+    assert [c.raised for c in changes] == [
+        (EventRegister.SafetyLoopNotGood,),
+        (EventRegister.TemperatureNotGood,),
+    ]
+
+
+def test_subscribe_rejects_wrong_register_and_detached_channel():
+    nhr = make_nhr(SimulatedModule(channels=1))
+
+    with pytest.raises(ValueError, match="EventRegister"):
+        nhr.subscribe(print, events=[ChannelEventRegister.Arc])
+    with pytest.raises(RuntimeError, match="not attached"):
+        Channel(nhr._device, 0).subscribe(print)
+
+
+def test_loop_survives_failing_reads_and_callbacks():
+    class FlakyModule(SimulatedModule):
+        failures = 2
+
+        def write(self, data):
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("port failure")
+            return super().write(data)
+
+    simulator = FlakyModule(channels=1)
+    simulator.failures = 0
+    nhr = make_nhr(simulator)
+    received = threading.Event()
+
+    def broken(change):
+        raise RuntimeError("subscriber failure")
+
+    nhr.subscribe(broken)
+    nhr.subscribe(lambda change: received.set())
+    nhr.monitor.interval = 0.001
+    simulator.failures = 2
+    simulator.inject_module_event(EventRegister.SafetyLoopNotGood)
+
+    assert received.wait(1.0)
+    nhr.close()
+    assert simulator.failures == 0
+
+
+def test_changes_reach_each_subscriber_in_order():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    received = []
+    release = threading.Event()
+
+    def slow(change):
+        release.wait(1.0)
+        received.append("raised" if change.raised else "cleared")
+
+    nhr.monitor.subscribe(slow)
+    for _ in range(3):
+        simulator.inject_module_event(EventRegister.SafetyLoopNotGood)
+        nhr.monitor.poll()
+        nhr.event_clear()
+        nhr.monitor.poll()
+    release.set()
+    nhr.monitor.stop()
+
+    assert received == ["raised", "cleared"] * 3
+
+
+def test_unsubscribe_during_poll_does_not_leave_stale_state():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    monitor = nhr.monitor
+    subscription = monitor.subscribe(print, channel=0)
+    simulator.inject_event(0, ChannelEventRegister.CurrentTrip)
+    query_channels = nhr._query_channels
+
+    def unsubscribe_while_reading(cmd, channels=None):
+        subscription.cancel()
+        return query_channels(cmd, channels)
+
+    nhr._query_channels = unsubscribe_while_reading
+    assert monitor.poll() == []
+    nhr._query_channels = query_channels
+
+    changes = []
+    monitor.subscribe(changes.append, channel=0)
+    monitor.poll()
+    monitor.stop()
+    assert changes[0].raised == (ChannelEventRegister.CurrentTrip,)
+
+
+def test_callback_can_stop_the_monitor():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    stopped = threading.Event()
+
+    def stop(change):
+        nhr.monitor.stop()
+        stopped.set()
+
+    nhr.subscribe(stop)
+    nhr.monitor.interval = 0.001
+    simulator.inject_module_event(EventRegister.SafetyLoopNotGood)
+
+    assert stopped.wait(1.0)
+    assert not nhr.monitor.running
@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.channel import channel_list
+from iseg_nhr.poller import AdaptivePoller
+from iseg_nhr.register import ChannelStatusRegister
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_channel_list_uses_ranges_for_contiguous_channels():
+    assert channel_list([0, 1, 2, 3]) == "(@0-3)"
+    assert channel_list([0, 2]) == "(@0,2)"
+    assert channel_list([1]) == "(@1)"
+
+
+def test_query_channels_reads_all_channels_in_one_command():
+    simulator = SimulatedModule(channels=3)
+    nhr = make_nhr(simulator)
+
+    assert nhr._query_channels(":READ:VOLT?") == ["0.00000E+00V"] * 3
+    assert simulator.commands[-1] == ":READ:VOLT? (@0-2)"
+
+
+def test_poller_backs_off_stable_channels():
+    now = [0.0]
+    simulator = SimulatedModule(channels=2, clock=lambda: now[0])
+    poller = AdaptivePoller(
+        make_nhr(simulator), min_interval=1.0, max_interval=4.0, clock=lambda: now[0]
+    )
+
+    intervals = []
+    for _ in range(4):
+        samples = poller.poll()
+        intervals.append([sample.interval for sample in samples])
+        now[0] = poller.next_due()
+
+    assert intervals == [[1.0, 1.0], [2.0, 2.0], [4.0, 4.0], [4.0, 4.0]]
+
+
+def test_poller_speeds_up_ramping_channel():
+    now = [0.0]
+    simulator = SimulatedModule(channels=2, clock=lambda: now[0])
+    nhr = make_nhr(simulator)
+    poller = AdaptivePoller(
+        nhr, min_interval=1.0, max_interval=8.0, clock=lambda: now[0]
+    )
+    for _ in range(3):
+        now[0] = poller.next_due()
+        poller.poll()
+
+    nhr.channel1.voltage.setpoint = 1000
+    nhr.channel1.on()
+    now[0] += 0.5
+    samples = poller.poll()
+
+    assert [sample.channel for sample in samples] == [1]
+    assert ChannelStatusRegister.IsVoltageRamp in samples[0].status
+    assert samples[0].voltage == pytest.approx(50.0)
+    assert poller.intervals == {0: 8.0, 1: 1.0}
+
+
+class FakeTime(threading.Event):
+    """
+    Stop event whose `wait` advances a fake clock instead of blocking
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+        self.waits = []
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        self.now += timeout
+        return self.is_set()
+
+
+def test_poller_run_respects_transaction_budget():
+    time = FakeTime()
+    simulator = SimulatedModule(channels=1, clock=time)
+    poller = AdaptivePoller(
+        make_nhr(simulator), min_interval=0.001, budget=3.0, clock=time
+    )
+    collected = []
+
+    poller.run(collected.extend, stop=time, cycles=5)
+
+    # every cycle costs a status and two measurement queries, so the 1 ms
+    # interval is stretched to one cycle per second
+    assert len(collected) == 5
+    assert poller.transactions == 15
+    assert time.waits == pytest.approx([1.0] * 5)
+    assert poller.transactions / time.now == pytest.approx(poller.budget)
+    assert [b.timestamp - a.timestamp for a, b in zip(collected, collected[1:])] == (
+        pytest.approx([1.0] * 4)
+    )
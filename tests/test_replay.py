@@ -0,0 +1,75 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.replay import Recording, RecordingTransport, ReplayTransport
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+def record_session(path):
+    simulator = SimulatedModule(channels=2)
+    for ch, state in enumerate(simulator.channels):
+        state.voltage = state.setpoint = 100.0 * (ch + 1)
+        state.on = True
+    transport = RecordingTransport(SerialTransport.from_serial(simulator), path)
+    nhr = NHR(transport=transport)
+    voltages = nhr.voltages
+    nhr.channel0.voltage.setpoint = 150.0
+    with nhr.batch():
+        nhr.channel1.voltage.bounds = 5.0
+    simulator.set_faults(FaultProfile(timeout=1.0))
+    with pytest.raises(TimeoutError):
+        nhr.channel0.status_register
+    nhr.close()
+    return voltages
+
+
+def test_recording_round_trips_through_file(tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    record_session(path)
+
+    recording = Recording.load(path)
+
+    assert [r.commands for r in recording.records] == [
+        (":READ:MOD:CHAN?",),
+        (":MEAS:VOLT? (@0)",),
+        (":MEAS:VOLT? (@1)",),
+        (":VOLT 150.0,(@0)",),
+        (":VOLT:BOU 5.0,(@1)",),
+        (":READ:CHAN:STAT? (@0)",),
+    ]
+    assert recording.records[1].replies == ((":MEAS:VOLT? (@0)", "1.00000E+02V"),)
+    assert recording.records[4].pipelined
+    assert recording.records[5].error == "timeout"
+    assert all(r.duration >= 0 and r.gap >= 0 for r in recording.records)
+
+
+def test_strict_replay_reproduces_session(tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    voltages = record_session(path)
+    sleeps = []
+    replay = ReplayTransport(path, strict=True, timing=True, sleep=sleeps.append)
+
+    nhr = NHR(transport=replay)
+    assert nhr.voltages == voltages
+    nhr.channel0.voltage.setpoint = 150.0
+    with pytest.raises(ValueError, match="expected"):
+        nhr.channel0.voltage.setpoint = 151.0
+    assert len(sleeps) == 4
+    assert replay.remaining == 2
+
+
+def test_lookup_replay_serves_reordered_and_batched_commands(tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    record_session(path)
+    nhr = NHR(transport=ReplayTransport(path))
+
+    assert nhr._query_channels(":MEAS:VOLT?") == ["1.00000E+02V", "2.00000E+02V"]
+    with nhr.batch() as b:
+        nhr.channel0.voltage.setpoint = 1.0
+        second = b.read(lambda: nhr.channel1.voltage.measured)
+    assert second.value == 200.0
+    with pytest.raises(TimeoutError):
+        nhr.channel0.status_register
+    with pytest.raises(ValueError, match="not in recording"):
+        nhr.temperature
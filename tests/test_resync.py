@@ -0,0 +1,122 @@
+import pytest
+import serial
+
+from iseg_nhr import NHR
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+class OneShotModule(SimulatedModule):
+    """
+    Simulator applying its fault profile to the next command only
+    """
+
+    def _reply(self, cmd: str):
+        super()._reply(cmd)
+        self.faults = FaultProfile()
+
+
+class UnpluggableModule(SimulatedModule):
+    unplugged = False
+
+    def write(self, data: bytes) -> int:
+        if self.unplugged:
+            raise serial.SerialException("device disconnected")
+        return super().write(data)
+
+
+def test_resync_consumes_unread_replies():
+    simulator = SimulatedModule(channels=1, timeout=0.01)
+    transport = SerialTransport.from_serial(simulator, clear_input_before_write=False)
+    # the response is left unread, as after a timeout
+    assert transport.query(":MEAS:VOLT? (@0)") == ":MEAS:VOLT? (@0)"
+
+    assert transport.resync() is False
+    assert transport.query(":MEAS:CURR? (@0)") == ":MEAS:CURR? (@0)"
+    assert transport.read().endswith("A")
+
+
+def test_query_is_retried_after_corrupt_echo():
+    simulator = OneShotModule(channels=1)
+    nhr = NHR(transport=SerialTransport.from_serial(simulator), retries=2)
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+
+    assert nhr.channel0.voltage.measured == 0.0
+    assert simulator.commands[-3:] == [":MEAS:VOLT? (@0)", "*OPC?", ":MEAS:VOLT? (@0)"]
+
+
+def test_query_is_retried_after_dropped_line():
+    simulator = OneShotModule(channels=1, timeout=0.01)
+    nhr = NHR(transport=SerialTransport.from_serial(simulator), retries=1)
+    simulator.set_faults(FaultProfile(drop_line=1.0, seed=1))
+
+    assert nhr.channel0.current.measured == 0.0
+    assert simulator.commands.count(":MEAS:CURR? (@0)") == 2
+
+
+def test_write_is_not_repeated():
+    simulator = OneShotModule(channels=1)
+    nhr = NHR(transport=SerialTransport.from_serial(simulator), retries=2)
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+
+    with pytest.raises(ValueError):
+        nhr.channel0.voltage.setpoint = 10
+    assert simulator.commands[-2:] == [":VOLT 10,(@0)", "*OPC?"]
+    nhr.channel0.voltage.setpoint = 20
+    assert simulator.channels[0].setpoint == 20
+
+
+def test_without_retries_nothing_is_resent():
+    simulator = OneShotModule(channels=1)
+    nhr = NHR(transport=SerialTransport.from_serial(simulator))
+    simulator.set_faults(FaultProfile(corrupt_echo=1.0))
+
+    with pytest.raises(ValueError):
+        nhr.channel0.voltage.measured
+    assert "*OPC?" not in simulator.commands
+
+
+def test_disappeared_port_is_reopened():
+    ports = [UnpluggableModule(channels=2)]
+
+    def opener():
+        ports.append(UnpluggableModule(channels=2))
+        return ports[-1]
+
+    transport = SerialTransport.from_serial(ports[0], opener=opener)
+    nhr = NHR(transport=transport, write_cache=True, retries=1)
+    channel = nhr.channel1
+    channel.voltage.setpoint = 5
+    ports[0].unplugged = True
+
+    assert channel.voltage.measured == 0.0
+    assert len(ports) == 2
+    assert nhr.channel1 is channel
+    # the new module may not have the setting, so the write cache was cleared
+    channel.voltage.setpoint = 5
+    assert ports[1].channels[1].setpoint == 5
+
+
+def test_reopen_backs_off_between_attempts():
+    delays = []
+    calls = []
+
+    def opener():
+        calls.append(None)
+        if len(calls) < 3:
+            raise serial.SerialException("no such device")
+        return SimulatedModule(channels=1)
+
+    transport = SerialTransport.from_serial(SimulatedModule(channels=1), opener=opener)
+    transport.reopen(delay=0.1, sleep=delays.append)
+    assert delays == pytest.approx([0.1, 0.2])
+
+    calls.clear()
+    with pytest.raises(ConnectionError):
+        transport.reopen(attempts=2, sleep=delays.append)
+
+
+def test_reopen_requires_opener():
+    transport = SerialTransport.from_serial(SimulatedModule(channels=1))
+    with pytest.raises(ConnectionError):
+        transport.reopen()
@@ -0,0 +1,76 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.sequence import SequencePlayer, Step
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+
+
+class FakeClock:
+    def __init__(self, oversleep=0.0):
+        self.now = 0.0
+        self.oversleep = oversleep
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds + self.oversleep
+
+
+def make_nhr(channels=2):
+    simulator = SimulatedModule(channels=channels)
+    return simulator, NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_steps_due_together_are_sent_in_one_burst():
+    simulator, nhr = make_nhr()
+    clock = FakeClock()
+    player = SequencePlayer(
+        nhr,
+        [(1.0, 0, 10.0), (1.0, 1, 10.0), (2.0, 1, 20.0), Step(2.0, 0, 5.0)],
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+    report = player.play()
+
+    assert report.bursts == 2
+    assert simulator.commands[-3:] == [
+        ":VOLT 10.0,(@0-1)",
+        ":VOLT 5.0,(@0)",
+        ":VOLT 20.0,(@1)",
+    ]
+    assert nhr.setpoints == pytest.approx((5.0, 20.0))
+    assert report.max_lateness == pytest.approx(0.0)
+
+
+def test_schedule_compensates_for_oversleeping():
+    simulator, nhr = make_nhr(channels=1)
+    clock = FakeClock(oversleep=0.01)
+    player = SequencePlayer.from_waveform(
+        nhr, 0, [float(v) for v in range(200)], 1.0, clock=clock, sleep=clock.sleep
+    )
+
+    report = player.play()
+
+    assert len(report.timings) == 200
+    assert report.timings[-1].lateness < 0.005
+    assert report.max_lateness <= 0.01 + 1e-9
+
+
+def test_stop_ends_playback_early():
+    simulator, nhr = make_nhr(channels=1)
+    clock = FakeClock()
+
+    class Stop:
+        def is_set(self):
+            return clock.now >= 1.5
+
+    player = SequencePlayer.from_waveform(
+        nhr, [0], [1.0, 2.0, 3.0], 1.0, clock=clock, sleep=clock.sleep
+    )
+    report = player.play(stop=Stop())
+
+    assert not report.completed
+    assert [t.step.setpoint for t in report.timings] == [1.0, 2.0]
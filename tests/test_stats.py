@@ -0,0 +1,63 @@
+import random
+import statistics
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.poller import AdaptivePoller
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.stats import CurrentStatistics, Moments, RollingWindow
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_moments_match_batch_statistics_and_merge():
+    rng = random.Random(1)
+    values = [1e-7 + 1e-9 * t + rng.gauss(0, 1e-9) for t in range(200)]
+    first, second, total = Moments(), Moments(), Moments()
+    for t, value in enumerate(values):
+        (first if t < 80 else second).update(t, value)
+        total.update(t, value)
+    merged = first.merge(second)
+
+    for moments in (total, merged):
+        assert moments.count == 200
+        assert moments.mean == pytest.approx(statistics.fmean(values))
+        assert moments.variance == pytest.approx(statistics.variance(values))
+        assert moments.minimum == min(values)
+        assert moments.maximum == max(values)
+        assert moments.drift == pytest.approx(1e-9, rel=0.05)
+    assert Moments().merge(first).mean == first.mean
+
+
+def test_rolling_window_forgets_old_buckets():
+    window = RollingWindow(duration=10.0, buckets=5)
+    for t in range(30):
+        window.update(t + 0.5, float(t))
+
+    summaries = window.summaries()
+    assert [start for start, _ in summaries] == [20.0, 22.0, 24.0, 26.0, 28.0]
+    assert window.moments().count == 10
+    assert window.moments().mean == pytest.approx(24.5)
+    assert window.moments(now=35.0).count == 4
+    assert window.moments(now=100.0).count == 0
+
+
+def test_current_statistics_from_module_and_poller():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    times = iter(range(100))
+    stats = CurrentStatistics(nhr, windows=(5.0,), buckets=5, clock=lambda: next(times))
+
+    for _ in range(3):
+        stats.sample()
+    assert stats[1].total.count == 3
+    assert stats[1].window(5.0).mean == 0.0
+    with pytest.raises(ValueError):
+        stats[1].window(60.0)
+
+    AdaptivePoller(nhr).run(stats.feed, cycles=1)
+    assert stats[0].total.count == 4
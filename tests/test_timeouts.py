@@ -0,0 +1,113 @@
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.timeouts import AdaptiveTimeouts, ModuleDownError, command_key
+from iseg_nhr.transport import SerialTransport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_nhr(simulator, timeouts):
+    return NHR(transport=SerialTransport.from_serial(simulator, timeouts=timeouts))
+
+
+def test_command_key_strips_values_and_channels():
+    assert command_key(":MEAS:VOLT? (@2)") == ":MEAS:VOLT?"
+    assert command_key(":VOLT 10,(@1)") == ":VOLT"
+    assert command_key(":VOLT 10,(@0-3)") == ":VOLT"
+    assert command_key("*IDN?") == "*IDN?"
+
+
+def test_command_key_counts_channels_of_list_queries():
+    assert command_key(":MEAS:VOLT? (@0-15)") == ":MEAS:VOLT? x16"
+    assert command_key(":MEAS:VOLT? (@0,2)") == ":MEAS:VOLT? x2"
+    timeouts = AdaptiveTimeouts(min_samples=1)
+    timeouts.success(":MEAS:VOLT? (@0-15)", 0.2)
+    timeouts.success(":MEAS:VOLT? (@0)", 0.01)
+
+    assert timeouts.timeout(":MEAS:VOLT? (@0-15)") == pytest.approx(0.4)
+    assert timeouts.timeout(":MEAS:VOLT? (@1)") == pytest.approx(0.02)
+
+
+def test_timeouts_follow_observed_latency():
+    timeouts = AdaptiveTimeouts(default=1.0, minimum=0.01, min_samples=5, margin=2.0)
+    for latency in (0.010, 0.012, 0.011, 0.030, 0.009):
+        assert timeouts.timeout(":MEAS:VOLT? (@0)") == 1.0
+        timeouts.success(":MEAS:VOLT? (@0)", latency)
+
+    assert timeouts.timeout(":MEAS:VOLT? (@3)") == pytest.approx(0.060)
+    assert timeouts.timeout(":MEAS:CURR? (@0)") == 1.0
+    assert timeouts.timeout(":MEAS:VOLT? (@0-3)") == 1.0
+    # a timeout widens the distribution instead of repeating forever
+    timeouts.failure(":MEAS:VOLT? (@0)")
+    assert timeouts.timeout(":MEAS:VOLT? (@0)") == pytest.approx(0.120)
+
+
+def test_serial_transport_learns_timeouts():
+    simulator = SimulatedModule(channels=1, timeout=0.5)
+    timeouts = AdaptiveTimeouts(minimum=0.02, min_samples=5)
+    nhr = make_nhr(simulator, timeouts)
+
+    for _ in range(5):
+        nhr.channel0.voltage.measured
+
+    assert timeouts.timeout(":MEAS:VOLT?") == 0.02
+    assert simulator.timeout == 0.02
+
+
+def test_port_is_reconfigured_only_when_timeout_changes():
+    class CountingModule(SimulatedModule):
+        assignments = 0
+
+        def __setattr__(self, name, value):
+            if name == "timeout":
+                type(self).assignments += 1
+            super().__setattr__(name, value)
+
+    simulator = CountingModule(channels=1, timeout=0.5)
+    timeouts = AdaptiveTimeouts(minimum=0.02, min_samples=5)
+    nhr = make_nhr(simulator, timeouts)
+    before = CountingModule.assignments
+
+    for _ in range(50):
+        nhr.channel0.voltage.measured
+
+    # default, then the learned timeout
+    assert CountingModule.assignments - before <= 2
+
+
+def test_down_module_fails_fast_until_probe_succeeds():
+    clock = FakeClock()
+    simulator = SimulatedModule(channels=1, timeout=0.01)
+    timeouts = AdaptiveTimeouts(
+        default=0.01, minimum=0.01, max_failures=2, probe_interval=5.0, clock=clock
+    )
+    nhr = make_nhr(simulator, timeouts)
+    simulator.set_faults(FaultProfile(timeout=1.0))
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            nhr.channel0.voltage.measured
+    assert timeouts.down
+    sent = len(simulator.commands)
+    with pytest.raises(ModuleDownError):
+        nhr.channel0.voltage.measured
+    assert len(simulator.commands) == sent
+
+    clock.now = 6.0
+    with pytest.raises(ModuleDownError):
+        nhr.channel0.voltage.measured
+    assert simulator.commands[-1] == "*OPC?"
+
+    simulator.set_faults(FaultProfile())
+    clock.now = 12.0
+    assert nhr.channel0.voltage.measured == 0.0
+    assert not timeouts.down
+    assert simulator.commands[-2:] == ["*OPC?", ":MEAS:VOLT? (@0)"]
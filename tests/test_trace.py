@@ -0,0 +1,109 @@
+import io
+import json
+import threading
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.simulator import FaultProfile, SimulatedModule
+from iseg_nhr.trace import Tracer
+from iseg_nhr.transport import SerialTransport
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def test_trace_records_transactions_with_api_caller():
+    nhr = make_nhr(SimulatedModule(channels=2))
+
+    with nhr.trace() as tracer:
+        nhr.voltages
+        nhr.channel1.status_register
+        nhr.channel0.voltage.setpoint = 10.0
+    nhr.currents
+
+    callers = [event.caller for event in tracer.events]
+    assert callers == [
+        "NHR.voltages",
+        "NHR.voltages",
+        "Channel.status_register",
+        "Voltage.setpoint",
+    ]
+    first = tracer.events[0]
+    assert first.commands == (":MEAS:VOLT? (@0)",)
+    assert first.responses == ("0.00000E+00V",)
+    assert first.end >= first.start
+    assert first.thread_id == threading.get_native_id()
+    assert tracer.events[-1].commands == (":VOLT 10.0,(@0)",)
+    assert tracer.events[-1].responses == (None,)
+
+
+def test_trace_records_bursts_and_errors():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+
+    with nhr.trace() as tracer:
+        with nhr.batch():
+            nhr.channel0.voltage.setpoint = 1.0
+            nhr.channel1.voltage.setpoint = 2.0
+        simulator.set_faults(FaultProfile(timeout=1.0))
+        with pytest.raises(TimeoutError):
+            nhr.channel0.voltage.measured
+
+    burst, failed = tracer.events
+    assert burst.caller == "Batch.__exit__"
+    assert burst.commands == (":VOLT 1.0,(@0)", ":VOLT 2.0,(@1)")
+    assert failed.caller == "Voltage.measured"
+    assert "TimeoutError" in failed.error
+
+
+def test_chrome_export_groups_modules_and_threads():
+    tracer = Tracer()
+    first = make_nhr(SimulatedModule(channels=1))
+    second = make_nhr(SimulatedModule(channels=1))
+
+    with first.trace(tracer, name="COM3"), second.trace(tracer, name="COM4"):
+        worker = threading.Thread(target=lambda: first.voltages, name="poller")
+        worker.start()
+        worker.join()
+        second.currents
+
+    file = io.StringIO()
+    tracer.export(file)
+    trace = json.loads(file.getvalue())["traceEvents"]
+
+    processes = {
+        e["pid"]: e["args"]["name"] for e in trace if e["name"] == "process_name"
+    }
+    assert processes == {1: "COM3", 2: "COM4"}
+    threads = {e["args"]["name"] for e in trace if e["name"] == "thread_name"}
+    assert "poller" in threads
+    spans = [e for e in trace if e["ph"] == "X"]
+    assert [(e["name"], e["pid"]) for e in spans] == [
+        ("NHR.voltages", 1),
+        ("NHR.currents", 2),
+    ]
+    assert spans[0]["args"] == {
+        "command": ":MEAS:VOLT? (@0)",
+        "response": "0.00000E+00V",
+    }
+    assert spans[1]["ts"] >= spans[0]["ts"] + spans[0]["dur"]
+
+
+def test_trace_records_serial_traffic_only(tmp_path):
+    simulator = SimulatedModule(channels=2)
+    nhr = NHR(
+        transport=SerialTransport.from_serial(simulator),
+        write_cache=True,
+        metadata_cache=tmp_path / "metadata.json",
+    )
+    nhr.channel0.voltage.setpoint = 10.0
+
+    with nhr.trace() as tracer:
+        nhr.channel0.voltage.setpoint = 10.0
+        nhr.number_channels
+        nhr.channel1.voltage.measured
+
+    assert [event.commands for event in tracer.events] == [(":MEAS:VOLT? (@1)",)]
+    assert tracer.events[0].caller == "Voltage.measured"
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+
+from iseg_nhr import NHR
+from iseg_nhr.register import ChannelEventRegister, EventRegister
+from iseg_nhr.simulator import SimulatedModule
+from iseg_nhr.transport import SerialTransport
+from iseg_nhr.watchdog import TripWatchdog
+
+
+def make_nhr(simulator):
+    return NHR(transport=SerialTransport.from_serial(simulator))
+
+
+def switch_on(nhr, setpoint=100.0):
+    for ch in range(nhr.number_channels):
+        nhr.channel(ch).voltage.setpoint = setpoint
+        nhr.channel(ch).on()
+
+
+def test_check_uses_two_queries_when_nothing_trips():
+    simulator = SimulatedModule(channels=4)
+    watchdog = TripWatchdog(make_nhr(simulator))
+    sent = len(simulator.commands)
+
+    assert watchdog.check() is None
+    assert simulator.commands[sent:] == [
+        ":READ:MOD:EV:STAT?",
+        ":READ:CHAN:EV:STAT? (@0-3)",
+    ]
+
+
+def test_channel_trip_switches_off_affected_channels_once():
+    simulator = SimulatedModule(channels=4)
+    nhr = make_nhr(simulator)
+    switch_on(nhr)
+    watchdog = TripWatchdog(nhr)
+
+    simulator.inject_event(1, ChannelEventRegister.CurrentTrip)
+    simulator.inject_event(3, ChannelEventRegister.ArcNumberExceeded)
+    trip = watchdog.check()
+
+    assert trip.channels == (1, 3)
+    assert simulator.commands[-1] == ":VOLT EMCY_OFF,(@1,3)"
+    assert trip.latency >= 0
+    assert watchdog.latencies == (trip.latency,)
+    assert watchdog.check() is None
+
+
+def test_module_event_switches_off_all_channels():
+    simulator = SimulatedModule(channels=3)
+    nhr = make_nhr(simulator)
+    switch_on(nhr)
+    watchdog = TripWatchdog(nhr, action="off")
+
+    simulator.inject_module_event(EventRegister.TemperatureNotGood)
+    trip = watchdog.check()
+
+    assert trip.channels == (0, 1, 2)
+    assert trip.reasons == ("module TemperatureNotGood",)
+    assert simulator.commands[-1] == ":VOLT OFF,(@0-2)"
+    assert nhr.channel0.on_state is False
+    assert watchdog.check() is None
+
+
+def test_leakage_threshold_with_module_scope():
+    simulator = SimulatedModule(channels=2)
+    nhr = make_nhr(simulator)
+    switch_on(nhr)
+    simulator.channels[0].leakage = 2e-6
+    watchdog = TripWatchdog(nhr, leakage_threshold=1e-6, scope="module")
+
+    trip = watchdog.check()
+
+    assert trip.channels == (0, 1)
+    assert "leakage" in trip.reasons[0]
+    assert ":MEAS:CURR? (@0-1)" in simulator.commands
+
+
+def test_rejects_unknown_action():
+    with pytest.raises(ValueError, match="action"):
+        TripWatchdog(make_nhr(SimulatedModule(channels=1)), action="kill")
+
+
+def test_reads_are_one_burst_timed_from_its_start():
+    now = [0.0]
+
+    class ClockedModule(SimulatedModule):
+        def write(self, data):
+            now[0] += 1.0
+            return super().write(data)
+
+    simulator = ClockedModule(channels=2)
+    nhr = make_nhr(simulator)
+    switch_on(nhr)
+    watchdog = TripWatchdog(nhr, leakage_threshold=1.0, clock=lambda: now[0])
+    simulator.inject_event(0, ChannelEventRegister.CurrentTrip)
+    start = now[0]
+
+    trip = watchdog.check()
+
+    assert trip.detected == start
+    assert simulator.commands[-4:-1] == [
+        ":READ:MOD:EV:STAT?",
+        ":READ:CHAN:EV:STAT? (@0-1)",
+        ":MEAS:CURR? (@0-1)",
+    ]
+
+
+def test_loop_survives_failures():
+    simulator = SimulatedModule(channels=1)
+    nhr = make_nhr(simulator)
+    switch_on(nhr)
+    calls = []
+
+    def on_trip(trip):
+        calls.append(trip)
+        raise RuntimeError("notification failed")
+
+    watchdog = TripWatchdog(nhr, interval=0.001, on_trip=on_trip)
+    simulator.inject_event(0, ChannelEventRegister.CurrentTrip)
+    with pytest.raises(RuntimeError):
+        watchdog.check()
+    assert len(watchdog.trips) == 1
+
+    watchdog.rearm()
+    watchdog.start()
+    try:
+        for _ in range(200):
+            if watchdog.checks > 3:
+                break
+            time.sleep(0.005)
+    finally:
+        watchdog.stop()
+    assert len(calls) == 2
+    assert watchdog.errors == 1
+    assert watchdog.error is None
+    assert watchdog.checks > 3